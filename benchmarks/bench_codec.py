@@ -0,0 +1,99 @@
+"""
+Микробенчмарк JSON кодека: старый путь (text() + json.loads, повторный json.loads
+для jacred) против нового (один codec.loads из байтов) на ответах реального размера.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_codec
+"""
+import json
+import random
+import timeit
+from utils import codec
+
+def make_film_details() -> dict:
+    """Карточка фильма в формате films/{id} (~3 КБ)"""
+    return {
+        "kinopoiskId": 301, "kinopoiskHDId": "4824a95e60a7db7e86f14137516ba590", "imdbId": "tt0133093",
+        "nameRu": "Матрица", "nameEn": None, "nameOriginal": "The Matrix",
+        "posterUrl": "https://kinopoiskapiunofficial.tech/images/posters/kp/301.jpg",
+        "posterUrlPreview": "https://kinopoiskapiunofficial.tech/images/posters/kp_small/301.jpg",
+        "coverUrl": "https://avatars.mds.yandex.net/get-ott/1672343/2a0000016cc7177239d4025185c488b1bf43/orig",
+        "logoUrl": "https://avatars.mds.yandex.net/get-ott/1648503/2a00000170a5418408119bc802b53a03007b/orig",
+        "reviewsCount": 293, "ratingGoodReview": 88.9, "ratingGoodReviewVoteCount": 257,
+        "ratingKinopoisk": 8.5, "ratingKinopoiskVoteCount": 524108, "ratingImdb": 8.7,
+        "ratingImdbVoteCount": 1729087, "ratingFilmCritics": 7.8, "ratingFilmCriticsVoteCount": 155,
+        "ratingAwait": 7.8, "ratingAwaitCount": 2, "ratingRfCritics": 7.8, "ratingRfCriticsVoteCount": 31,
+        "webUrl": "https://www.kinopoisk.ru/film/301/", "year": 1999, "filmLength": 136,
+        "slogan": "Добро пожаловать в реальный мир",
+        "description": "Жизнь Томаса Андерсона разделена на две части: днём он — самый обычный офисный "
+                       "работник, получающий нагоняи от начальства, а ночью превращается в хакера по "
+                       "имени Нео, и нет места в сети, куда он бы не смог проникнуть. " * 3,
+        "shortDescription": "Хакер Нео узнает, что его мир — виртуальный. Выдающийся экшен, доказавший, "
+                            "что зрелищное кино может быть умным",
+        "editorAnnotation": "Фильм доступен только на языке оригинала с русскими субтитрами",
+        "isTicketsAvailable": False, "productionStatus": "POST_PRODUCTION", "type": "FILM",
+        "ratingMpaa": "r", "ratingAgeLimits": "age16", "hasImax": False, "has3D": False,
+        "lastSync": "2021-07-29T20:07:49.109817",
+        "countries": [{"country": "США"}, {"country": "Австралия"}],
+        "genres": [{"genre": "фантастика"}, {"genre": "боевик"}],
+        "startYear": 1996, "endYear": 1996, "serial": False, "shortFilm": False, "completed": False
+    }
+
+def make_jacred_results(count: int = 300) -> list:
+    """Ответ jacred для популярного фильма (~300 раздач)"""
+    rnd = random.Random(42)
+    return [
+        {
+            "tracker": rnd.choice(["rutor", "kinozal", "rutracker", "nnmclub"]),
+            "url": f"https://rutor.info/torrent/{rnd.randint(100000, 999999)}",
+            "title": f"Матрица / The Matrix (1999) BDRip {rnd.choice(['720p', '1080p', '2160p'])} | D, P, A",
+            "size": rnd.randint(700, 60000) * 1024 * 1024,
+            "sizeName": f"{rnd.randint(1, 60)}.{rnd.randint(0, 99)} GB",
+            "createTime": "2023-05-17 12:30:00", "updateTime": "2023-05-17 12:30:00",
+            "sid": rnd.randint(0, 500), "pir": rnd.randint(0, 100),
+            "magnet": "magnet:?xt=urn:btih:" + "".join(rnd.choice("0123456789abcdef") for _ in range(40)),
+            "name": "матрица", "originalname": "the matrix", "relased": 1999,
+            "videotype": "sdr", "quality": rnd.choice([720, 1080, 2160]),
+            "voices": ["Дубляж", "Гаврилов"], "seasons": [], "types": ["movie"]
+        }
+        for _ in range(count)
+    ]
+
+def bench(name: str, func, number: int) -> float:
+    seconds = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print(f"  {name:<40} {seconds * 1e6:10.1f} us")
+    return seconds
+
+def main():
+    payloads = {
+        "film details": (json.dumps(make_film_details(), ensure_ascii=False).encode('utf-8'), 20000, False),
+        "jacred results": (json.dumps(make_jacred_results(), ensure_ascii=False).encode('utf-8'), 200, True),
+    }
+    print(f"codec backend: {codec.BACKEND}")
+    for name, (body, number, double_decode) in payloads.items():
+        print(f"\n{name} ({len(body) / 1024:.1f} KB)")
+
+        def old_decode():
+            # response.text() + json.loads (у jacred ответ разбирался повторно в get_torrents)
+            text = body.decode('utf-8')
+            data = json.loads(text)
+            if double_decode:
+                data = json.loads(text)
+            return data
+
+        def new_decode():
+            return codec.loads(body)
+
+        data = codec.loads(body)
+        envelope = {'exp': 0.0, 'data': data}
+
+        before = bench("decode: text + json.loads", old_decode, number)
+        after = bench("decode: codec.loads(bytes)", new_decode, number)
+        print(f"  speedup {before / after:.1f}x")
+
+        before = bench("redis: json.dumps", lambda: json.dumps(envelope, ensure_ascii=False), number)
+        after = bench("redis: codec.dumps", lambda: codec.dumps(envelope), number)
+        print(f"  speedup {before / after:.1f}x")
+
+if __name__ == "__main__":
+    main()
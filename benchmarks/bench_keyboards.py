@@ -0,0 +1,89 @@
+"""
+Микробенчмарк клавиатур: сборка InlineKeyboardBuilder + as_markup() на каждый апдейт
+(старый путь) против готовых клавиатур (статические меню собраны при импорте,
+страницы результатов берутся из кэша по версии набора результатов).
+
+Запуск из корня проекта (нужны BOT_TOKEN и KINOPOISK_API_KEYS, как для бота):
+    python -m benchmarks.bench_keyboards
+"""
+import random
+import timeit
+from models.film import FilmSummary
+from keyboards.main import _build_main_menu, get_main_menu
+from keyboards.tops import _build_tops_menu, get_tops_menu
+from keyboards.advanced_search import _build_advanced_search_keyboard, get_advanced_search_keyboard
+from keyboards.pagination import _build_pagination_keyboard, get_pagination_keyboard
+from keyboards.torr_pagination import _build_torrent_pagination_keyboard, get_torrent_pagination_keyboard
+
+def make_films(count: int = 10) -> list:
+    """Страница результатов поиска (10 фильмов)"""
+    rnd = random.Random(42)
+    return [
+        FilmSummary(
+            kinopoisk_id=rnd.randint(300, 5000000), name_ru=f"Матрица: Перезагрузка {idx}",
+            year=rnd.randint(1960, 2024), rating_kinopoisk=round(rnd.uniform(5, 9), 1),
+            type=rnd.choice(["FILM", "TV_SERIES"])
+        )
+        for idx in range(count)
+    ]
+
+def make_torrents(count: int = 5) -> list:
+    """Страница раздач jacred (5 раздач)"""
+    rnd = random.Random(42)
+    return [
+        {
+            "quality": 1080, "quality_full": rnd.choice(["1080p BDRip", "2160p WEB-DL HDR", "720p HDTV"]),
+            "size_gb": rnd.uniform(1, 60), "seeders": rnd.randint(1, 500), "voice": "Дубляж",
+            "magnet": "magnet:?xt=urn:btih:" + "".join(rnd.choice("0123456789abcdef") for _ in range(40))
+        }
+        for _ in range(count)
+    ]
+
+def bench(name: str, func, number: int) -> float:
+    seconds = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print(f"  {name:<40} {seconds * 1e6:10.1f} us")
+    return seconds
+
+def main():
+    films = make_films()
+    torrents = make_torrents()
+    filters = {
+        'genre': {'id': 2, 'name': 'боевик'}, 'year': {'range': '1990-1999'},
+        'rating': {'range': '7-10'}, 'sort_by': 'RATING'
+    }
+    cases = {
+        "main menu": (
+            lambda: _build_main_menu().as_markup(),
+            get_main_menu
+        ),
+        "tops menu": (
+            lambda: _build_tops_menu().as_markup(),
+            get_tops_menu
+        ),
+        "advanced search filters": (
+            lambda: _build_advanced_search_keyboard(filters).as_markup(),
+            lambda: get_advanced_search_keyboard(filters)
+        ),
+        "search results page (10 films)": (
+            lambda: _build_pagination_keyboard("s_b4a5d", 3, 14, films).as_markup(),
+            lambda: get_pagination_keyboard("s_b4a5d", 3, 14, films, result_set="1700000000000000000")
+        ),
+        "torrents page (5 torrents)": (
+            lambda: _build_torrent_pagination_keyboard("301", 2, 9, torrents, "f_301_t250_1").as_markup(),
+            lambda: get_torrent_pagination_keyboard("301", 2, 9, torrents, "f_301_t250_1")
+        ),
+    }
+
+    saved = {}
+    for name, (build, cached) in cases.items():
+        print(f"\n{name}")
+        before = bench("build: InlineKeyboardBuilder + as_markup", build, 2000)
+        after = bench("cached markup", cached, 2000)
+        saved[name] = before - after
+        print(f"  speedup {before / after:.0f}x, saved {(before - after) * 1e6:.1f} us per update")
+
+    # Апдейт листания результатов отправляет одну клавиатуру страницы
+    print(f"\nCPU saved per pagination update: {saved['search results page (10 films)'] * 1e6:.1f} us")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""
+Локальные заглушки Kinopoisk API и jacred для нагрузочных тестов без расхода ключей.
+
+Отдают синтетические, но совпадающие по схеме ответы на эндпоинты, которые использует бот:
+    Kinopoisk: /api/v2.2/films, /api/v2.2/films/{id}, /api/v2.2/films/collections, /api/v2.2/films/filters
+    jacred:    /api/v1.0/torrents
+
+Запуск из корня проекта:
+    python -m benchmarks.fake_upstreams --latency lognormal:80,0.5 --rate-429 0.02 --rate-5xx 0.01
+
+Бот направляется на заглушки через .env:
+    KINOPOISK_BASE_URL=http://127.0.0.1:8081/api/v2.2
+    JACRED_BASE_URL=http://127.0.0.1:8082
+"""
+import argparse
+import asyncio
+import hashlib
+import logging
+import math
+import random
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable
+from aiohttp import web
+
+GENRES = [
+    "триллер", "драма", "криминал", "мелодрама", "детектив", "фантастика", "приключения",
+    "биография", "вестерн", "боевик", "фэнтези", "комедия", "военный", "история", "ужасы",
+    "мультфильм", "семейный", "мюзикл", "спорт", "документальный", "аниме", "детский"
+]
+COUNTRIES = [
+    "США", "Россия", "СССР", "Франция", "Италия", "Испания", "Великобритания", "Германия",
+    "Япония", "Корея Южная", "Канада", "Австралия", "Индия", "Китай", "Швеция", "Дания"
+]
+WORDS = [
+    "тень", "город", "последний", "ночь", "дорога", "война", "любовь", "остров", "зверь",
+    "игра", "море", "секрет", "охота", "огонь", "мечта", "побег", "закон", "время", "дом"
+]
+COLLECTION_SIZES = {
+    "TOP_250_MOVIES": 250, "TOP_POPULAR_ALL": 400, "TOP_POPULAR_MOVIES": 200, "TOP_AWAIT_MOVIES": 60
+}
+PAGE_SIZE = 20
+
+@dataclass
+class FaultConfig:
+    latency: Callable[[], float]   # Задержка ответа в секундах
+    rate_402: float = 0.0          # Доля ответов "квота исчерпана"
+    rate_429: float = 0.0          # Доля ответов "слишком много запросов"
+    rate_5xx: float = 0.0          # Доля ответов 503
+    key_quota: int = 0             # Запросов на ключ до постоянного 402 (0 - без лимита)
+    description_size: int = 600    # Длина описания фильма в символах
+    torrents: int = 150            # Раздач в ответе jacred
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """
+    Распределение задержки в миллисекундах:
+        fixed:80 | uniform:20,200 | lognormal:80,0.5 (медиана, сигма) | none
+    """
+    kind, _, args = spec.partition(':')
+    values = [float(value) for value in args.split(',') if value]
+    if kind == 'none':
+        return lambda: 0.0
+    if kind == 'fixed':
+        return lambda: values[0] / 1000
+    if kind == 'uniform':
+        return lambda: random.uniform(values[0], values[1]) / 1000
+    if kind == 'lognormal':
+        mu = math.log(values[0])
+        return lambda: random.lognormvariate(mu, values[1]) / 1000
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+def _rng(*seed) -> random.Random:
+    """Детерминированный генератор: одинаковые запросы дают одинаковые данные"""
+    return random.Random(hashlib.md5(repr(seed).encode('utf-8')).hexdigest())
+
+def _title(rnd: random.Random) -> str:
+    return " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(1, 3))).capitalize()
+
+def make_film_item(film_id: int) -> dict:
+    """Элемент items поиска и подборок"""
+    rnd = _rng('film', film_id)
+    return {
+        "kinopoiskId": film_id,
+        "imdbId": f"tt{film_id:07d}",
+        "nameRu": _title(rnd),
+        "nameEn": None,
+        "nameOriginal": _title(rnd),
+        "countries": [{"country": country} for country in rnd.sample(COUNTRIES, rnd.randint(1, 2))],
+        "genres": [{"genre": genre} for genre in rnd.sample(GENRES, rnd.randint(1, 3))],
+        "ratingKinopoisk": round(rnd.uniform(4, 9), 1),
+        "ratingImdb": round(rnd.uniform(4, 9), 1),
+        "year": rnd.randint(1960, 2025),
+        "type": "TV_SERIES" if rnd.random() < 0.2 else "FILM",
+        "posterUrl": f"https://kinopoiskapiunofficial.tech/images/posters/kp/{film_id}.jpg",
+        "posterUrlPreview": f"https://kinopoiskapiunofficial.tech/images/posters/kp_small/{film_id}.jpg"
+    }
+
+def make_film_details(film_id: int, description_size: int) -> dict:
+    """Ответ films/{id}"""
+    rnd = _rng('details', film_id)
+    item = make_film_item(film_id)
+    description = " ".join(rnd.choice(WORDS) for _ in range(description_size // 6))[:description_size]
+    return {
+        **item,
+        "kinopoiskHDId": hashlib.md5(str(film_id).encode()).hexdigest(),
+        "coverUrl": None, "logoUrl": None,
+        "reviewsCount": rnd.randint(0, 500), "ratingGoodReview": round(rnd.uniform(50, 100), 1),
+        "ratingGoodReviewVoteCount": rnd.randint(0, 500),
+        "ratingKinopoiskVoteCount": rnd.randint(100, 500000), "ratingImdbVoteCount": rnd.randint(100, 2000000),
+        "ratingFilmCritics": round(rnd.uniform(4, 9), 1), "ratingFilmCriticsVoteCount": rnd.randint(0, 300),
+        "ratingAwait": None, "ratingAwaitCount": 0, "ratingRfCritics": None, "ratingRfCriticsVoteCount": 0,
+        "webUrl": f"https://www.kinopoisk.ru/film/{film_id}/",
+        "filmLength": rnd.randint(80, 180),
+        "slogan": _title(rnd),
+        "description": description.capitalize(),
+        "shortDescription": description[:120],
+        "editorAnnotation": None, "isTicketsAvailable": False, "productionStatus": None,
+        "ratingMpaa": "r", "ratingAgeLimits": "age16", "hasImax": False, "has3D": False,
+        "lastSync": "2024-01-01T00:00:00.000000",
+        "startYear": None, "endYear": None,
+        "serial": item["type"] == "TV_SERIES", "shortFilm": False, "completed": False
+    }
+
+def make_page(ids: list, total: int) -> dict:
+    return {
+        "total": total,
+        "totalPages": (total + PAGE_SIZE - 1) // PAGE_SIZE,
+        "items": [make_film_item(film_id) for film_id in ids]
+    }
+
+def make_torrents(search: str, count: int) -> list:
+    """Ответ jacred /api/v1.0/torrents"""
+    rnd = _rng('torrents', search)
+    result = []
+    for _ in range(rnd.randint(count // 2, count)):
+        quality = rnd.choice([480, 720, 1080, 2160])
+        result.append({
+            "tracker": rnd.choice(["rutor", "kinozal", "rutracker", "nnmclub"]),
+            "url": f"https://rutor.info/torrent/{rnd.randint(100000, 999999)}",
+            "title": f"{search} ({rnd.randint(1960, 2025)}) WEB-DL {quality}p | D, P",
+            "size": rnd.randint(700, 60000) * 1024 * 1024,
+            "sizeName": f"{rnd.randint(1, 60)}.{rnd.randint(0, 99)} GB",
+            "createTime": "2024-01-01 12:00:00", "updateTime": "2024-01-01 12:00:00",
+            "sid": rnd.randint(0, 500), "pir": rnd.randint(0, 100),
+            "magnet": "magnet:?xt=urn:btih:" + "".join(rnd.choice("0123456789abcdef") for _ in range(40)),
+            "name": search.lower(), "originalname": search.lower(), "relased": rnd.randint(1960, 2025),
+            "videotype": "sdr", "quality": quality,
+            "voices": rnd.sample(["Дубляж", "Гаврилов", "LostFilm", "Jaskier", "HDRezka"], 2),
+            "seasons": [], "types": ["movie"]
+        })
+    return result
+
+class FakeUpstreams:
+    """Общее состояние заглушек: конфигурация сбоев и счетчики ответов"""
+
+    def __init__(self, faults: FaultConfig):
+        self.faults = faults
+        self.key_usage: Counter = Counter()
+        self.responses: Counter = Counter()
+
+    async def _delay(self):
+        await asyncio.sleep(self.faults.latency())
+
+    def _inject_fault(self, api_key: str = None) -> web.Response:
+        """Возвращает ответ-сбой или None, если запрос надо обслужить"""
+        if api_key is not None:
+            self.key_usage[api_key] += 1
+            if self.faults.key_quota and self.key_usage[api_key] > self.faults.key_quota:
+                return web.json_response({"message": "quota exceeded"}, status=402)
+            if random.random() < self.faults.rate_402:
+                return web.json_response({"message": "quota exceeded"}, status=402)
+            if random.random() < self.faults.rate_429:
+                return web.json_response({"message": "too many requests"}, status=429, headers={"Retry-After": "1"})
+        if random.random() < self.faults.rate_5xx:
+            return web.json_response({"message": "service unavailable"}, status=503)
+        return None
+
+    @staticmethod
+    def _endpoint(request: web.Request) -> str:
+        """Шаблон маршрута (films/{film_id}), чтобы счетчики не дробились по ID"""
+        resource = request.match_info.route.resource
+        return resource.canonical if resource is not None else request.path
+
+    def _respond(self, request: web.Request, payload, status: int = 200) -> web.Response:
+        response = web.json_response(payload, status=status)
+        self.responses[(self._endpoint(request), status)] += 1
+        return response
+
+    @web.middleware
+    async def kinopoisk_guard(self, request: web.Request, handler):
+        """Проверка ключа, задержка и инъекция сбоев для Kinopoisk"""
+        if request.method == 'HEAD' or request.path == '/':
+            return web.Response()
+        api_key = request.headers.get('X-API-KEY')
+        if not api_key:
+            return web.json_response({"message": "unauthorized"}, status=401)
+        await self._delay()
+        fault = self._inject_fault(api_key)
+        if fault is not None:
+            self.responses[(self._endpoint(request), fault.status)] += 1
+            return fault
+        return await handler(request)
+
+    async def films(self, request: web.Request) -> web.Response:
+        keyword = request.query.get('keyword', '')
+        page = int(request.query.get('page', 1))
+        rnd = _rng('search', sorted(request.query.items()))
+        total = 0 if keyword.startswith('zzz') else rnd.randint(5, 400)
+        start = (page - 1) * PAGE_SIZE
+        ids = [rnd.randint(300, 5000000) for _ in range(total)][start:start + PAGE_SIZE]
+        return self._respond(request, make_page(ids, total))
+
+    async def film_details(self, request: web.Request) -> web.Response:
+        film_id = int(request.match_info['film_id'])
+        if film_id % 997 == 0:
+            return self._respond(request, {"message": "film not found"}, status=404)
+        return self._respond(request, make_film_details(film_id, self.faults.description_size))
+
+    async def collections(self, request: web.Request) -> web.Response:
+        collection_type = request.query.get('type', 'TOP_250_MOVIES')
+        page = int(request.query.get('page', 1))
+        total = COLLECTION_SIZES.get(collection_type, 100)
+        start = (page - 1) * PAGE_SIZE
+        rnd = _rng('collection', collection_type)
+        ids = [rnd.randint(300, 5000000) for _ in range(total)][start:start + PAGE_SIZE]
+        return self._respond(request, make_page(ids, total))
+
+    async def filters(self, request: web.Request) -> web.Response:
+        return self._respond(request, {
+            "genres": [{"id": idx, "genre": genre} for idx, genre in enumerate(GENRES, 1)],
+            "countries": [{"id": idx, "country": country} for idx, country in enumerate(COUNTRIES, 1)]
+        })
+
+    async def torrents(self, request: web.Request) -> web.Response:
+        await self._delay()
+        fault = self._inject_fault()
+        if fault is not None:
+            self.responses[(self._endpoint(request), fault.status)] += 1
+            return fault
+        search = request.query.get('search', '')
+        return self._respond(request, make_torrents(search, self.faults.torrents))
+
+    async def root(self, request: web.Request) -> web.Response:
+        return web.Response()
+
+    def kinopoisk_app(self) -> web.Application:
+        app = web.Application(middlewares=[self.kinopoisk_guard])
+        app.router.add_get('/', self.root)
+        app.router.add_get('/api/v2.2/films', self.films)
+        # filters и collections регистрируются раньше films/{id}
+        app.router.add_get('/api/v2.2/films/filters', self.filters)
+        app.router.add_get('/api/v2.2/films/collections', self.collections)
+        app.router.add_get(r'/api/v2.2/films/{film_id:\d+}', self.film_details)
+        return app
+
+    def jacred_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/', self.root)
+        app.router.add_get('/api/v1.0/torrents', self.torrents)
+        return app
+
+async def serve(args: argparse.Namespace):
+    faults = FaultConfig(
+        latency=parse_latency(args.latency),
+        rate_402=args.rate_402,
+        rate_429=args.rate_429,
+        rate_5xx=args.rate_5xx,
+        key_quota=args.key_quota,
+        description_size=args.description_size,
+        torrents=args.torrents
+    )
+    upstreams = FakeUpstreams(faults)
+    runners = []
+    for app, port in ((upstreams.kinopoisk_app(), args.kp_port), (upstreams.jacred_app(), args.jacred_port)):
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, args.host, port).start()
+        runners.append(runner)
+
+    logging.info(f"Kinopoisk stand-in: http://{args.host}:{args.kp_port}/api/v2.2")
+    logging.info(f"jacred stand-in:    http://{args.host}:{args.jacred_port}")
+    try:
+        while True:
+            await asyncio.sleep(args.report_interval)
+            if upstreams.responses:
+                logging.info(f"responses: {dict(upstreams.responses)}")
+    finally:
+        for runner in runners:
+            await runner.cleanup()
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Kinopoisk and jacred stand-ins")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--kp-port', type=int, default=8081)
+    parser.add_argument('--jacred-port', type=int, default=8082)
+    parser.add_argument('--latency', default='lognormal:80,0.5',
+                        help="fixed:MS | uniform:MIN,MAX | lognormal:MEDIAN,SIGMA | none")
+    parser.add_argument('--rate-402', type=float, default=0.0)
+    parser.add_argument('--rate-429', type=float, default=0.0)
+    parser.add_argument('--rate-5xx', type=float, default=0.0)
+    parser.add_argument('--key-quota', type=int, default=0, help="Requests per API key before 402 (0 - unlimited)")
+    parser.add_argument('--description-size', type=int, default=600)
+    parser.add_argument('--torrents', type=int, default=150, help="Max torrents per jacred response")
+    parser.add_argument('--report-interval', type=float, default=30.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [FAKE UPSTREAMS] %(message)s")
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from environs import Env
 
 @dataclass
@@ -8,11 +8,136 @@ class RedisConfig:
     db: int
     password: str | None = None
 
+@dataclass
+class HttpConfig:
+    limit: int = 100                 # Общий лимит соединений в пуле
+    limit_per_host: int = 20         # Лимит соединений на один хост
+    keepalive_timeout: float = 60.0  # Сколько держать простаивающее соединение открытым
+    dns_cache_ttl: int = 300         # Время жизни DNS-кэша в секундах
+    warmup_connections: int = 3      # Сколько соединений открыть заранее при старте
+
+@dataclass
+class CacheConfig:
+    enabled: bool = True
+    ttl_details: int = 24 * 3600     # Карточки фильмов меняются редко
+    ttl_top250: int = 24 * 3600      # Топ 250 практически статичен
+    ttl_collections: int = 3600      # Остальные подборки
+    ttl_search: int = 600            # Поиск по ключевому слову
+    ttl_filters: int = 3600          # Справочник жанров и стран
+    ttl_torrents: int = 1800         # Результаты поиска раздач на jacred
+    ttl_negative: int = 300          # Пустые результаты и 404 (отдельно от обычных записей, 0 - не кэшировать)
+    l1_max_bytes: int = 32 * 1024 * 1024  # Объем in-process кэша (L1) перед Redis
+    stale_ttl: int = 24 * 3600       # Сколько хранить устаревший ответ на случай недоступности API
+    filters_snapshot_path: str = "data/filters.json"  # Локальный снимок справочника фильтров
+
+@dataclass
+class KeySchedulerConfig:
+    rps: float = 20.0                # Лимит запросов в секунду на один ключ (лимит API)
+    burst: float = 20.0              # Емкость токен-бакета ключа
+    weights: list[int] = field(default_factory=list)  # Веса ключей (по умолчанию все равны 1)
+    quota_window: int = 3600         # Через сколько секунд повторно пробовать ключ после 402
+    rate_limit_cooldown: float = 1.0 # Пауза ключа после 429, если API не прислал Retry-After
+    max_wait: float = 5.0            # Максимальное ожидание свободного ключа
+    batch_concurrency: int = 5       # Одновременных запросов в пакетных методах API
+    daily_quota: int = 0             # Суточная квота запросов одного ключа (0 - неизвестна, учитываются только 402)
+
+@dataclass
+class ResilienceConfig:
+    retries: int = 2                 # Повторы идемпотентных GET при 5xx и сетевых ошибках
+    backoff_base: float = 0.2        # Базовая задержка экспоненциального отката
+    backoff_max: float = 2.0         # Максимальная задержка между повторами
+    breaker_failure_threshold: int = 5      # Ошибок подряд до размыкания предохранителя
+    breaker_recovery_timeout: float = 30.0  # Через сколько секунд пробовать хост снова
+
+@dataclass
+class EndpointTimeout:
+    connect: float                   # Установка соединения (включая TLS)
+    read: float                      # Ожидание данных от сервера
+    total: float                     # Весь запрос целиком
+
+@dataclass
+class TimeoutConfig:
+    details: EndpointTimeout = field(default_factory=lambda: EndpointTimeout(2.0, 5.0, 8.0))
+    search: EndpointTimeout = field(default_factory=lambda: EndpointTimeout(2.0, 6.0, 8.0))
+    collections: EndpointTimeout = field(default_factory=lambda: EndpointTimeout(2.0, 6.0, 8.0))
+    filters: EndpointTimeout = field(default_factory=lambda: EndpointTimeout(2.0, 8.0, 10.0))
+    jacred: EndpointTimeout = field(default_factory=lambda: EndpointTimeout(3.0, 10.0, 12.0))
+
+@dataclass
+class PrefetchConfig:
+    enabled: bool = True
+    concurrency: int = 2             # Одновременных фоновых предзагрузок
+
+@dataclass
+class UpstreamConfig:
+    # Адреса внешних API (переопределяются для запуска против локальных заглушек)
+    kinopoisk_base_url: str = "https://kinopoiskapiunofficial.tech/api/v2.2"
+    jacred_base_url: str = "https://jacred.xyz"
+
+@dataclass
+class HedgeConfig:
+    enabled: bool = False            # Дублировать медленные запросы карточек на другом ключе
+    quantile: float = 0.95           # После какого квантиля задержки отправлять дубль
+    max_ratio: float = 0.05          # Максимальная доля запросов с дублем (бережем квоту)
+    min_samples: int = 50            # Сколько ответов нужно для оценки квантиля
+    fallback_delay: float = 1.5      # Задержка дубля, пока статистики недостаточно
+    min_delay: float = 0.1           # Нижняя граница задержки дубля
+
+@dataclass
+class MetricsConfig:
+    port: int = 0                    # Порт эндпоинта /metrics (0 - выключен)
+    host: str = "127.0.0.1"
+
+@dataclass
+class WarmerConfig:
+    enabled: bool = True
+    interval: int = 6 * 3600         # Как часто обновлять снимки подборок
+    snapshot_ttl: int = 2 * 24 * 3600  # Сколько хранить снимок, если обновить его не удалось
+    page_delay: float = 0.5          # Пауза между страницами, чтобы не занимать ключи пачкой
+
+@dataclass
+class FairShareConfig:
+    enabled: bool = True
+    max_concurrency: int = 10        # Одновременных запросов к каждому внешнему API на весь бот
+    per_user_concurrency: int = 2    # Одновременных запросов одного пользователя
+    max_wait: float = 10.0           # Максимальное ожидание слота, если у апдейта нет крайнего срока
+    background_concurrency: int = 3  # Слотов для фоновых запросов (предзагрузка, обновление снимков)
+    preempt_budget: float = 0.3      # Ниже этой доли бюджета ключей фоновые запросы ждут
+    drop_prefetch_budget: float = 0.15  # Ниже этой доли бюджета предзагрузка отбрасывается
+
+@dataclass
+class SearchQueryConfig:
+    normalize: bool = True           # Свертывать регистр, ё/е и пробелы запроса в ключе кэша поиска
+    cursor_ttl: int = 3600           # Сколько хранить курсор результатов поиска (для листания и возврата к списку)
+    inline_cache_time: int = 300     # cache_time ответов инлайн-поиска (сколько Telegram хранит ответ у себя)
+
+@dataclass
+class FilmIndexConfig:
+    enabled: bool = True
+    path: str = "data/films.db"      # Файл SQLite с полнотекстовым индексом фильмов
+    max_films: int = 200000          # Лимит размера: сверх него вытесняются давно не встречавшиеся фильмы
+    min_local_hits: int = 0          # Сколько совпадений нужно, чтобы ответить на поиск без API (0 - только запасной вариант)
+    max_results: int = 200           # Максимум результатов локального поиска
+    flush_interval: float = 2.0      # Как часто записывать накопленные фильмы в базу
+
 @dataclass
 class Config:
     BOT_TOKEN: str
     KINOPOISK_API_KEYS: list[str]
     redis: RedisConfig
+    http: HttpConfig = field(default_factory=HttpConfig)
+    cache: CacheConfig = field(default_factory=CacheConfig)
+    key_scheduler: KeySchedulerConfig = field(default_factory=KeySchedulerConfig)
+    resilience: ResilienceConfig = field(default_factory=ResilienceConfig)
+    timeouts: TimeoutConfig = field(default_factory=TimeoutConfig)
+    prefetch: PrefetchConfig = field(default_factory=PrefetchConfig)
+    warmer: WarmerConfig = field(default_factory=WarmerConfig)
+    upstreams: UpstreamConfig = field(default_factory=UpstreamConfig)
+    metrics: MetricsConfig = field(default_factory=MetricsConfig)
+    hedge: HedgeConfig = field(default_factory=HedgeConfig)
+    film_index: FilmIndexConfig = field(default_factory=FilmIndexConfig)
+    search_query: SearchQueryConfig = field(default_factory=SearchQueryConfig)
+    fair_share: FairShareConfig = field(default_factory=FairShareConfig)
 
 def load_config() -> Config:
     env = Env()
@@ -30,6 +155,131 @@ def load_config() -> Config:
         db=env.int("REDIS_DB", 0),
         password=env.str("REDIS_PASSWORD", None)
     )
+
+    # Конфигурация пула HTTP соединений
+    http_config = HttpConfig(
+        limit=env.int("HTTP_POOL_LIMIT", 100),
+        limit_per_host=env.int("HTTP_POOL_LIMIT_PER_HOST", 20),
+        keepalive_timeout=env.float("HTTP_KEEPALIVE_TIMEOUT", 60.0),
+        dns_cache_ttl=env.int("HTTP_DNS_CACHE_TTL", 300),
+        warmup_connections=env.int("HTTP_WARMUP_CONNECTIONS", 3)
+    )
+
+    # Конфигурация кэша ответов Kinopoisk API
+    cache_config = CacheConfig(
+        enabled=env.bool("API_CACHE_ENABLED", True),
+        ttl_details=env.int("API_CACHE_TTL_DETAILS", 24 * 3600),
+        ttl_top250=env.int("API_CACHE_TTL_TOP250", 24 * 3600),
+        ttl_collections=env.int("API_CACHE_TTL_COLLECTIONS", 3600),
+        ttl_search=env.int("API_CACHE_TTL_SEARCH", 600),
+        ttl_filters=env.int("API_CACHE_TTL_FILTERS", 3600),
+        ttl_torrents=env.int("API_CACHE_TTL_TORRENTS", 1800),
+        ttl_negative=env.int("API_CACHE_TTL_NEGATIVE", 300),
+        l1_max_bytes=env.int("API_CACHE_L1_MAX_BYTES", 32 * 1024 * 1024),
+        stale_ttl=env.int("API_CACHE_STALE_TTL", 24 * 3600),
+        filters_snapshot_path=env.str("API_FILTERS_SNAPSHOT_PATH", "data/filters.json")
+    )
+        
+    # Конфигурация планировщика API-ключей
+    key_scheduler_config = KeySchedulerConfig(
+        rps=env.float("KINOPOISK_KEY_RPS", 20.0),
+        burst=env.float("KINOPOISK_KEY_BURST", 20.0),
+        weights=env.list("KINOPOISK_KEY_WEIGHTS", [], subcast=int),
+        quota_window=env.int("KINOPOISK_QUOTA_WINDOW", 3600),
+        rate_limit_cooldown=env.float("KINOPOISK_RATE_LIMIT_COOLDOWN", 1.0),
+        max_wait=env.float("KINOPOISK_KEY_MAX_WAIT", 5.0),
+        batch_concurrency=env.int("KINOPOISK_BATCH_CONCURRENCY", 5),
+        daily_quota=env.int("KINOPOISK_KEY_DAILY_QUOTA", 0)
+    )
+        
+    # Повторы и предохранители для внешних API
+    resilience_config = ResilienceConfig(
+        retries=env.int("UPSTREAM_RETRIES", 2),
+        backoff_base=env.float("UPSTREAM_BACKOFF_BASE", 0.2),
+        backoff_max=env.float("UPSTREAM_BACKOFF_MAX", 2.0),
+        breaker_failure_threshold=env.int("UPSTREAM_BREAKER_THRESHOLD", 5),
+        breaker_recovery_timeout=env.float("UPSTREAM_BREAKER_RECOVERY", 30.0)
+    )
+        
+    # Таймауты по классам эндпоинтов в формате "connect,read,total"
+    def endpoint_timeout(name: str, default: EndpointTimeout) -> EndpointTimeout:
+        values = env.list(name, [default.connect, default.read, default.total], subcast=float)
+        if len(values) != 3:
+            raise ValueError(f"{name} must contain three values: connect,read,total")
+        return EndpointTimeout(*values)
+
+    defaults = TimeoutConfig()
+    timeout_config = TimeoutConfig(
+        details=endpoint_timeout("TIMEOUT_DETAILS", defaults.details),
+        search=endpoint_timeout("TIMEOUT_SEARCH", defaults.search),
+        collections=endpoint_timeout("TIMEOUT_COLLECTIONS", defaults.collections),
+        filters=endpoint_timeout("TIMEOUT_FILTERS", defaults.filters),
+        jacred=endpoint_timeout("TIMEOUT_JACRED", defaults.jacred)
+    )
+        
+    # Фоновая предзагрузка страниц поиска
+    prefetch_config = PrefetchConfig(
+        enabled=env.bool("PREFETCH_ENABLED", True),
+        concurrency=env.int("PREFETCH_CONCURRENCY", 2)
+    )
+        
+    # Адреса внешних API
+    upstream_config = UpstreamConfig(
+        kinopoisk_base_url=env.str("KINOPOISK_BASE_URL", UpstreamConfig.kinopoisk_base_url).rstrip('/'),
+        jacred_base_url=env.str("JACRED_BASE_URL", UpstreamConfig.jacred_base_url).rstrip('/')
+    )
+
+    # Дублирование медленных запросов карточек фильмов
+    hedge_config = HedgeConfig(
+        enabled=env.bool("HEDGE_ENABLED", False),
+        quantile=env.float("HEDGE_QUANTILE", 0.95),
+        max_ratio=env.float("HEDGE_MAX_RATIO", 0.05),
+        min_samples=env.int("HEDGE_MIN_SAMPLES", 50),
+        fallback_delay=env.float("HEDGE_FALLBACK_DELAY", 1.5),
+        min_delay=env.float("HEDGE_MIN_DELAY", 0.1)
+    )
+
+    # Эндпоинт метрик в формате Prometheus
+    metrics_config = MetricsConfig(
+        port=env.int("METRICS_PORT", 0),
+        host=env.str("METRICS_HOST", "127.0.0.1")
+    )
+
+    # Фоновое обновление снимков подборок (топов)
+    warmer_config = WarmerConfig(
+        enabled=env.bool("TOPS_WARMER_ENABLED", True),
+        interval=env.int("TOPS_WARMER_INTERVAL", 6 * 3600),
+        snapshot_ttl=env.int("TOPS_SNAPSHOT_TTL", 2 * 24 * 3600),
+        page_delay=env.float("TOPS_WARMER_PAGE_DELAY", 0.5)
+    )
+        
+    # Локальный полнотекстовый индекс фильмов
+    film_index_config = FilmIndexConfig(
+        enabled=env.bool("FILM_INDEX_ENABLED", True),
+        path=env.str("FILM_INDEX_PATH", "data/films.db"),
+        max_films=env.int("FILM_INDEX_MAX_FILMS", 200000),
+        min_local_hits=env.int("FILM_INDEX_MIN_LOCAL_HITS", 0),
+        max_results=env.int("FILM_INDEX_MAX_RESULTS", 200),
+        flush_interval=env.float("FILM_INDEX_FLUSH_INTERVAL", 2.0)
+    )
+        
+    # Канонизация поисковых запросов
+    search_query_config = SearchQueryConfig(
+        normalize=env.bool("SEARCH_QUERY_NORMALIZE", True),
+        cursor_ttl=env.int("SEARCH_CURSOR_TTL", 3600),
+        inline_cache_time=env.int("SEARCH_INLINE_CACHE_TIME", 300)
+    )
+        
+    # Справедливое распределение запросов к API между пользователями
+    fair_share_config = FairShareConfig(
+        enabled=env.bool("FAIR_SHARE_ENABLED", True),
+        max_concurrency=env.int("UPSTREAM_MAX_CONCURRENCY", 10),
+        per_user_concurrency=env.int("UPSTREAM_PER_USER_CONCURRENCY", 2),
+        max_wait=env.float("UPSTREAM_QUEUE_MAX_WAIT", 10.0),
+        background_concurrency=env.int("UPSTREAM_BACKGROUND_CONCURRENCY", 3),
+        preempt_budget=env.float("BACKGROUND_PREEMPT_BUDGET", 0.3),
+        drop_prefetch_budget=env.float("PREFETCH_DROP_BUDGET", 0.15)
+    )
         
     api_keys_raw = env.str("KINOPOISK_API_KEYS")
     api_keys = [k.strip() for k in api_keys_raw.split(",") if k.strip()]
@@ -38,5 +288,18 @@ def load_config() -> Config:
     return Config(
         BOT_TOKEN=bot_token,
         KINOPOISK_API_KEYS=api_keys,
-        redis=redis_config
+        redis=redis_config,
+        http=http_config,
+        cache=cache_config,
+        key_scheduler=key_scheduler_config,
+        resilience=resilience_config,
+        timeouts=timeout_config,
+        prefetch=prefetch_config,
+        warmer=warmer_config,
+        upstreams=upstream_config,
+        metrics=metrics_config,
+        hedge=hedge_config,
+        film_index=film_index_config,
+        search_query=search_query_config,
+        fair_share=fair_share_config
     )
@@ -12,7 +12,7 @@ async def show_about(callback: types.CallbackQuery):
     """Показывает меню О боте"""
     message = await callback.message.edit_text(
         ABOUT_MESSAGE,
-        reply_markup=get_about_menu().as_markup(),
+        reply_markup=get_about_menu(),
         parse_mode="HTML",
         disable_web_page_preview=True
     )
@@ -25,7 +25,7 @@ async def show_about(callback: types.CallbackQuery):
 async def back_to_main_from_about(callback: types.CallbackQuery):
     await callback.message.edit_text(
         WELCOME_MESSAGE,
-        reply_markup=get_main_menu().as_markup(),
+        reply_markup=get_main_menu(),
         parse_mode="HTML"
     )
 
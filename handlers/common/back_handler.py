@@ -1,6 +1,6 @@
 from aiogram import types
 from aiogram.fsm.context import FSMContext
-from handlers.tops.basic import process_top_pagination, COLLECTION_TYPES, COLLECTION_NAMES, FILMS_PER_PAGE
+from handlers.tops.basic import process_top_pagination, COLLECTION_TYPES, COLLECTION_NAMES
 from handlers.search.basic import process_search_pagination
 from handlers.search.advanced import process_advanced_search_pagination
 from keyboards.main import get_main_menu
@@ -8,7 +8,6 @@ from constants import WELCOME_MESSAGE
 from services.kinopoisk_api import kinopoisk_api
 from keyboards.pagination import get_pagination_keyboard
 import logging
-from services.redis_service import RedisService
 
 async def handle_back_to_results(callback: types.CallbackQuery):
     try:
@@ -22,12 +21,8 @@ async def handle_back_to_results(callback: types.CallbackQuery):
         elif parts[0] == 'adv':  # Если это возврат к расширенному поиску
             search_hash = parts[1]
             page = int(parts[2])
-            redis_service = RedisService.get_instance()
-            search_data_json = await redis_service.get_query(f"adv_{search_hash}")  # Добавляем префикс adv_
-            if search_data_json:
-                await process_advanced_search_pagination(callback, search_hash, page)
-            else:
-                await callback.answer("Данные поиска не найдены")
+            # Страница берется из курсора результатов (adv_{hash}), повторного поиска нет
+            await process_advanced_search_pagination(callback, search_hash, page)
         else:  # Если это возврат к топу
             collection_type = parts[0]
             page = int(parts[1])
@@ -47,7 +42,7 @@ async def handle_main_menu(callback: types.CallbackQuery):
         if callback.message.content_type == 'text':
             await callback.message.edit_text(
                 WELCOME_MESSAGE,
-                reply_markup=get_main_menu().as_markup(),
+                reply_markup=get_main_menu(),
                 parse_mode="HTML"
             )
         else:
@@ -59,7 +54,7 @@ async def handle_main_menu(callback: types.CallbackQuery):
             
             await callback.message.answer(
                 WELCOME_MESSAGE,
-                reply_markup=get_main_menu().as_markup(),
+                reply_markup=get_main_menu(),
                 parse_mode="HTML"
             )
         
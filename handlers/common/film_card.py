@@ -1,8 +1,12 @@
+from typing import Optional, Tuple
 from aiogram import types, Router, F
+from aiogram.types import InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
+from models.film import FilmDetails
 from services.kinopoisk_api import kinopoisk_api
 from services.torrent_parser import TorrentParser
 from services.redis_service import RedisService  # Добавляем импорт
+from utils.deadline import Deadline
 import logging
 
 # Создаем роутер
@@ -10,7 +14,113 @@ router = Router()
 
 MAX_DESCRIPTION_LENGTH = 700
 
+# Источник карточки в callback_data (f_{id}_i): фильм выбран в инлайн-поиске, списка результатов нет
+INLINE_SOURCE = "i"
+
+def build_film_card(film: FilmDetails, film_id, back_callback_data: Optional[str] = None) -> Tuple[str, InlineKeyboardMarkup]:
+    """
+    Подпись и клавиатура карточки фильма
+
+    Args:
+        film: Данные фильма
+        film_id: ID фильма на Кинопоиске
+        back_callback_data: Коллбек возврата к списку результатов (None - карточка открыта не из списка)
+    """
+    # Форматируем информацию о фильме
+    name_ru = film.name_ru
+    name_en = film.name_en
+    
+    # Формируем название фильма
+    film_name = ""
+    if name_ru and name_en:
+        film_name = f"🇷🇺 <b>{name_ru}</b>\n🇺🇸 {name_en}"
+    elif name_ru:
+        film_name = f"🇷🇺 <b>{name_ru}</b>"
+    elif name_en:
+        film_name = f"🇷🇺 <b>{name_en}</b>"
+    else:
+        film_name = "🇷🇺 <b>Название отсутствует</b>"
+
+    # Обработка года выпуска
+    year = film.year
+    year = str(year) if year else "Отсутствует"
+
+    # Обработка рейтинга
+    rating = film.rating_kinopoisk
+    rating = str(rating) if rating else "Отсутствует"
+
+    # Обработка жанров - исправляем форматирование
+    genres = film.genres
+    genres_str = ', '.join(genre.capitalize() for genre in genres) if genres else "Отсутствуют"
+
+    # Обработка стран - исправляем форматирование
+    countries = film.countries
+    countries_str = ', '.join(countries) if countries else "Отсутствуют"
+
+    # Обработка описания
+    description = film.description
+
+    # Формируем базовую информацию
+    base_info = (
+        f"{film_name}\n\n"
+        f"📅 Год: {year}\n"
+        f"⭐ Рейтинг: {rating}\n"
+        f"🎭 Жанры: {genres_str}\n"
+        f"🌎 Страны: {countries_str}\n\n"
+        f"📝 Описание:\n"
+    )
+
+    # Проверяем, что description не None перед обработкой
+    if description:
+        # Обрезаем описание с учетом оставшегося места
+        available_length = MAX_DESCRIPTION_LENGTH - len(base_info)
+        if len(description) > available_length:
+            description = description[:available_length].rsplit(' ', 1)[0] + "..."
+    else:
+        description = "Описание отсутствует"
+
+    caption = base_info + description
+
+    # Создаем клавиатуру для карточки фильма
+    builder = InlineKeyboardBuilder()
+    
+    # Добавляем кнопку Назад (если карточка открыта из списка результатов)
+    if back_callback_data:
+        builder.button(
+            text="↩️ Назад к результатам",
+            callback_data=back_callback_data
+        )
+    
+    # Добавляем кнопку для просмотра торрентов
+    builder.button(
+        text="📥 Смотреть торренты",
+        callback_data=f"tp_{film_id}_1"  # Страница 1
+    )
+    
+    # Добавляем кнопку Кинопоиска
+    kinopoisk_app_link = f"https://www.kinopoisk.ru/film/{film_id}/"
+    builder.button(
+        text="🎥 Открыть в Кинопоиске",
+        url=kinopoisk_app_link
+    )
+    
+    # Добавляем кнопку главного меню
+    builder.button(
+        text="🏠 В Главное меню",
+        callback_data="main_menu"
+    )
+    
+    # Расположение кнопок: 1-2-1 (без кнопки Назад - 2-1)
+    if back_callback_data:
+        builder.adjust(1, 2, 1)
+    else:
+        builder.adjust(2, 1)
+
+    return caption, builder.as_markup()
+
 async def show_film_card(callback: types.CallbackQuery):
+    # Крайний срок ответа на нажатие кнопки: запросы к API, которые не успеют, отменяются
+    deadline = Deadline.for_callback()
     try:
         logging.info(f"[FILM CARD] Входящий callback_data: {callback.data}")
         parts = callback.data.split('_')
@@ -22,7 +132,10 @@ async def show_film_card(callback: types.CallbackQuery):
         redis_service = RedisService.get_instance()
         
         # Определяем тип коллекции и страницу
-        if len(parts) >= 4:  # Для поиска и расширенного поиска
+        if len(parts) == 3 and parts[2] == INLINE_SOURCE:  # Для фильма из инлайн-поиска
+            back_callback_data = None
+            await redis_service.store_query(f"film_callback_{film_id}", callback.data)
+        elif len(parts) >= 4:  # Для поиска и расширенного поиска
             if parts[3] == 'adv':  # Если это расширенный поиск
                 search_hash = parts[2]
                 back_callback_data = f"btr_adv_{search_hash}_{parts[4]}"  # Добавляем префикс btr_
@@ -43,115 +156,31 @@ async def show_film_card(callback: types.CallbackQuery):
         logging.info(f"[FILM CARD] Making back button with callback_data: {back_callback_data}")
         
         logging.info(f"[FILM CARD] Fetching film details for ID: {film_id}")
-        film = await kinopoisk_api.get_film_details(film_id)
+        film = await kinopoisk_api.get_film_details(film_id, deadline=deadline)
         
         if not film:
             logging.error(f"[FILM CARD] Failed to get film details for ID: {film_id}")
             await callback.answer("Не удалось получить информацию о фильме")
             return
 
-        # Форматируем информацию о фильме
-        name_ru = film.get('nameRu')
-        name_en = film.get('nameEn')
-        
-        # Формируем название фильма
-        film_name = ""
-        if name_ru and name_en:
-            film_name = f"🇷🇺 <b>{name_ru}</b>\n🇺🇸 {name_en}"
-        elif name_ru:
-            film_name = f"🇷🇺 <b>{name_ru}</b>"
-        elif name_en:
-            film_name = f"🇷🇺 <b>{name_en}</b>"
-        else:
-            film_name = "🇷🇺 <b>Название отсутствует</b>"
-
-        # Обработка года выпуска
-        year = film.get('year')
-        year = str(year) if year else "Отсутствует"
-
-        # Обработка рейтинга
-        rating = film.get('ratingKinopoisk')
-        rating = str(rating) if rating else "Отсутствует"
-
-        # Обработка жанров - исправляем форматирование
-        genres = film.get('genres', [])
-        genres_str = ', '.join(g['genre'].capitalize() for g in genres) if genres else "Отсутствуют"
-
-        # Обработка стран - исправляем форматирование
-        countries = film.get('countries', [])
-        countries_str = ', '.join(c['country'] for c in countries) if countries else "Отсутствуют"
-
-        # Обработка описания
-        description = film.get('description', 'Описание отсутствует')
-
-        # Формируем базовую информацию
-        base_info = (
-            f"{film_name}\n\n"
-            f"📅 Год: {year}\n"
-            f"⭐ Рейтинг: {rating}\n"
-            f"🎭 Жанры: {genres_str}\n"
-            f"🌎 Страны: {countries_str}\n\n"
-            f"📝 Описание:\n"
-        )
-
-        # Проверяем, что description не None перед обработкой
-        if description:
-            # Обрезаем описание с учетом оставшегося места
-            available_length = MAX_DESCRIPTION_LENGTH - len(base_info)
-            if len(description) > available_length:
-                description = description[:available_length].rsplit(' ', 1)[0] + "..."
-        else:
-            description = "Описание отсутствует"
-
-        caption = base_info + description
-
         # Обработка постера
-        poster_url = film.get('posterUrl')
-        if not poster_url:
+        if not film.poster_url:
             await callback.answer("Изображение фильма недоступно")
             return
 
-        # Создаем клавиатуру для карточки фильма
-        builder = InlineKeyboardBuilder()
-        
-        # Добавляем кнопку Назад
-        builder.button(
-            text="↩️ Назад к результатам",
-            callback_data=back_callback_data
-        )
-        
-        # Добавляем кнопку для просмотра торрентов
-        builder.button(
-            text="📥 Смотреть торренты",
-            callback_data=f"tp_{film_id}_1"  # Страница 1
-        )
-        
-        # Добавляем кнопку Кинопоиска
-        kinopoisk_app_link = f"https://www.kinopoisk.ru/film/{film_id}/"
-        builder.button(
-            text="🎥 Открыть в Кинопоиске",
-            url=kinopoisk_app_link
-        )
-        
-        # Добавляем кнопку главного меню
-        builder.button(
-            text="🏠 В Главное меню",
-            callback_data="main_menu"
-        )
-        
-        builder.adjust(1, 2, 1)  # Расположение кнопок: 1-2-1
+        caption, keyboard = build_film_card(film, film_id, back_callback_data)
 
         # Отправляем сообщение
         try:
             await callback.message.answer_photo(
-                photo=poster_url,
+                photo=film.poster_url,
                 caption=caption,
-                reply_markup=builder.as_markup(),
+                reply_markup=keyboard,
                 parse_mode="HTML"
             )
             await callback.message.delete()
         except Exception as e:
-            logging.error(f"[FILM CARD] Error sending photo: {str(e)}, builder data: {builder.buttons}")
+            logging.error(f"[FILM CARD] Error sending photo: {str(e)}, keyboard: {keyboard.inline_keyboard}")
             await callback.answer("Произошла ошибка при показе фильма")
 
     except Exception as e:
@@ -182,4 +211,4 @@ def register_film_card_handlers(router: Router):
     )
 
 # Экспортируем роутер и функцию регистрации
-__all__ = ["router", "show_film_card", "register_handlers", "register_film_card_handlers"]
+__all__ = ["router", "show_film_card", "build_film_card", "INLINE_SOURCE", "register_handlers", "register_film_card_handlers"]
@@ -90,7 +90,7 @@ async def handle_country_selection(message: types.Message):
         new_msg = await message.answer(
             "🔎 <b>Расширенный поиск</b>\n\n"
             "Выберите параметры для поиска:",
-            reply_markup=get_advanced_search_keyboard(filters).as_markup(),
+            reply_markup=get_advanced_search_keyboard(filters),
             parse_mode="HTML"
         )
         
@@ -5,6 +5,7 @@ from .countries import router as countries_router
 from .sorting import router as sorting_router
 from .years import router as years_router
 from .versions import router as versions_router  # Добавляем импорт
+from .search import router as search_router
 
 inline_router = Router(name="inline")
 
@@ -15,4 +16,5 @@ def setup_inline_router() -> Router:
     inline_router.include_router(sorting_router)
     inline_router.include_router(years_router)
     inline_router.include_router(versions_router)  # Добавляем роутер версий
+    inline_router.include_router(search_router)  # Поиск фильмов по названию (запросы без #)
     return inline_router
@@ -0,0 +1,149 @@
+from typing import List, Optional, Tuple
+from aiogram import Router, F, types
+from aiogram.types import InlineQueryResultArticle, InputTextMessageContent
+from core import load_config
+from handlers.common.film_card import build_film_card, INLINE_SOURCE
+from keyboards.main import get_main_menu
+from models.film import FilmSummary
+from services.cache import LRUCache, MISSING
+from services.kinopoisk_api import kinopoisk_api
+from services.metrics import registry
+from services.redis_service import RedisService
+from utils.deadline import Deadline
+from utils.validators import TextValidator
+import logging
+import time
+
+router = Router()
+
+config = load_config()
+
+# Короче этого запросы не ищем: Telegram присылает инлайн-запрос на каждое изменение текста
+MIN_QUERY_LENGTH = 2
+
+# Готовые ответы инлайн-поиска, общие для всех пользователей:
+# "{канонический запрос}:{страница API}" -> (результаты, next_offset)
+_answers = LRUCache(4 * 1024 * 1024)
+# Приблизительный объем одного результата в памяти (для лимита кэша ответов)
+_RESULT_SIZE = 1024
+
+INLINE_ANSWERS = registry.counter(
+    "inline_search_answers_total", "Inline search answers by source", ("source",)
+)
+
+def _film_result(film: FilmSummary) -> InlineQueryResultArticle:
+    """Фильм в результатах инлайн-поиска: при выборе в чат уходит film_{id}, бот отвечает карточкой"""
+    title = film.name or 'Нет названия'
+    if film.year:
+        title += f" ({film.year})"
+    description = "🎥 Сериал" if film.is_series else "🍿 Фильм"
+    if film.rating_kinopoisk:
+        description += f" | ⭐ {film.rating_kinopoisk}"
+    return InlineQueryResultArticle(
+        id=str(film.kinopoisk_id),
+        title=title,
+        description=description,
+        thumbnail_url=film.poster_url_preview,
+        input_message_content=InputTextMessageContent(message_text=f"film_{film.kinopoisk_id}")
+    )
+
+async def _build_answer(query: str, page: int,
+                        deadline: Deadline) -> Optional[Tuple[List[InlineQueryResultArticle], str]]:
+    """Результаты для страницы API и offset следующей страницы ("" - страниц больше нет)"""
+    result = await kinopoisk_api.search_films(query, page, deadline=deadline)
+    if not result:
+        return None
+
+    results, seen = [], set()
+    for film in result.get('items', []):
+        # ID результатов в одном ответе должны быть уникальны
+        if not film.kinopoisk_id or film.kinopoisk_id in seen:
+            continue
+        seen.add(film.kinopoisk_id)
+        results.append(_film_result(film))
+
+    # Одна порция инлайн-ответа - одна страница API, offset - номер следующей
+    has_next = bool(results) and page < result.get('totalPages', 0)
+    if has_next and not result.get('local'):
+        # Пользователь, скорее всего, прокрутит дальше - прогреваем кэш следующей страницы
+        kinopoisk_api.prefetch_search(query, page + 1)
+    return results, str(page + 1) if has_next else ""
+
+@router.inline_query(F.query.regexp(r'^(?!#)'))  # Все запросы, которые НЕ начинаются с # (фильтры, инфо)
+async def search_inline_query(query: types.InlineQuery):
+    """Поиск фильмов по названию в инлайн-режиме (@бот название)"""
+    deadline = Deadline.for_inline_query()
+    cache_time = config.search_query.inline_cache_time
+
+    text = query.query.strip()
+    if len(text) < MIN_QUERY_LENGTH:
+        await query.answer(results=[], cache_time=cache_time)
+        return
+    safe_query = TextValidator.sanitize_text(text)
+    canonical_query = kinopoisk_api.canonical_query(safe_query)
+    if len(canonical_query) < MIN_QUERY_LENGTH:
+        await query.answer(results=[], cache_time=cache_time)
+        return
+
+    try:
+        page = max(1, int(query.offset)) if query.offset else 1
+    except ValueError:
+        page = 1
+
+    # Ответ зависит только от запроса и страницы: собираем его один раз для всех пользователей
+    cache_key = f"{canonical_query}:{page}"
+    answer = _answers.get(cache_key)
+    if answer is MISSING:
+        answer = await _build_answer(safe_query, page, deadline)
+        if answer is None:
+            INLINE_ANSWERS.inc(source="error")
+            logging.warning(f"[INLINE SEARCH] Search failed for {canonical_query!r}, page {page}")
+            # Короткий cache_time: когда API снова станет доступен, Telegram переспросит бота
+            await query.answer(results=[], cache_time=5, is_personal=True)
+            return
+        _answers.set(
+            cache_key, answer, _RESULT_SIZE * max(len(answer[0]), 1), time.time() + config.cache.ttl_search
+        )
+        INLINE_ANSWERS.inc(source="search")
+    else:
+        INLINE_ANSWERS.inc(source="cache")
+
+    results, next_offset = answer
+    await query.answer(results=results, next_offset=next_offset, cache_time=cache_time)
+
+@router.message(F.text.regexp(r'^film_\d+$'))
+async def handle_film_selection(message: types.Message):
+    """Фильм выбран в инлайн-поиске: заменяем служебное сообщение карточкой фильма"""
+    deadline = Deadline.for_callback()
+    film_id = message.text.split('_', 1)[1]
+    try:
+        await message.delete()
+    except Exception:
+        pass  # Сообщение уже удалено
+
+    try:
+        film = await kinopoisk_api.get_film_details(film_id, deadline=deadline)
+        if not film or not film.poster_url:
+            await message.answer(
+                "😕 Не удалось получить информацию о фильме.",
+                reply_markup=get_main_menu()
+            )
+            return
+
+        # Коллбек карточки нужен торрентам для кнопки "Назад к фильму"
+        redis_service = RedisService.get_instance()
+        await redis_service.store_query(f"film_callback_{film_id}", f"f_{film_id}_{INLINE_SOURCE}")
+
+        caption, keyboard = build_film_card(film, film_id)
+        await message.answer_photo(
+            photo=film.poster_url,
+            caption=caption,
+            reply_markup=keyboard,
+            parse_mode="HTML"
+        )
+    except Exception as e:
+        logging.error(f"[INLINE SEARCH] Error showing film {film_id}: {e}")
+        await message.answer(
+            "😕 Произошла ошибка при показе фильма.",
+            reply_markup=get_main_menu()
+        )
@@ -30,7 +30,7 @@ async def back_to_about(callback: types.CallbackQuery):
     try:
         message = await callback.message.edit_text(
             ABOUT_MESSAGE,
-            reply_markup=get_about_menu().as_markup(),
+            reply_markup=get_about_menu(),
             parse_mode="HTML",
             disable_web_page_preview=True
         )
@@ -7,10 +7,13 @@ from keyboards.pagination import get_pagination_keyboard
 from keyboards.search import get_cancel_keyboard_adv
 from services.redis_service import RedisService
 from services.kinopoisk_api import kinopoisk_api
+from services.search_cursor import search_cursors
 from constants import WELCOME_MESSAGE, ADV_SEARCH_RESULTS_TEMPLATE
-from handlers.search.basic import FILMS_PER_PAGE  # Оставляем только эту константу
+from utils.pagination import slice_ui_page, get_total_ui_pages
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from utils.validators import TextValidator
+from utils.deadline import Deadline
+from utils import codec
 from aiogram.filters.callback_data import CallbackData
 import logging
 import json
@@ -37,7 +40,7 @@ async def show_advanced_search(callback: types.CallbackQuery):
         edited_msg = await callback.message.edit_text(
             "🔎 <b>Расширенный поиск</b>\n\n"
             "Выберите параметры для поиска:",
-            reply_markup=get_advanced_search_keyboard(filters).as_markup(),
+            reply_markup=get_advanced_search_keyboard(filters),
             parse_mode="HTML"
         )
         
@@ -102,7 +105,7 @@ async def process_genre_selection(callback: types.CallbackQuery):
         new_msg = await callback.message.answer(
             "🔎 <b>Расширенный поиск</b>\n\n"
             "Выберите параметры для поиска:",
-            reply_markup=get_advanced_search_keyboard(filters).as_markup(),
+            reply_markup=get_advanced_search_keyboard(filters),
             parse_mode="HTML"
         )
         
@@ -141,7 +144,7 @@ async def process_rating_selection(callback: types.CallbackQuery):
         new_msg = await callback.message.answer(
             "🔎 <b>Расширенный поиск</b>\n\n"
             "Выберите параметры для поиска:",
-            reply_markup=get_advanced_search_keyboard(filters).as_markup(),
+            reply_markup=get_advanced_search_keyboard(filters),
             parse_mode="HTML"
         )
         
@@ -180,7 +183,7 @@ async def process_sort_selection(callback: types.CallbackQuery):
         new_msg = await callback.message.answer(
             "🔎 <b>Расширенный поиск</b>\n\n"
             "Выберите параметры для поиска:",
-            reply_markup=get_advanced_search_keyboard(filters).as_markup(),
+            reply_markup=get_advanced_search_keyboard(filters),
             parse_mode="HTML"
         )
         
@@ -204,7 +207,7 @@ async def reset_filters(callback: types.CallbackQuery):
         new_msg = await callback.message.answer(
             "🔎 <b>Расширенный поиск</b>\n\n"
             "Выберите параметры для поиска:",
-            reply_markup=get_advanced_search_keyboard({}).as_markup(),
+            reply_markup=get_advanced_search_keyboard({}),
             parse_mode="HTML"
         )
         
@@ -225,14 +228,14 @@ async def get_user_filters(user_id: int) -> dict:
     """Получает сохраненные фильтры пользователя"""
     redis_service = RedisService.get_instance()
     filters_json = await redis_service.get(f"searchFilters:{user_id}")
-    return json.loads(filters_json) if filters_json else {}
+    return codec.loads(filters_json) if filters_json else {}
 
 async def save_user_filters(user_id: int, filters: dict):
     """Сохраняет фильтры пользователя"""
     redis_service = RedisService.get_instance()
     await redis_service.set(
         f"searchFilters:{user_id}",
-        json.dumps(filters),
+        codec.dumps(filters),
         ex=3600  # Храним 1 час
     )
 
@@ -261,7 +264,7 @@ async def back_to_main_menu(callback: types.CallbackQuery):
     """Возвращает пользователя в главное меню"""
     await callback.message.edit_text(
         WELCOME_MESSAGE,
-        reply_markup=get_main_menu().as_markup(),
+        reply_markup=get_main_menu(),
         parse_mode="HTML"
     )
     await callback.answer()
@@ -288,7 +291,7 @@ async def cancel_advanced_search(callback: types.CallbackQuery, state: FSMContex
     # Редактируем текущее сообщение, возвращая главное меню
     await callback.message.edit_text(
         text=WELCOME_MESSAGE,
-        reply_markup=get_main_menu().as_markup(),
+        reply_markup=get_main_menu(),
         parse_mode="HTML"
     )
     await callback.answer()
@@ -310,7 +313,7 @@ async def start_filtered_search(callback: types.CallbackQuery, state: FSMContext
     # Отправляем новое сообщение с кнопкой отмены
     cancel_message = await callback.message.answer(
         "🔍 Введите название фильма для поиска:",
-        reply_markup=get_cancel_keyboard_adv().as_markup()
+        reply_markup=get_cancel_keyboard_adv()
     )
     
     # Сохраняем message_id для последующего удаления
@@ -393,30 +396,32 @@ async def process_advanced_search_query(message: types.Message, state: FSMContex
 
         logging.info(f"[ADVANCED SEARCH] Prepared API filters: {api_filters}")
 
-        search_id = generate_advanced_search_id(safe_query, user_id)
-        search_data = {
-            'query': safe_query,
-            'filters': api_filters
-        }
-        await redis_service.store_query(f"adv_{search_id}", json.dumps(search_data))
+        # Ключ поиска - по канонической форме, в API и пользователю уходит исходный текст
+        canonical_query = kinopoisk_api.canonical_query(safe_query)
+        search_id = generate_advanced_search_id(canonical_query, user_id)
 
         result = await kinopoisk_api.search_films(safe_query, 1, api_filters)
         
         if not result:
             await message.answer(
                 "😕 Ничего не найдено. Попробуйте изменить параметры поиска.",
-                reply_markup=get_main_menu().as_markup()
+                reply_markup=get_main_menu()
             )
             if cancel_message:
                 await cancel_message.delete()
             await state.clear()
             return
 
+        # Курсор результатов: листание и возврат из карточки идут без повторного поиска
+        cursor = await search_cursors.create(f"adv_{search_id}", safe_query, safe_query, api_filters, result)
+
         total_films = result.get('total', 0)
-        films = result.get('items', [])[:FILMS_PER_PAGE]
-        total_pages = (total_films + FILMS_PER_PAGE - 1) // FILMS_PER_PAGE
+        films = slice_ui_page(result.get('items', []), 1)
+        total_pages = get_total_ui_pages(total_films, result.get('totalPages'))
 
-        keyboard = get_pagination_keyboard(f"adv_{search_id}", 1, total_pages, films)
+        keyboard = get_pagination_keyboard(
+            f"adv_{search_id}", 1, total_pages, films, result_set=str(cursor['version']) if cursor else None
+        )
 
         # Удаляем сообщение пользователя с запросом
         await message.delete()
@@ -433,7 +438,7 @@ async def process_advanced_search_query(message: types.Message, state: FSMContex
                 page=1,
                 total_pages=total_pages
             ),
-            reply_markup=keyboard.as_markup(),
+            reply_markup=keyboard,
             parse_mode="HTML"
         )
 
@@ -443,7 +448,7 @@ async def process_advanced_search_query(message: types.Message, state: FSMContex
         logging.error(f"[ADVANCED SEARCH] Error: {e}")
         await message.answer(
             "😕 Произошла ошибка при поиске. Попробуйте позже.",
-            reply_markup=get_main_menu().as_markup()
+            reply_markup=get_main_menu()
         )
         if cancel_message:
             await cancel_message.delete()
@@ -480,6 +485,7 @@ def format_search_results(query: str, filters: str, total_films: int, page: int,
 
 @router.callback_query(lambda c: c.data.startswith('adv_'))
 async def handle_advanced_search_pagination(callback: types.CallbackQuery):
+    deadline = Deadline.for_callback()
     try:
         parts = callback.data.split('_')
         if len(parts) != 4:
@@ -488,46 +494,32 @@ async def handle_advanced_search_pagination(callback: types.CallbackQuery):
         search_hash = parts[1]
         page = int(parts[3])
         
-        redis_service = RedisService.get_instance()
-        search_data_json = await redis_service.get_query(f"adv_{search_hash}")
-        if not search_data_json:
+        page_data = await search_cursors.get_page(f"adv_{search_hash}", page, deadline=deadline)
+        if not page_data:
             await callback.answer("Произошла ошибка при поиске")
             return
-            
-        search_data = json.loads(search_data_json)
-        query = search_data['query']
-        api_filters = search_data['filters']
-        
-        # Используем логику из базового поиска
-        api_page = (page - 1) // 2 + 1
-        result = await kinopoisk_api.search_films(query, api_page, api_filters)
+        cursor, films = page_data
+        query_text = cursor.get('text', cursor['query'])
+        total_films = cursor['total']
+        total_pages = get_total_ui_pages(total_films, cursor['totalPages'])
         
-        if not result:
-            await callback.answer("Ничего не найдено")
-            return
-            
-        total_films = result.get('total', 0)
-        total_pages = (total_films + FILMS_PER_PAGE - 1) // FILMS_PER_PAGE
-        
-        # Получаем список фильмов и выбираем нужную половину
-        films = result.get('items', [])
-        start_idx = ((page - 1) % 2) * FILMS_PER_PAGE
-        films = films[start_idx:start_idx + FILMS_PER_PAGE]
-        
-        keyboard = get_pagination_keyboard(f"adv_{search_hash}", page, total_pages, films)
+        keyboard = get_pagination_keyboard(
+            f"adv_{search_hash}", page, total_pages, films, result_set=str(cursor['version'])
+        )
         
+        redis_service = RedisService.get_instance()
         filters, _ = await redis_service.get_search_filters(callback.from_user.id)
         filters_display = format_filters_for_display(filters)
         
         await callback.message.edit_text(
             text=format_search_results(
-                query=query,
+                query=query_text,
                 filters=filters_display,
                 total_films=total_films,
                 page=page,
                 total_pages=total_pages
             ),
-            reply_markup=keyboard.as_markup(),
+            reply_markup=keyboard,
             parse_mode="HTML"
         )
         
@@ -537,61 +529,46 @@ async def handle_advanced_search_pagination(callback: types.CallbackQuery):
 
 async def process_advanced_search_pagination(callback: types.CallbackQuery, search_hash: str, page: int):
     """Обрабатывает пагинацию в результатах расширенного поиска"""
-    redis_service = RedisService.get_instance()
     try:
-        search_data_json = await redis_service.get_query(f"adv_{search_hash}")
-        if not search_data_json:
-            logging.error(f"[ADVANCED SEARCH] Failed to get search data from Redis for hash: {search_hash}")
+        page_data = await search_cursors.get_page(f"adv_{search_hash}", page, deadline=Deadline.for_callback())
+        if not page_data:
+            logging.error(f"[ADVANCED SEARCH] No search cursor or page {page} for hash: {search_hash}")
             await callback.answer("Произошла ошибка при поиске")
             return
-            
-        search_data = json.loads(search_data_json)
-        original_query = search_data['query']
-        filters = search_data['filters']
-            
-        # Вычисляем правильную страницу для API
-        api_page = (page - 1) // 2 + 1
-        result = await kinopoisk_api.search_films(original_query, api_page, filters)
-        
-        if not result:
-            await callback.answer("Произошла ошибка при поиске")
-            return
-
-        total_films = result.get('total', 0)
-        films = result.get('items', [])
-        
-        # Вычисляем правильный срез для текущей страницы
-        start_idx = ((page - 1) % 2) * FILMS_PER_PAGE
-        films = films[start_idx:start_idx + FILMS_PER_PAGE]
-        
-        total_pages = (total_films + FILMS_PER_PAGE - 1) // FILMS_PER_PAGE
-
-        keyboard = get_pagination_keyboard(f"adv_{search_hash}", page, total_pages, films)
+        cursor, films = page_data
+        query_text = cursor.get('text', cursor['query'])
+        filters = cursor['filters']
+        total_films = cursor['total']
+        total_pages = get_total_ui_pages(total_films, cursor['totalPages'])
+
+        keyboard = get_pagination_keyboard(
+            f"adv_{search_hash}", page, total_pages, films, result_set=str(cursor['version'])
+        )
 
         # Проверяем, является ли это возвратом из карточки фильма
         if callback.data.startswith('btr_'):
             await callback.message.delete()
             await callback.message.answer(
                 text=format_search_results(
-                    query=original_query,
+                    query=query_text,
                     filters=format_filters_for_display(filters),
                     total_films=total_films,
                     page=page,
                     total_pages=total_pages
                 ),
-                reply_markup=keyboard.as_markup(),
+                reply_markup=keyboard,
                 parse_mode="HTML"
             )
         else:
             await callback.message.edit_text(
                 text=format_search_results(
-                    query=original_query,
+                    query=query_text,
                     filters=format_filters_for_display(filters),
                     total_films=total_films,
                     page=page,
                     total_pages=total_pages
                 ),
-                reply_markup=keyboard.as_markup(),
+                reply_markup=keyboard,
                 parse_mode="HTML"
             )
 
@@ -622,7 +599,7 @@ async def return_to_filters(callback: types.CallbackQuery):
         edited_msg = await callback.message.edit_text(
             "🔎 <b>Расширенный поиск</b>\n\n"
             "Выберите параметры для поиска:",
-            reply_markup=get_advanced_search_keyboard(filters).as_markup(),
+            reply_markup=get_advanced_search_keyboard(filters),
             parse_mode="HTML"
         )
         
@@ -655,30 +632,26 @@ async def search_by_filters_only(callback: types.CallbackQuery):
         await callback.message.delete()
         
         # Сразу делаем поиск с пустым query
-        result = await kinopoisk_api.search_films("", 1, filters)
+        result = await kinopoisk_api.search_films("", 1, filters, deadline=Deadline.for_callback())
         
         if not result:
             await callback.message.answer(
                 "😕 Ничего не найдено. Попробуйте изменить параметры поиска.",
-                reply_markup=get_main_menu().as_markup()
+                reply_markup=get_main_menu()
             )
             return
 
         total_films = result.get('total', 0)
-        films = result.get('items', [])[:FILMS_PER_PAGE]
-        total_pages = (total_films + FILMS_PER_PAGE - 1) // FILMS_PER_PAGE
+        films = slice_ui_page(result.get('items', []), 1)
+        total_pages = get_total_ui_pages(total_films, result.get('totalPages'))
 
         # Генерируем search_id и сохраняем данные поиска
         search_id = generate_advanced_search_id("", user_id)
-        await redis_service.store_query(
-            f"adv_{search_id}",
-            json.dumps({
-                'query': "",
-                'filters': filters
-            })
-        )
+        cursor = await search_cursors.create(f"adv_{search_id}", "", "", filters, result)
 
-        keyboard = get_pagination_keyboard(f"adv_{search_id}", 1, total_pages, films)
+        keyboard = get_pagination_keyboard(
+            f"adv_{search_id}", 1, total_pages, films, result_set=str(cursor['version']) if cursor else None
+        )
         
         await callback.message.answer(
             format_search_results(
@@ -688,7 +661,7 @@ async def search_by_filters_only(callback: types.CallbackQuery):
                 page=1,
                 total_pages=total_pages
             ),
-            reply_markup=keyboard.as_markup(),
+            reply_markup=keyboard,
             parse_mode="HTML"
         )
 
@@ -696,5 +669,5 @@ async def search_by_filters_only(callback: types.CallbackQuery):
         logging.error(f"[ADVANCED SEARCH] Error in filters-only search: {e}")
         await callback.message.answer(
             "Произошла ошибка при поиске. Попробуйте позже.",
-            reply_markup=get_main_menu().as_markup()
+            reply_markup=get_main_menu()
         )
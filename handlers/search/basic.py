@@ -2,21 +2,19 @@ from aiogram import Router, F, types
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from services.kinopoisk_api import kinopoisk_api
-from services.redis_service import RedisService
+from services.search_cursor import search_cursors
 from keyboards.pagination import get_pagination_keyboard, get_short_hash
 from keyboards.search import get_cancel_keyboard
 from keyboards.main import get_main_menu
 from constants import WELCOME_MESSAGE, BASIC_SEARCH_RESULTS_TEMPLATE
 import logging
-import json  # Добавляем импорт json
 from utils.validators import TextValidator
+from utils.deadline import Deadline
+from utils.pagination import slice_ui_page, get_total_ui_pages
 
 # Create router instance
 router = Router()
 
-# Количество фильмов на странице
-FILMS_PER_PAGE = 10
-
 class SearchStates(StatesGroup):
     waiting_for_query = State()
 
@@ -24,7 +22,7 @@ async def start_search(callback: types.CallbackQuery, state: FSMContext):
     """Начинает процесс поиска"""
     cancel_message = await callback.message.edit_text(
         "🔍 Введите название фильма для поиска:",
-        reply_markup=get_cancel_keyboard().as_markup()
+        reply_markup=get_cancel_keyboard()
     )
     await state.set_data({'cancel_message': cancel_message})
     await state.set_state(SearchStates.waiting_for_query)
@@ -44,12 +42,15 @@ async def process_search_query(message: types.Message, state: FSMContext):
     state_data = await state.get_data()
     cancel_message = state_data.get('cancel_message')
     
+    # ID поиска - по канонической форме запроса, в API и пользователю уходит то, что он ввел
+    canonical_query = kinopoisk_api.canonical_query(safe_query)
+
     # Получаем результаты поиска (первая страница API)
     result = await kinopoisk_api.search_films(safe_query, 1)
     if not result:
         await message.answer(
             "😕 Произошла ошибка при поиске. Попробуйте позже.",
-            reply_markup=get_main_menu().as_markup()
+            reply_markup=get_main_menu()
         )
         # Удаляем сообщение с кнопкой отмены
         if cancel_message:
@@ -61,7 +62,7 @@ async def process_search_query(message: types.Message, state: FSMContext):
     if total_films == 0:
         await message.answer(
             "😕 По вашему запросу ничего не найдено.",
-            reply_markup=get_main_menu().as_markup()
+            reply_markup=get_main_menu()
         )
         # Удаляем сообщение с кнопкой отмены
         if cancel_message:
@@ -69,25 +70,25 @@ async def process_search_query(message: types.Message, state: FSMContext):
         await state.clear()
         return
 
-    films = result.get('items', [])[:FILMS_PER_PAGE]
-    total_pages = (total_films + FILMS_PER_PAGE - 1) // FILMS_PER_PAGE
+    films = slice_ui_page(result.get('items', []), 1)
+    total_pages = get_total_ui_pages(total_films, result.get('totalPages'))
 
-    # Генерируем query_id и сохраняем в Redis
-    query_id = get_short_hash(safe_query)
-    logging.info(f"[SEARCH] Generated query_id: {query_id} for search query: {safe_query}")
+    # Генерируем query_id и сохраняем курсор результатов в Redis
+    query_id = get_short_hash(canonical_query)
+    logging.info(f"[SEARCH] Generated query_id: {query_id} for search query: {canonical_query}")
     
-    redis_service = RedisService.get_instance()
-    if not await redis_service.store_query(query_id, safe_query):
-        logging.error(f"[SEARCH] Failed to store search query in Redis. query_id: {query_id}, query: {safe_query}")
+    cursor = await search_cursors.create(query_id, safe_query, safe_query, None, result)
+    if not cursor:
+        logging.error(f"[SEARCH] Failed to store search cursor in Redis. query_id: {query_id}, query: {safe_query}")
         await message.answer(
             "😕 Произошла ошибка. Попробуйте позже.",
-            reply_markup=get_main_menu().as_markup()
+            reply_markup=get_main_menu()
         )
         await state.clear()
         return
 
     # Используем query_id в callback_data
-    keyboard = get_pagination_keyboard(f"s_{query_id}", 1, total_pages, films)
+    keyboard = get_pagination_keyboard(f"s_{query_id}", 1, total_pages, films, result_set=str(cursor['version']))
 
     message_text = BASIC_SEARCH_RESULTS_TEMPLATE.format(
         query=safe_query,
@@ -106,14 +107,14 @@ async def process_search_query(message: types.Message, state: FSMContext):
             
         await message.answer(
             text=message_text,
-            reply_markup=keyboard.as_markup(),
+            reply_markup=keyboard,
             parse_mode="HTML"
         )
     except Exception as e:
         logging.error(f"[SEARCH] Error sending message: {e}")
         await message.answer(
             "😕 Произошла ошибка. Попробуйте позже.",
-            reply_markup=get_main_menu().as_markup()
+            reply_markup=get_main_menu()
         )
 
     await state.clear()
@@ -139,41 +140,31 @@ async def handle_search_pagination(callback: types.CallbackQuery):
 
 async def process_search_pagination(callback: types.CallbackQuery, search_hash: str, page: int):
     """Обрабатывает пагинацию в результатах поиска"""
-    redis_service = RedisService.get_instance()
     try:
-        # Получаем оригинальный поисковый запрос из Redis по query_id
-        original_query = await redis_service.get_query(search_hash)
-        if not original_query:
-            logging.error(f"[SEARCH] Failed to get query from Redis for query_id: {search_hash}")
+        # Страница из курсора результатов: повторный поиск не нужен,
+        # API вызывается, только если пользователь листает дальше загруженного
+        page_data = await search_cursors.get_page(search_hash, page, deadline=Deadline.for_callback())
+        if not page_data:
+            logging.error(f"[SEARCH] No search cursor or page {page} for query_id: {search_hash}")
             await callback.answer("Произошла ошибка при поиске")
             return
-            
-        # Используем оригинальный запрос для API
-        api_page = (page - 1) // 2 + 1
-        result = await kinopoisk_api.search_films(original_query, api_page)
-        
-        if not result:
-            await callback.answer("Произошла ошибка при поиске")
-            return
-            
-        total_films = result.get('total', 0)
-        total_pages = (total_films + FILMS_PER_PAGE - 1) // FILMS_PER_PAGE
-        
-        # Получаем список фильмов и выбираем нужную половину
-        films = result.get('items', [])
-        start_idx = ((page - 1) % 2) * FILMS_PER_PAGE
-        films = films[start_idx:start_idx + FILMS_PER_PAGE]
+        cursor, films = page_data
+        query_text = cursor.get('text', cursor['query'])
+        total_films = cursor['total']
+        total_pages = get_total_ui_pages(total_films, cursor['totalPages'])
         
         # Формируем сообщение
         message_text = BASIC_SEARCH_RESULTS_TEMPLATE.format(
-            query=original_query,
+            query=query_text,
             page=page,
             total_pages=total_pages,
             total_films=total_films
         )
         
         # Создаем клавиатуру с пагинацией, используя query_id
-        keyboard = get_pagination_keyboard(f"s_{search_hash}", page, total_pages, films)
+        keyboard = get_pagination_keyboard(
+            f"s_{search_hash}", page, total_pages, films, result_set=str(cursor['version'])
+        )
         
         # Удаляем текущее сообщение (карточку фильма)
         await callback.message.delete()
@@ -181,7 +172,7 @@ async def process_search_pagination(callback: types.CallbackQuery, search_hash:
         # Отправляем новое сообщение с результатами поиска
         await callback.message.answer(
             text=message_text,
-            reply_markup=keyboard.as_markup(),
+            reply_markup=keyboard,
             parse_mode="HTML"
         )
         
@@ -211,7 +202,7 @@ async def cancel_search(callback: types.CallbackQuery, state: FSMContext):
     # Редактируем текущее сообщение, возвращая главное меню
     await callback.message.edit_text(
         text=WELCOME_MESSAGE,
-        reply_markup=get_main_menu().as_markup(),
+        reply_markup=get_main_menu(),
         parse_mode="HTML"
     )
     
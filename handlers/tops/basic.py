@@ -1,8 +1,10 @@
 from aiogram import Router, F, types
 from keyboards.tops import get_tops_menu
 from keyboards.pagination import get_pagination_keyboard
-from services.kinopoisk_api import kinopoisk_api
+from services.collection_warmer import collection_warmer
 from constants import TOPS_RESULTS_TEMPLATE
+from utils.deadline import Deadline
+from utils.pagination import get_api_page, slice_ui_page, get_total_ui_pages
 import logging
 
 # Словарь соответствия callback_data и типов коллекций API
@@ -21,16 +23,13 @@ COLLECTION_NAMES = {
     "tcin": "🎬 Сейчас в кино"
 }
 
-# Количество фильмов на странице
-FILMS_PER_PAGE = 10
-
 async def show_tops_menu(callback: types.CallbackQuery):
     """Показывает меню с топами фильмов"""
     try:
         await callback.message.edit_text(
             "🏆 <b>Топы фильмов</b>\n\n"
             "Выберите интересующую вас категорию:",
-            reply_markup=get_tops_menu().as_markup(),
+            reply_markup=get_tops_menu(),
             parse_mode="HTML"
         )
     except Exception as e:
@@ -44,7 +43,7 @@ async def show_top_collection(callback: types.CallbackQuery):
         api_collection_type = COLLECTION_TYPES.get(collection_type)
         collection_name = COLLECTION_NAMES.get(collection_type)
 
-        result = await kinopoisk_api.get_collection(api_collection_type, 1)
+        result = await collection_warmer.get_collection_page(api_collection_type, 1, deadline=Deadline.for_callback())
         if not result:
             await callback.answer("Ошибка получения данных")
             return
@@ -54,10 +53,12 @@ async def show_top_collection(callback: types.CallbackQuery):
             await callback.answer("Фильмы не найдены")
             return
 
-        custom_total_pages = (total_films + FILMS_PER_PAGE - 1) // FILMS_PER_PAGE
-        films = result.get('items', [])[:FILMS_PER_PAGE]
+        custom_total_pages = get_total_ui_pages(total_films, result.get('totalPages'))
+        films = slice_ui_page(result.get('items', []), 1)
 
-        keyboard = get_pagination_keyboard(collection_type, 1, custom_total_pages, films)
+        keyboard = get_pagination_keyboard(
+            collection_type, 1, custom_total_pages, films, result_set=result.get('version')
+        )
 
         message_text = TOPS_RESULTS_TEMPLATE.format(
             collection_name=collection_name,
@@ -68,7 +69,7 @@ async def show_top_collection(callback: types.CallbackQuery):
 
         await callback.message.edit_text(
             text=message_text,
-            reply_markup=keyboard.as_markup(),
+            reply_markup=keyboard,
             parse_mode="HTML"
         )
     except Exception as e:
@@ -81,14 +82,20 @@ async def process_top_pagination(callback: types.CallbackQuery, collection_type:
         api_collection_type = COLLECTION_TYPES.get(collection_type)
         collection_name = COLLECTION_NAMES.get(collection_type)
 
-        result = await kinopoisk_api.get_collection(api_collection_type, page)
+        # Одна страница API (20 фильмов) отдает две страницы интерфейса по 10
+        api_page = get_api_page(page)
+        result = await collection_warmer.get_collection_page(api_collection_type, api_page, deadline=Deadline.for_callback())
         if not result or 'items' not in result:
             await callback.answer("Не удалось загрузить страницу")
             return
 
         total_films = result.get('total', 0)
-        films = result.get('items', [])[:FILMS_PER_PAGE]
-        custom_total_pages = (total_films + FILMS_PER_PAGE - 1) // FILMS_PER_PAGE
+        films = slice_ui_page(result.get('items', []), page)
+        custom_total_pages = get_total_ui_pages(total_films, result.get('totalPages'))
+
+        keyboard = get_pagination_keyboard(
+            collection_type, page, custom_total_pages, films, result_set=result.get('version')
+        )
 
         message_text = TOPS_RESULTS_TEMPLATE.format(
             collection_name=collection_name,
@@ -102,13 +109,13 @@ async def process_top_pagination(callback: types.CallbackQuery, collection_type:
             await callback.message.delete()
             await callback.message.answer(
                 text=message_text,
-                reply_markup=get_pagination_keyboard(collection_type, page, custom_total_pages, films).as_markup(),
+                reply_markup=keyboard,
                 parse_mode="HTML"
             )
         else:
             await callback.message.edit_text(
                 text=message_text,
-                reply_markup=get_pagination_keyboard(collection_type, page, custom_total_pages, films).as_markup(),
+                reply_markup=keyboard,
                 parse_mode="HTML"
             )
         
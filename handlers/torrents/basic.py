@@ -8,6 +8,7 @@ from services.redis_service import RedisService
 from services.torrent_converter import torrent_converter
 import logging
 import re
+from utils.deadline import Deadline
 from constants import (
     TORRENT_DETAILS_TEMPLATE,
     TORRENT_LIST_TEMPLATE,
@@ -20,6 +21,7 @@ TORRENTS_PER_PAGE = 5
 
 async def process_torrent_pagination(callback: types.CallbackQuery):
     """Обрабатывает пагинацию в списке торрентов"""
+    deadline = Deadline.for_callback()
     try:
         parts = callback.data.split('_')
         kinopoisk_id = parts[1]
@@ -30,14 +32,17 @@ async def process_torrent_pagination(callback: types.CallbackQuery):
         film_callback = await redis_service.get_query(f"film_callback_{kinopoisk_id}")
         
         # Получаем информацию о типе контента
-        film_info = await kinopoisk_api.get_film_details(kinopoisk_id)
-        is_series = film_info.get('type', '').lower() == 'tv_series'
+        film_info = await kinopoisk_api.get_film_details(kinopoisk_id, deadline=deadline)
+        if not film_info:
+            await callback.answer("Не удалось получить информацию о фильме", show_alert=True)
+            return
+        is_series = film_info.is_series
         
         # Получаем и фильтруем торренты
         parser = TorrentParser()
         parser.set_filter(min_seeders=1)
-        results = await parser.get_torrents(kinopoisk_id, is_series=is_series)
-        film_name = film_info.get('nameRu', 'Неизвестный фильм')
+        results = await parser.get_torrents(kinopoisk_id, is_series=is_series, deadline=deadline)
+        film_name = film_info.name_ru or 'Неизвестный фильм'
         
         if not results:
             await callback.answer("Торренты не найдены", show_alert=True)
@@ -72,7 +77,7 @@ async def process_torrent_pagination(callback: types.CallbackQuery):
         if has_text and callback.data.startswith('tp_'):
             await callback.message.edit_text(
                 text=message_text,
-                reply_markup=keyboard.as_markup(),
+                reply_markup=keyboard,
                 parse_mode="HTML"
             )
         else:
@@ -80,7 +85,7 @@ async def process_torrent_pagination(callback: types.CallbackQuery):
             await callback.message.delete()
             await callback.message.answer(
                 text=message_text,
-                reply_markup=keyboard.as_markup(),
+                reply_markup=keyboard,
                 parse_mode="HTML"
             )
             
@@ -98,7 +103,7 @@ async def show_torrent_details(callback: types.CallbackQuery):
         
         # Получаем данные о торренте
         parser = TorrentParser()
-        results = await parser.get_torrents(kinopoisk_id)
+        results = await parser.get_torrents(kinopoisk_id, deadline=Deadline.for_callback())
         torrent = results[torrent_idx]
         
         message_text = TORRENT_DETAILS_TEMPLATE.format(
@@ -215,7 +220,7 @@ async def handle_back_to_torrent(callback: types.CallbackQuery):
         
         # Получаем данные о торренте
         parser = TorrentParser()
-        results = await parser.get_torrents(kinopoisk_id)
+        results = await parser.get_torrents(kinopoisk_id, deadline=Deadline.for_callback())
         
         # Ищем торрент по магнет-ссылке
         torrent = next((t for t in results if t['magnet'] == magnet_link), None)
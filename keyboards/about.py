@@ -1,6 +1,7 @@
+from aiogram.types import InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-def get_about_menu() -> InlineKeyboardBuilder:
+def _build_about_menu() -> InlineKeyboardBuilder:
     builder = InlineKeyboardBuilder()
     
     builder.button(text="📝 Последние обновления", switch_inline_query_current_chat="#инфо_историяверсий ")
@@ -9,4 +10,10 @@ def get_about_menu() -> InlineKeyboardBuilder:
     
     builder.adjust(2, 1)
     
-    return builder
\ No newline at end of file
+    return builder
+
+# Меню не меняется: собираем один раз при импорте
+ABOUT_MENU = _build_about_menu().as_markup()
+
+def get_about_menu() -> InlineKeyboardMarkup:
+    return ABOUT_MENU
@@ -1,14 +1,29 @@
+from aiogram.types import InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from typing import Optional, Dict
 from services.kinopoisk_api import kinopoisk_api
+from keyboards.cache import markup_cache
 
-def get_advanced_search_keyboard(current_filters: Optional[Dict] = None) -> InlineKeyboardBuilder:
+_filters_keyboards = markup_cache("advanced_search", max_size=256)
+
+def get_advanced_search_keyboard(current_filters: Optional[Dict] = None) -> InlineKeyboardMarkup:
+    """Клавиатура расширенного поиска (одна на каждый набор выбранных значений фильтров)"""
+    current_filters = current_filters or {}
+    # В клавиатуре видны только названия и диапазоны выбранных фильтров
+    key = (
+        (current_filters.get('genre') or {}).get('name'),
+        (current_filters.get('rating') or {}).get('range'),
+        (current_filters.get('year') or {}).get('range'),
+        current_filters['country'].get('name') if 'country' in current_filters else None,
+        current_filters.get('sort_by'),
+        any(current_filters.values())
+    )
+    return _filters_keyboards.get(key, lambda: _build_advanced_search_keyboard(current_filters).as_markup())
+
+def _build_advanced_search_keyboard(current_filters: Dict) -> InlineKeyboardBuilder:
     """Создает клавиатуру для расширенного поиска"""
     builder = InlineKeyboardBuilder()
     
-    if current_filters is None:
-        current_filters = {}
-    
     # Жанр
     genre_text = "🎭 Жанр"
     if current_filters.get('genre'):
@@ -0,0 +1,49 @@
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable
+from aiogram.types import InlineKeyboardMarkup
+from services.metrics import registry
+
+class MarkupCache:
+    """
+    LRU готовых клавиатур. InlineKeyboardMarkup в aiogram неизменяем, поэтому один
+    экземпляр можно отдавать всем пользователям: кнопки не собираются заново
+    и не проходят валидацию на каждом апдейте
+    """
+
+    def __init__(self, name: str, max_size: int = 1024):
+        self.name = name
+        self.max_size = max_size
+        self._markups: "OrderedDict[Hashable, InlineKeyboardMarkup]" = OrderedDict()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def get(self, key: Hashable, build: Callable[[], InlineKeyboardMarkup]) -> InlineKeyboardMarkup:
+        """Клавиатура из кэша или собранная build() (и сохраненная в кэш)"""
+        markup = self._markups.get(key)
+        if markup is not None:
+            self._markups.move_to_end(key)
+            self.stats['hits'] += 1
+            return markup
+        self.stats['misses'] += 1
+        markup = self._markups[key] = build()
+        if len(self._markups) > self.max_size:
+            self._markups.popitem(last=False)
+        return markup
+
+_caches: Dict[str, MarkupCache] = {}
+
+def markup_cache(name: str, max_size: int = 1024) -> MarkupCache:
+    """Именованный кэш клавиатур (один на вид клавиатуры)"""
+    cache = _caches.get(name)
+    if cache is None:
+        cache = _caches[name] = MarkupCache(name, max_size)
+    return cache
+
+def collect_metrics():
+    """Счетчики кэшей клавиатур для реестра метрик"""
+    gauge = registry.gauge("keyboard_cache", "Inline keyboard markup cache counters", ("keyboard", "stat"))
+    for cache in _caches.values():
+        for stat, value in cache.stats.items():
+            gauge.set(value, keyboard=cache.name, stat=stat)
+        gauge.set(len(cache._markups), keyboard=cache.name, stat="size")
+
+registry.add_collector(collect_metrics)
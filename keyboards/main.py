@@ -1,6 +1,7 @@
+from aiogram.types import InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-def get_main_menu() -> InlineKeyboardBuilder:
+def _build_main_menu() -> InlineKeyboardBuilder:
     builder = InlineKeyboardBuilder()
     
     builder.button(text="🔍 Поиск фильма", callback_data="search")
@@ -11,4 +12,10 @@ def get_main_menu() -> InlineKeyboardBuilder:
     
     builder.adjust(2, 2, 1)
     
-    return builder
\ No newline at end of file
+    return builder
+
+# Меню не меняется: собираем один раз при импорте
+MAIN_MENU = _build_main_menu().as_markup()
+
+def get_main_menu() -> InlineKeyboardMarkup:
+    return MAIN_MENU
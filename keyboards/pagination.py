@@ -1,13 +1,37 @@
 import hashlib
 import logging
-from aiogram.types import InlineKeyboardButton
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
+from typing import List, Optional
+from models.film import FilmSummary
+from keyboards.cache import markup_cache
+
+_result_pages = markup_cache("pagination")
 
 def get_short_hash(text: str, length: int = 5) -> str:
     """Генерирует короткий хеш из текста"""
     return hashlib.md5(text.encode('utf-8')).hexdigest()[:length]
 
-def get_pagination_keyboard(collection_type: str, current_page: int, total_pages: int, films: list) -> InlineKeyboardBuilder:
+def get_pagination_keyboard(collection_type: str, current_page: int, total_pages: int,
+                            films: List[FilmSummary], result_set: Optional[str] = None) -> InlineKeyboardMarkup:
+    """
+    Клавиатура страницы результатов (фильмы, навигация, возврат в меню)
+
+    Args:
+        collection_type: Префикс callback_data (s_{hash}, adv_{hash} или тип топа)
+        result_set: Версия неизменяемого набора результатов (курсора поиска, снимка топа).
+            Если передана, клавиатура страницы собирается один раз и переиспользуется
+            для всех пользователей, которые открывают ту же страницу
+    """
+    if result_set is None:
+        return _build_pagination_keyboard(collection_type, current_page, total_pages, films).as_markup()
+    return _result_pages.get(
+        (collection_type, result_set, current_page, total_pages),
+        lambda: _build_pagination_keyboard(collection_type, current_page, total_pages, films).as_markup()
+    )
+
+def _build_pagination_keyboard(collection_type: str, current_page: int, total_pages: int,
+                               films: List[FilmSummary]) -> InlineKeyboardBuilder:
     builder = InlineKeyboardBuilder()
         
     # Получаем search_hash из collection_type (например, из 's_b4a5d' получаем 'b4a5d')
@@ -15,11 +39,11 @@ def get_pagination_keyboard(collection_type: str, current_page: int, total_pages
     
     # Добавляем кнопки фильмов
     for film in films:
-        film_id = film.get('kinopoiskId', '')
-        name_ru = film.get('nameRu', 'Нет названия')
-        year = film.get('year', '')
-        rating = film.get('ratingKinopoisk', '')
-        type_ru = "🎥" if film.get('type', '') == 'TV_SERIES' else "🍿"
+        film_id = film.kinopoisk_id or ''
+        name_ru = film.name or 'Нет названия'
+        year = film.year or ''
+        rating = film.rating_kinopoisk or ''
+        type_ru = "🎥" if film.is_series else "🍿"
 
         button_text = f"{type_ru}"
         if rating:
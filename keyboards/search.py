@@ -1,13 +1,17 @@
-
+from aiogram.types import InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-def get_cancel_keyboard() -> InlineKeyboardBuilder:
+def _build_cancel_keyboard(callback_data: str) -> InlineKeyboardBuilder:
     builder = InlineKeyboardBuilder()
-    builder.button(text="❌ Отмена", callback_data="cancel_search")
+    builder.button(text="❌ Отмена", callback_data=callback_data)
     return builder
 
-def get_cancel_keyboard_adv() -> InlineKeyboardBuilder:
-    builder = InlineKeyboardBuilder()
-    builder.button(text="❌ Отмена", callback_data="cancel_search_adv")
-    return builder
+# Клавиатуры не меняются: собираем один раз при импорте
+CANCEL_KEYBOARD = _build_cancel_keyboard("cancel_search").as_markup()
+CANCEL_KEYBOARD_ADV = _build_cancel_keyboard("cancel_search_adv").as_markup()
+
+def get_cancel_keyboard() -> InlineKeyboardMarkup:
+    return CANCEL_KEYBOARD
 
+def get_cancel_keyboard_adv() -> InlineKeyboardMarkup:
+    return CANCEL_KEYBOARD_ADV
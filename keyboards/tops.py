@@ -1,6 +1,7 @@
+from aiogram.types import InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-def get_tops_menu() -> InlineKeyboardBuilder:
+def _build_tops_menu() -> InlineKeyboardBuilder:
     builder = InlineKeyboardBuilder()
 
     builder.button(text="🔥 Популярное", callback_data="tpop")
@@ -12,3 +13,9 @@ def get_tops_menu() -> InlineKeyboardBuilder:
     builder.adjust(2, 1, 1)
 
     return builder
+
+# Меню не меняется: собираем один раз при импорте
+TOPS_MENU = _build_tops_menu().as_markup()
+
+def get_tops_menu() -> InlineKeyboardMarkup:
+    return TOPS_MENU
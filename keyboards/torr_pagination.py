@@ -1,9 +1,12 @@
-from aiogram.types import InlineKeyboardButton
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
+from keyboards.cache import markup_cache
 import hashlib
 
+_torrent_pages = markup_cache("torrents")
+
 def get_torrent_pagination_keyboard(kinopoisk_id: str, current_page: int, total_pages: int, 
-                                  torrents: list, film_callback: str) -> InlineKeyboardBuilder:
+                                  torrents: list, film_callback: str) -> InlineKeyboardMarkup:
     """
     Создает клавиатуру с пагинацией для торрентов
     
@@ -14,6 +17,18 @@ def get_torrent_pagination_keyboard(kinopoisk_id: str, current_page: int, total_
         torrents: Список торрентов для текущей страницы
         film_callback: Коллбек для возврата к карточке фильма
     """
+    # Набор раздач страницы определяется magnet-ссылками, от обновления к обновлению
+    # кэша jacred у тех же раздач меняется только число сидов
+    result_set = tuple((torrent.get('magnet'), torrent.get('seeders')) for torrent in torrents)
+    return _torrent_pages.get(
+        (kinopoisk_id, current_page, total_pages, film_callback, result_set),
+        lambda: _build_torrent_pagination_keyboard(
+            kinopoisk_id, current_page, total_pages, torrents, film_callback
+        ).as_markup()
+    )
+
+def _build_torrent_pagination_keyboard(kinopoisk_id: str, current_page: int, total_pages: int,
+                                       torrents: list, film_callback: str) -> InlineKeyboardBuilder:
     builder = InlineKeyboardBuilder()
     
     # Кнопки для торрентов в колонку
@@ -14,9 +14,18 @@ from handlers.search.router import setup_search_router
 from handlers.inline.router import setup_inline_router  # Добавляем импорт inline роутера
 from handlers.torrents.router import setup_torrent_router  # Добавляем импорт inline роутера
 from services.redis_service import RedisService
+from services.http_client import HttpClient
+from services.kinopoisk_api import kinopoisk_api
+from services.torrent_parser import torrent_parser
+from services.collection_warmer import collection_warmer
+from services.film_index import film_index
+from services.metrics import MetricsServer
+from handlers.tops.basic import COLLECTION_TYPES
 import sys
 from middlewares.admin_access import AdminAccessMiddleware
 from middlewares.chat_type import ChatTypeMiddleware
+from middlewares.metrics import UpdateMetricsMiddleware
+from middlewares.api_user import ApiUserMiddleware
 
 logging = setup_logger()
 
@@ -26,7 +35,20 @@ async def start_bot():
     
     # Инициализация Redis
     RedisService.initialize(config.redis)
+
+    # Открываем общий пул HTTP соединений на все время работы бота
+    await HttpClient.start(config.http)
+
+    # Метрики внешних API и обработки апдейтов (если задан METRICS_PORT)
+    await MetricsServer.start(config.metrics.host, config.metrics.port)
     
+    try:
+        await run_bot(config)
+    finally:
+        await MetricsServer.stop()
+        await HttpClient.close()
+
+async def run_bot(config):
     async with Bot(token=config.BOT_TOKEN) as bot:
         try:
             # Проверяем токен
@@ -38,6 +60,8 @@ async def start_bot():
         dp = Dispatcher(storage=MemoryStorage())
         
         # Регистрируем мидлвари
+        dp.update.outer_middleware(UpdateMetricsMiddleware())  # Время обработки апдейтов
+        dp.update.outer_middleware(ApiUserMiddleware())  # Пользователь апдейта для очереди запросов к API
         dp.callback_query.middleware(AdminAccessMiddleware())  # Админский доступ только для колбэков
         dp.inline_query.middleware(ChatTypeMiddleware())  # Добавляем новый middleware
         
@@ -49,7 +73,7 @@ async def start_bot():
             
             await message.answer(
                 WELCOME_MESSAGE,
-                reply_markup=get_main_menu().as_markup(),
+                reply_markup=get_main_menu(),
                 parse_mode="HTML"
             )
 
@@ -61,11 +85,29 @@ async def start_bot():
         dp.include_router(setup_inline_router())  # Добавляем inline роутер
         dp.include_router(setup_torrent_router())  # Добавляем inline роутер
 
+        # Прогреваем соединения к внешним API до начала приема апдейтов
+        await asyncio.gather(
+            HttpClient.warmup(kinopoisk_api.host_url),
+            HttpClient.warmup(f"{torrent_parser.base_url}/")
+        )
+
+        # Локальный индекс фильмов: ответы на поиск без API и запасной источник при его недоступности
+        await film_index.open()
+
+        # Справочник жанров и стран загружаем из снимка до приема апдейтов
+        await kinopoisk_api.load_filters()
+
+        # Снимки топов обновляются в фоне, хендлеры читают их без запросов к API
+        collection_warmer.start(COLLECTION_TYPES.values())
+
         try:
             logging.info("Starting bot...")
             await dp.start_polling(bot)
         except Exception as e:
             logging.error(f"Polling error: {e}")
+        finally:
+            await collection_warmer.stop()
+            await film_index.close()
 
 if __name__ == "__main__":
     asyncio.run(start_bot())
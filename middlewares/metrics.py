@@ -0,0 +1,26 @@
+from typing import Callable, Dict, Any, Awaitable
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+import time
+from services.metrics import registry
+
+UPDATE_LATENCY = registry.histogram(
+    "telegram_update_duration_seconds",
+    "Time spent handling a Telegram update, including upstream calls and Bot API replies",
+    ("event",)
+)
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """Измеряет полное время обработки апдейта по типам событий"""
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        started = time.monotonic()
+        try:
+            return await handler(event, data)
+        finally:
+            UPDATE_LATENCY.observe(time.monotonic() - started, event=event.event_type)
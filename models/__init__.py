@@ -0,0 +1,9 @@
+from .film import FilmSummary, FilmDetails, compact_film_page, build_film_page, build_film_list
+
+__all__ = [
+    'FilmSummary',
+    'FilmDetails',
+    'compact_film_page',
+    'build_film_page',
+    'build_film_list',
+]
@@ -0,0 +1,103 @@
+from typing import Any, Dict, List, Optional
+
+class _CompactModel:
+    """
+    Базовый класс компактных моделей: только используемые ботом поля в __slots__.
+    В кэше модель хранится как словарь to_dict() и восстанавливается через from_dict()
+    """
+    __slots__ = ()
+
+    def __init__(self, **fields: Any):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Компактное представление для кэша (только непустые поля)"""
+        return {
+            name: value for name in self.__slots__
+            if (value := getattr(self, name)) is not None
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]):
+        """Восстанавливает модель из компактного представления"""
+        return cls(**data)
+
+    @property
+    def is_series(self) -> bool:
+        return (self.type or '').upper() == 'TV_SERIES'
+
+    @property
+    def name(self) -> Optional[str]:
+        """Русское название, если его нет - английское или оригинальное"""
+        return self.name_ru or self.name_en or self.name_original
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.kinopoisk_id}, {self.name!r})"
+
+class FilmSummary(_CompactModel):
+    """Фильм в списке результатов (поиск, подборки)"""
+    __slots__ = (
+        'kinopoisk_id', 'name_ru', 'name_en', 'name_original',
+        'year', 'rating_kinopoisk', 'type', 'poster_url_preview'
+    )
+
+    @classmethod
+    def from_api(cls, data: Dict[str, Any]) -> 'FilmSummary':
+        """Создает модель из элемента items ответа API"""
+        return cls(
+            # В подборках и поиске ID приходит как kinopoiskId, в старых эндпоинтах - filmId
+            kinopoisk_id=data.get('kinopoiskId') or data.get('filmId'),
+            name_ru=data.get('nameRu'),
+            name_en=data.get('nameEn'),
+            name_original=data.get('nameOriginal'),
+            year=data.get('year'),
+            rating_kinopoisk=data.get('ratingKinopoisk'),
+            type=data.get('type'),
+            poster_url_preview=data.get('posterUrlPreview')
+        )
+
+class FilmDetails(_CompactModel):
+    """Карточка фильма"""
+    __slots__ = (
+        'kinopoisk_id', 'name_ru', 'name_en', 'name_original', 'year', 'rating_kinopoisk',
+        'type', 'genres', 'countries', 'poster_url', 'poster_url_preview', 'description'
+    )
+
+    @classmethod
+    def from_api(cls, data: Dict[str, Any]) -> 'FilmDetails':
+        """Создает модель из ответа films/{id}"""
+        return cls(
+            kinopoisk_id=data.get('kinopoiskId'),
+            name_ru=data.get('nameRu'),
+            name_en=data.get('nameEn'),
+            name_original=data.get('nameOriginal'),
+            year=data.get('year'),
+            rating_kinopoisk=data.get('ratingKinopoisk'),
+            type=data.get('type'),
+            genres=[item['genre'] for item in data.get('genres') or [] if item.get('genre')],
+            countries=[item['country'] for item in data.get('countries') or [] if item.get('country')],
+            poster_url=data.get('posterUrl'),
+            poster_url_preview=data.get('posterUrlPreview'),
+            description=data.get('description')
+        )
+
+def compact_film_page(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Проекция страницы поиска или подборки для кэша: счетчики и компактные фильмы"""
+    return {
+        'total': data.get('total', 0),
+        'totalPages': data.get('totalPages', 0),
+        'items': [FilmSummary.from_api(item).to_dict() for item in data.get('items') or []]
+    }
+
+def build_film_page(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Страница результатов для хендлеров: те же счетчики, фильмы в виде FilmSummary"""
+    return {
+        'total': data.get('total', 0),
+        'totalPages': data.get('totalPages', 0),
+        'items': [FilmSummary.from_dict(item) for item in data.get('items') or []]
+    }
+
+def build_film_list(items: List[Dict[str, Any]]) -> List[FilmSummary]:
+    """Список компактных словарей -> список FilmSummary"""
+    return [FilmSummary.from_dict(item) for item in items]
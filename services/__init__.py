@@ -1,11 +1,17 @@
 from .torrent_parser import TorrentParser, torrent_parser
-from .kinopoisk_api import KinopoiskAPI, kinopoisk_api
+from .kinopoisk_api import KinopoiskAPI, FilmDetailsResult, kinopoisk_api
 from .redis_service import RedisService, redis_service
 from .torrent_converter import TorrentConverter, torrent_converter
+from .http_client import HttpClient
+from .collection_warmer import CollectionWarmer, collection_warmer
+from .film_index import FilmIndex, film_index
 
 __all__ = [
     'TorrentParser', 'torrent_parser',
-    'KinopoiskAPI', 'kinopoisk_api',
+    'KinopoiskAPI', 'FilmDetailsResult', 'kinopoisk_api',
     'RedisService', 'redis_service',
-    'TorrentConverter', 'torrent_converter'
+    'TorrentConverter', 'torrent_converter',
+    'HttpClient',
+    'CollectionWarmer', 'collection_warmer',
+    'FilmIndex', 'film_index'
 ]
@@ -0,0 +1,221 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from core import load_config
+from services.redis_service import RedisService
+from utils import codec
+
+# Маркер отсутствия значения (None - допустимое закэшированное значение)
+MISSING = object()
+
+def negative_key(key: str) -> str:
+    """Ключ негативной записи (пустой результат, 404) - отдельно от обычной записи с тем же ключом"""
+    return f"neg:{key}"
+
+class LRUCache:
+    """In-process LRU кэш, ограниченный приблизительным объемом данных в байтах"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.evictions = 0
+        # key -> (value, size, expires_at)
+        self._entries: "OrderedDict[str, Tuple[Any, int, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Any:
+        """Возвращает значение или MISSING, если его нет или оно устарело"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return MISSING
+        value, size, expires_at = entry
+        if expires_at <= time.time():
+            self._remove(key)
+            return MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, size: int, expires_at: float):
+        """
+        Сохраняет значение
+
+        Args:
+            key: Ключ
+            value: Значение (хранится как есть, без сериализации)
+            size: Приблизительный размер значения в байтах
+            expires_at: Время устаревания (unix timestamp)
+        """
+        # Записи больше всего бюджета не кэшируем, иначе они вытеснят все остальное
+        if size > self.max_bytes:
+            self._remove(key)
+            return
+        self._remove(key)
+        self._entries[key] = (value, size, expires_at)
+        self.current_bytes += size
+        while self.current_bytes > self.max_bytes and self._entries:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def delete(self, key: str):
+        self._remove(key)
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry[1]
+
+class TieredCache:
+    """
+    Двухуровневый кэш: L1 - LRU в памяти процесса, L2 - Redis.
+    В Redis значение хранится в конверте {"exp": ..., "data": ...}, чтобы при
+    подъеме в L1 знать оставшееся время жизни без лишнего запроса TTL
+    """
+
+    def __init__(self, l1_max_bytes: int, stale_ttl: int = 0):
+        self.l1 = LRUCache(l1_max_bytes)
+        # Сколько Redis хранит запись после устаревания, чтобы отдать ее при недоступности API
+        self.stale_ttl = stale_ttl
+        self.stats = {'l1_hits': 0, 'l1_misses': 0, 'l2_hits': 0, 'l2_misses': 0, 'stale_hits': 0}
+
+    @staticmethod
+    def _get_redis_service() -> Optional[RedisService]:
+        """Возвращает Redis сервис или None, если Redis не инициализирован"""
+        try:
+            return RedisService.get_instance()
+        except RuntimeError:
+            return None
+
+    async def get(self, key: str) -> Any:
+        """Возвращает значение из L1 или L2, либо MISSING"""
+        value = self.l1.get(key)
+        if value is not MISSING:
+            self.stats['l1_hits'] += 1
+            return value
+        self.stats['l1_misses'] += 1
+
+        raw, expires_at, value = await self._get_l2(key)
+        if value is not MISSING and expires_at > time.time():
+            self.stats['l2_hits'] += 1
+            self.l1.set(key, value, len(raw), expires_at)
+            return value
+        self.stats['l2_misses'] += 1
+        return MISSING
+
+    async def get_many(self, keys: List[str]) -> List[Any]:
+        """
+        Возвращает значения для списка ключей (MISSING для промахов).
+        Все промахи L1 читаются из Redis одним запросом
+        """
+        results = [MISSING] * len(keys)
+        l2_positions = []
+        for position, key in enumerate(keys):
+            value = self.l1.get(key)
+            if value is not MISSING:
+                self.stats['l1_hits'] += 1
+                results[position] = value
+            else:
+                self.stats['l1_misses'] += 1
+                l2_positions.append(position)
+
+        if not l2_positions:
+            return results
+
+        redis_service = self._get_redis_service()
+        raws = await redis_service.get_cache_many([keys[p] for p in l2_positions]) if redis_service else []
+        now = time.time()
+        for position, raw in zip(l2_positions, raws):
+            expires_at, value = self._decode_envelope(keys[position], raw)
+            if value is not MISSING and expires_at > now:
+                self.stats['l2_hits'] += 1
+                self.l1.set(keys[position], value, len(raw), expires_at)
+                results[position] = value
+            else:
+                self.stats['l2_misses'] += 1
+        # Redis не инициализирован - все оставшиеся ключи считаются промахами
+        self.stats['l2_misses'] += len(l2_positions) - len(raws)
+        return results
+
+    async def get_stale(self, key: str) -> Any:
+        """Возвращает значение даже если оно устарело (для отдачи при недоступности API)"""
+        value = self.l1.get(key)
+        if value is MISSING:
+            _, _, value = await self._get_l2(key)
+        if value is not MISSING:
+            self.stats['stale_hits'] += 1
+        return value
+
+    async def _get_l2(self, key: str) -> Tuple[Optional[str], float, Any]:
+        """Читает конверт из Redis: (сырой JSON, время устаревания, значение)"""
+        redis_service = self._get_redis_service()
+        raw = await redis_service.get_cache(key) if redis_service else None
+        expires_at, value = self._decode_envelope(key, raw)
+        if value is MISSING:
+            return None, 0, MISSING
+        return raw, expires_at, value
+
+    @staticmethod
+    def _decode_envelope(key: str, raw: Optional[str]) -> Tuple[float, Any]:
+        """Разбирает конверт из Redis: (время устаревания, значение) или (0, MISSING)"""
+        if not raw:
+            return 0, MISSING
+        try:
+            envelope = codec.loads(raw)
+            return envelope['exp'], envelope['data']
+        except (ValueError, KeyError, TypeError) as e:
+            logging.error(f"[CACHE] Broken cache entry {key}: {e}")
+            return 0, MISSING
+
+    async def set(self, key: str, value: Any, ttl: int, keep_stale: bool = True):
+        """
+        Сохраняет значение в оба уровня кэша
+
+        Args:
+            keep_stale: Хранить запись в Redis после устаревания (для отдачи при
+                недоступности API). Негативным записям это не нужно
+        """
+        if ttl <= 0:
+            return
+        expires_at = time.time() + ttl
+        raw = codec.dumps({'exp': expires_at, 'data': value})
+        self.l1.set(key, value, len(raw), expires_at)
+
+        redis_service = self._get_redis_service()
+        if redis_service:
+            await redis_service.set_cache(key, raw, ttl + self.stale_ttl if keep_stale else ttl)
+
+    async def delete(self, key: str):
+        """Удаляет значение из обоих уровней"""
+        self.l1.delete(key)
+        redis_service = self._get_redis_service()
+        if redis_service:
+            await redis_service.delete_cache(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Возвращает статистику попаданий по уровням кэша"""
+        stats = {}
+        for tier in ('l1', 'l2'):
+            hits = self.stats[f'{tier}_hits']
+            misses = self.stats[f'{tier}_misses']
+            lookups = hits + misses
+            stats[tier] = {
+                'hits': hits,
+                'misses': misses,
+                'hit_ratio': hits / lookups if lookups else 0.0
+            }
+        stats['stale_hits'] = self.stats['stale_hits']
+        stats['l1'].update({
+            'entries': len(self.l1),
+            'bytes': self.l1.current_bytes,
+            'max_bytes': self.l1.max_bytes,
+            'evictions': self.l1.evictions
+        })
+        return stats
+
+config = load_config()
+
+# Общий кэш ответов внешних API (Kinopoisk, jacred)
+response_cache = TieredCache(config.cache.l1_max_bytes, config.cache.stale_ttl)
@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Iterable, List, Optional
+from core import load_config
+from core.config import WarmerConfig
+from services.kinopoisk_api import kinopoisk_api
+from services.redis_service import RedisService
+from utils.deadline import Deadline
+from utils import codec
+from models.film import build_film_list
+from services.metrics import registry
+from services.fair_scheduler import request_priority, MAINTENANCE
+
+class CollectionWarmer:
+    """
+    Фоновое обновление подборок (топов). Раз в interval секунд загружает все
+    страницы каждой подборки в обход кэша, собирает из них неизменяемый снимок
+    с версией и атомарно публикует его в Redis и в памяти процесса. Хендлеры
+    топов читают страницы из снимка и обращаются к API только при промахе
+    """
+
+    def __init__(self, config: WarmerConfig):
+        self.config = config
+        self.collection_types: List[str] = []
+        # Тип коллекции -> текущий снимок (заменяется целиком, никогда не меняется на месте)
+        self._snapshots: Dict[str, dict] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {'refreshed': 0, 'failed': 0, 'hits': 0, 'misses': 0}
+
+    def start(self, collection_types: Iterable[str]):
+        """Запускает фоновое обновление снимков"""
+        self.collection_types = list(collection_types)
+        if not self.config.enabled:
+            logging.info("[COLLECTION WARMER] Disabled by config")
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logging.info(
+                f"[COLLECTION WARMER] Started for {len(self.collection_types)} collections, "
+                f"interval {self.config.interval}s"
+            )
+
+    async def stop(self):
+        """Останавливает фоновое обновление"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logging.info("[COLLECTION WARMER] Stopped")
+
+    async def _run(self):
+        # Обновление снимков - фоновая работа: уступает запросам пользователей и ждет при малом бюджете ключей
+        with request_priority(MAINTENANCE):
+            while True:
+                await self.refresh_all()
+                await asyncio.sleep(self.config.interval)
+
+    async def refresh_all(self):
+        """Обновляет снимки всех подборок по очереди"""
+        for collection_type in self.collection_types:
+            # Снимок из Redis, оставшийся от прошлого запуска, можно отдавать сразу
+            if collection_type not in self._snapshots:
+                await self._load_snapshot(collection_type)
+            snapshot = self._snapshots.get(collection_type)
+            if snapshot and time.time() - snapshot['version'] < self.config.interval:
+                continue
+            try:
+                await self.refresh(collection_type)
+            except Exception as e:
+                self.stats['failed'] += 1
+                logging.error(f"[COLLECTION WARMER] Failed to refresh {collection_type}: {e}")
+
+    async def refresh(self, collection_type: str) -> bool:
+        """
+        Загружает все страницы подборки и публикует новый снимок.
+        Если хотя бы одна страница не загрузилась, старый снимок остается текущим
+        """
+        first_page = await kinopoisk_api.get_collection(collection_type, 1, use_cache=False)
+        if not first_page or 'items' not in first_page:
+            self.stats['failed'] += 1
+            logging.warning(f"[COLLECTION WARMER] {collection_type}: first page unavailable, keeping old snapshot")
+            return False
+
+        total_pages = first_page.get('totalPages', 1)
+        # В снимке фильмы хранятся компактными словарями (как в кэше ответов)
+        pages = [[film.to_dict() for film in first_page['items']]]
+        for page in range(2, total_pages + 1):
+            await asyncio.sleep(self.config.page_delay)
+            result = await kinopoisk_api.get_collection(collection_type, page, use_cache=False)
+            if not result or 'items' not in result:
+                self.stats['failed'] += 1
+                logging.warning(
+                    f"[COLLECTION WARMER] {collection_type}: page {page}/{total_pages} unavailable, "
+                    f"keeping old snapshot"
+                )
+                return False
+            pages.append([film.to_dict() for film in result['items']])
+
+        snapshot = {
+            'type': collection_type,
+            'version': int(time.time()),
+            'total': first_page.get('total', 0),
+            'totalPages': total_pages,
+            'pages': pages
+        }
+        await self._publish(snapshot)
+        self.stats['refreshed'] += 1
+        logging.info(
+            f"[COLLECTION WARMER] {collection_type}: published snapshot v{snapshot['version']} "
+            f"({snapshot['total']} films, {total_pages} pages)"
+        )
+        return True
+
+    async def _publish(self, snapshot: dict):
+        """Сохраняет снимок в Redis и переключает на него указатель"""
+        try:
+            redis_service = RedisService.get_instance()
+            await redis_service.save_collection_snapshot(
+                snapshot['type'],
+                str(snapshot['version']),
+                codec.dumps(snapshot),
+                self.config.snapshot_ttl
+            )
+        except RuntimeError:
+            pass  # Redis не инициализирован - снимок будет только в памяти
+        # Замена ссылки атомарна для читателей в том же event loop
+        self._snapshots[snapshot['type']] = snapshot
+
+    async def _load_snapshot(self, collection_type: str) -> Optional[dict]:
+        """Подгружает текущий снимок из Redis в память процесса"""
+        try:
+            raw = await RedisService.get_instance().get_collection_snapshot(collection_type)
+        except RuntimeError:
+            return None
+        if not raw:
+            return None
+        try:
+            snapshot = codec.loads(raw)
+        except ValueError as e:
+            logging.error(f"[COLLECTION WARMER] Broken snapshot for {collection_type}: {e}")
+            return None
+        self._snapshots[collection_type] = snapshot
+        return snapshot
+
+    async def get_snapshot(self, collection_type: str) -> Optional[dict]:
+        """Текущий снимок подборки из памяти или из Redis"""
+        snapshot = self._snapshots.get(collection_type)
+        if snapshot is None:
+            snapshot = await self._load_snapshot(collection_type)
+        return snapshot
+
+    def collect_metrics(self):
+        """Счетчики снимков подборок для реестра метрик"""
+        stats_gauge = registry.gauge("tops_snapshot", "Top collection snapshot counters", ("stat",))
+        for stat, value in self.stats.items():
+            stats_gauge.set(value, stat=stat)
+        age_gauge = registry.gauge("tops_snapshot_age_seconds", "Age of the current top collection snapshot", ("collection",))
+        now = time.time()
+        for collection_type, snapshot in self._snapshots.items():
+            age_gauge.set(now - snapshot['version'], collection=collection_type)
+
+    async def get_collection_page(self, collection_type: str, page: int,
+                                  deadline: Optional[Deadline] = None) -> Optional[dict]:
+        """
+        Возвращает страницу подборки в формате KinopoiskAPI.get_collection
+        (total, totalPages, items из FilmSummary; из снимка - еще и version).
+        При отсутствии снимка или страницы обращается к API напрямую
+        """
+        snapshot = await self.get_snapshot(collection_type)
+        if snapshot and 1 <= page <= len(snapshot['pages']):
+            self.stats['hits'] += 1
+            return {
+                'total': snapshot['total'],
+                'totalPages': snapshot['totalPages'],
+                'items': build_film_list(snapshot['pages'][page - 1]),
+                # Снимок неизменяем: по версии хендлеры переиспользуют готовые клавиатуры страниц
+                'version': str(snapshot['version'])
+            }
+        self.stats['misses'] += 1
+        return await kinopoisk_api.get_collection(collection_type, page, deadline=deadline)
+
+config = load_config()
+
+# Создаем единственный экземпляр для использования во всем приложении
+collection_warmer = CollectionWarmer(config.warmer)
+registry.add_collector(collection_warmer.collect_metrics)
@@ -0,0 +1,276 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Callable, Deque, Dict, Hashable, Optional
+from core.config import FairShareConfig
+from services.metrics import registry
+from services.resilience import DeadlineExceededError, RequestDroppedError
+from utils.deadline import Deadline
+
+# Классы приоритета запросов к внешним API (в порядке обслуживания)
+INTERACTIVE = "interactive"   # Ответ ждет пользователь
+PREFETCH = "prefetch"         # Предзагрузка страниц, которые пользователь, вероятно, откроет
+MAINTENANCE = "maintenance"   # Фоновое обновление снимков и справочников
+PRIORITIES = (INTERACTIVE, PREFETCH, MAINTENANCE)
+
+# ID пользователя, от имени которого выполняется текущий апдейт (ставит ApiUserMiddleware).
+# Фоновые задачи (прогрев топов, обновление справочников) выполняются без пользователя
+current_user_id: ContextVar[Optional[int]] = ContextVar("current_user_id", default=None)
+
+# Класс приоритета текущего запроса (по умолчанию - интерактивный)
+current_priority: ContextVar[str] = ContextVar("current_priority", default=INTERACTIVE)
+
+@contextmanager
+def request_priority(priority: str):
+    """Запросы к API внутри блока выполняются с указанным классом приоритета"""
+    token = current_priority.set(priority)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+QUEUE_WAIT = registry.histogram(
+    "upstream_queue_wait_seconds",
+    "Time a request waited for a scheduler slot before calling the upstream API",
+    ("upstream", "priority"),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+
+class _Waiter:
+    """Запрос, ожидающий слота"""
+    __slots__ = ('future', 'user', 'priority')
+
+    def __init__(self, future: asyncio.Future, user: Hashable, priority: str):
+        self.future = future
+        self.user = user
+        self.priority = priority
+
+class FairScheduler:
+    """
+    Планировщик запросов к внешнему API с классами приоритета и справедливым
+    распределением между пользователями.
+
+    Одновременно выполняется не больше max_concurrency запросов и не больше
+    per_user_concurrency запросов одного пользователя. Ожидающие запросы лежат
+    в очередях по классу приоритета и пользователю: сначала всегда обслуживаются
+    интерактивные запросы, внутри класса освободившийся слот получает следующий
+    по кругу пользователь (round-robin). Фоновые запросы занимают не больше
+    background_concurrency слотов и придерживаются, когда бюджет API-ключей
+    опускается ниже preempt_budget; предзагрузка при бюджете ниже
+    drop_prefetch_budget отбрасывается сразу
+    """
+
+    def __init__(self, name: str, config: FairShareConfig, budget: Optional[Callable[[], float]] = None):
+        """
+        Args:
+            name: Имя внешнего API (метка в метриках)
+            config: Лимиты и пороги бюджета
+            budget: Доля оставшегося бюджета ключей от 0 до 1 (None - бюджет не ограничен)
+        """
+        self.name = name
+        self.config = config
+        self._budget = budget
+        self._queues: Dict[str, Dict[Hashable, Deque[_Waiter]]] = {priority: {} for priority in PRIORITIES}
+        # Пользователи с ожидающими запросами в порядке обслуживания (по классам приоритета)
+        self._order: Dict[str, Deque[Hashable]] = {priority: deque() for priority in PRIORITIES}
+        # Ожидающие запросы по меткам (ключ single-flight) для повышения приоритета
+        self._tagged: Dict[Hashable, _Waiter] = {}
+        self._active: Dict[Hashable, int] = {}
+        self._in_flight: Dict[str, int] = {priority: 0 for priority in PRIORITIES}
+        self.stats = {'granted': 0, 'queued': 0, 'timeouts': 0, 'dropped': 0, 'promoted': 0}
+
+    def budget(self) -> float:
+        return self._budget() if self._budget is not None else 1.0
+
+    def should_drop(self, priority: str) -> bool:
+        """Предзагрузка не выполняется, когда бюджет ключей почти исчерпан"""
+        return priority == PREFETCH and self.budget() < self.config.drop_prefetch_budget
+
+    @property
+    def in_flight(self) -> int:
+        return sum(self._in_flight.values())
+
+    def _can_start(self, user: Hashable, priority: str) -> bool:
+        if self.in_flight >= self.config.max_concurrency:
+            return False
+        if self._active.get(user, 0) >= self.config.per_user_concurrency:
+            return False
+        if priority == INTERACTIVE:
+            return True
+        # Фоновые запросы оставляют слоты интерактивным и ждут, пока бюджет ключей мал
+        background = self._in_flight[PREFETCH] + self._in_flight[MAINTENANCE]
+        return background < self.config.background_concurrency and self.budget() >= self.config.preempt_budget
+
+    def _grant(self, user: Hashable, priority: str):
+        self._in_flight[priority] += 1
+        self._active[user] = self._active.get(user, 0) + 1
+        self.stats['granted'] += 1
+
+    async def acquire(self, user: Hashable, priority: str = INTERACTIVE,
+                      timeout: Optional[float] = None, tag: Optional[Hashable] = None) -> str:
+        """
+        Занимает слот для запроса пользователя
+
+        Args:
+            tag: Метка запроса, по которой можно повысить его приоритет (см. promote)
+        Returns:
+            Класс приоритета, с которым выдан слот (его нужно передать в release)
+        Raises:
+            asyncio.TimeoutError: слот не освободился за timeout секунд
+            RequestDroppedError: предзагрузка отброшена из-за малого бюджета ключей
+        """
+        if self.should_drop(priority):
+            self.stats['dropped'] += 1
+            raise RequestDroppedError(f"prefetch dropped, {self.name} key budget is {self.budget():.0%}")
+
+        started = time.monotonic()
+        # Без очереди - только если у пользователя нет ожидающих запросов того же класса
+        if user not in self._queues[priority] and self._can_start(user, priority):
+            self._grant(user, priority)
+            self._observe(priority, started)
+            return priority
+
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), user, priority)
+        self._enqueue(waiter)
+        if tag is not None:
+            self._tagged[tag] = waiter
+        self.stats['queued'] += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Слот успели выдать одновременно с отменой - возвращаем его
+                self.release(user, waiter.priority)
+            else:
+                waiter.future.cancel()
+                self._discard(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self.stats['timeouts'] += 1
+            raise
+        finally:
+            if tag is not None and self._tagged.get(tag) is waiter:
+                del self._tagged[tag]
+        self._observe(waiter.priority, started)
+        return waiter.priority
+
+    def release(self, user: Hashable, priority: str = INTERACTIVE):
+        """Освобождает слот и передает его следующему запросу"""
+        self._in_flight[priority] -= 1
+        active = self._active.get(user, 0) - 1
+        if active > 0:
+            self._active[user] = active
+        else:
+            self._active.pop(user, None)
+        self._dispatch()
+
+    def promote(self, tag: Hashable, priority: str = INTERACTIVE):
+        """
+        Повышает приоритет ожидающего запроса: к фоновой предзагрузке
+        присоединился запрос пользователя, который ждет тот же ответ
+        """
+        waiter = self._tagged.get(tag)
+        if waiter is None or waiter.future.done():
+            return
+        if PRIORITIES.index(priority) >= PRIORITIES.index(waiter.priority):
+            return
+        self._discard(waiter)
+        waiter.priority = priority
+        self._enqueue(waiter)
+        self.stats['promoted'] += 1
+        self._dispatch()
+
+    def _enqueue(self, waiter: _Waiter):
+        queues = self._queues[waiter.priority]
+        queue = queues.get(waiter.user)
+        if queue is None:
+            queue = queues[waiter.user] = deque()
+            self._order[waiter.priority].append(waiter.user)
+        queue.append(waiter)
+
+    def _dispatch(self):
+        while self.in_flight < self.config.max_concurrency:
+            waiter = self._next_waiter()
+            if waiter is None:
+                return
+            self._grant(waiter.user, waiter.priority)
+            waiter.future.set_result(None)
+
+    def _next_waiter(self) -> Optional[_Waiter]:
+        """Первый по кругу запрос самого приоритетного класса, которому можно выдать слот"""
+        for priority in PRIORITIES:
+            order = self._order[priority]
+            for _ in range(len(order)):
+                user = order.popleft()
+                if not self._can_start(user, priority):
+                    order.append(user)
+                    continue
+                queue = self._queues[priority][user]
+                waiter = queue.popleft()
+                if queue:
+                    order.append(user)
+                else:
+                    del self._queues[priority][user]
+                return waiter
+        return None
+
+    def _discard(self, waiter: _Waiter):
+        """Убирает запрос из очереди (отмена или смена приоритета)"""
+        queues = self._queues[waiter.priority]
+        queue = queues.get(waiter.user)
+        if queue is None:
+            return
+        try:
+            queue.remove(waiter)
+        except ValueError:
+            return
+        if not queue:
+            del queues[waiter.user]
+            self._order[waiter.priority].remove(waiter.user)
+
+    def _observe(self, priority: str, started: float):
+        QUEUE_WAIT.observe(time.monotonic() - started, upstream=self.name, priority=priority)
+
+    @asynccontextmanager
+    async def slot(self, description: str, deadline: Optional[Deadline] = None, tag: Optional[Hashable] = None):
+        """
+        Слот для запроса от имени текущего пользователя с текущим классом приоритета
+
+        Raises:
+            DeadlineExceededError: слот не освободился до крайнего срока (или за max_wait)
+            RequestDroppedError: предзагрузка отброшена из-за малого бюджета ключей
+        """
+        if not self.config.enabled:
+            yield
+            return
+        user = current_user_id.get()
+        timeout = deadline.remaining() if deadline is not None else self.config.max_wait
+        try:
+            priority = await self.acquire(user, current_priority.get(), timeout, tag)
+        except asyncio.TimeoutError:
+            logging.warning(f"[SCHEDULER] No free {self.name} slot for {description}")
+            raise DeadlineExceededError(f"no free request slot for {description}") from None
+        try:
+            yield
+        finally:
+            self.release(user, priority)
+
+    def collect_metrics(self):
+        """Переносит состояние планировщика в реестр метрик"""
+        gauge = registry.gauge(
+            "upstream_scheduler", "Upstream request scheduler state and counters", ("upstream", "stat")
+        )
+        for stat, value in self.stats.items():
+            gauge.set(value, upstream=self.name, stat=stat)
+        gauge.set(self.budget(), upstream=self.name, stat="key_budget")
+
+        by_priority = registry.gauge(
+            "upstream_scheduler_requests", "Requests in flight and waiting by priority class",
+            ("upstream", "priority", "state")
+        )
+        for priority in PRIORITIES:
+            waiting = sum(len(queue) for queue in self._queues[priority].values())
+            by_priority.set(self._in_flight[priority], upstream=self.name, priority=priority, state="in_flight")
+            by_priority.set(waiting, upstream=self.name, priority=priority, state="waiting")
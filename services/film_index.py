@@ -0,0 +1,318 @@
+import asyncio
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+from core import load_config
+from core.config import FilmIndexConfig
+from utils import codec
+from utils.pagination import API_PAGE_SIZE
+from utils.query_normalizer import normalize_query
+from services.metrics import registry
+
+# Слова запроса для FTS5 (буквы и цифры любого алфавита)
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+class FilmIndex:
+    """
+    Локальный полнотекстовый индекс фильмов (SQLite FTS5). Пополняется всеми
+    карточками и списками фильмов, которые бот получает от API, отвечает на
+    поиск по названию, если уверен в ответе (есть фильм с точно таким названием),
+    и служит запасным источником, когда API недоступен или ключи исчерпаны.
+
+    Запись идет через буфер: ingest() только складывает фильмы в память,
+    а фоновая задача пачкой сбрасывает их в базу в отдельном потоке
+    """
+
+    def __init__(self, config: FilmIndexConfig):
+        self.config = config
+        self._db: Optional[sqlite3.Connection] = None
+        # Соединение одно на процесс, запросы к нему идут из потоков asyncio.to_thread
+        self._lock = threading.Lock()
+        self._pending: Dict[int, dict] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._size = 0
+        self.stats = {
+            'ingested': 0, 'evicted': 0, 'local_answers': 0, 'fallback_answers': 0,
+            'fallback_misses': 0, 'fallback_details': 0, 'errors': 0
+        }
+
+    @property
+    def is_open(self) -> bool:
+        return self._db is not None
+
+    async def open(self):
+        """Открывает (создает) базу индекса"""
+        if not self.config.enabled or self._db is not None:
+            return
+        try:
+            await asyncio.to_thread(self._open)
+            logging.info(f"[FILM INDEX] Opened {self.config.path} ({self._size} films)")
+        except (OSError, sqlite3.Error) as e:
+            self._db = None
+            logging.error(f"[FILM INDEX] Failed to open {self.config.path}: {e}")
+
+    def _open(self):
+        directory = os.path.dirname(self.config.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(self.config.path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.executescript("""
+            CREATE TABLE IF NOT EXISTS films (
+                kinopoisk_id INTEGER PRIMARY KEY,
+                data TEXT NOT NULL,
+                rating REAL,
+                last_seen REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS films_last_seen ON films (last_seen);
+            CREATE VIRTUAL TABLE IF NOT EXISTS films_fts USING fts5(
+                names, tokenize = 'unicode61 remove_diacritics 2'
+            );
+        """)
+        self._size = db.execute("SELECT COUNT(*) FROM films").fetchone()[0]
+        self._db = db
+
+    async def close(self):
+        """Сбрасывает буфер и закрывает базу"""
+        if self._db is None:
+            return
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        await self.flush()
+        with self._lock:
+            self._db.close()
+            self._db = None
+        logging.info("[FILM INDEX] Closed")
+
+    def ingest(self, films: Iterable[Dict[str, Any]]):
+        """
+        Добавляет фильмы (компактные словари models.film) в очередь на запись.
+        Не блокирует: запись выполняется фоновой задачей раз в flush_interval
+        """
+        if self._db is None:
+            return
+        for film in films:
+            film_id = film.get('kinopoisk_id')
+            if not film_id:
+                continue
+            # Карточка богаче элемента списка: новые поля дополняют уже известные
+            pending = self._pending.get(int(film_id))
+            self._pending[int(film_id)] = {**pending, **film} if pending else dict(film)
+
+        if self._pending and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        await asyncio.sleep(self.config.flush_interval)
+        await self.flush()
+
+    async def flush(self):
+        """Записывает накопленные фильмы в базу и соблюдает лимит размера индекса"""
+        if not self._pending or self._db is None:
+            return
+        batch, self._pending = self._pending, {}
+        try:
+            await asyncio.to_thread(self._write, batch)
+        except sqlite3.Error as e:
+            self.stats['errors'] += 1
+            logging.error(f"[FILM INDEX] Failed to write {len(batch)} films: {e}")
+
+    def _write(self, batch: Dict[int, dict]):
+        now = time.time()
+        with self._lock, self._db:
+            new_films = 0
+            for film_id, film in batch.items():
+                known = self._db.execute("SELECT data FROM films WHERE kinopoisk_id = ?", (film_id,)).fetchone()
+                if known:
+                    film = {**codec.loads(known[0]), **film}
+                    self._db.execute("DELETE FROM films_fts WHERE rowid = ?", (film_id,))
+                else:
+                    new_films += 1
+                self._db.execute(
+                    "INSERT OR REPLACE INTO films (kinopoisk_id, data, rating, last_seen) VALUES (?, ?, ?, ?)",
+                    (film_id, codec.dumps(film), self._rating(film), now)
+                )
+                self._db.execute(
+                    "INSERT INTO films_fts (rowid, names) VALUES (?, ?)", (film_id, self._names(film))
+                )
+            self._size += new_films
+            self.stats['ingested'] += len(batch)
+
+            # Лимит размера: вытесняем фильмы, которые дольше всех не встречались в ответах API
+            excess = self._size - self.config.max_films
+            if excess > 0:
+                evicted = [row[0] for row in self._db.execute(
+                    "SELECT kinopoisk_id FROM films ORDER BY last_seen LIMIT ?", (excess,)
+                )]
+                self._db.executemany("DELETE FROM films WHERE kinopoisk_id = ?", [(i,) for i in evicted])
+                self._db.executemany("DELETE FROM films_fts WHERE rowid = ?", [(i,) for i in evicted])
+                self._size -= len(evicted)
+                self.stats['evicted'] += len(evicted)
+
+    @staticmethod
+    def _names(film: dict) -> str:
+        """Текст для полнотекстового поиска: все известные названия фильма в канонической форме"""
+        return normalize_query(" ".join(
+            str(film[field]) for field in ('name_ru', 'name_en', 'name_original') if film.get(field)
+        ))
+
+    @staticmethod
+    def _rating(film: dict) -> Optional[float]:
+        try:
+            return float(film['rating_kinopoisk'])
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _match_expression(query: str, prefix: bool = True) -> Optional[str]:
+        """
+        Запрос FTS5: все слова обязательны, последнее слово - префикс
+        (пользователь мог не дописать название); prefix=False - только целые слова
+        """
+        tokens = _TOKEN_RE.findall(query)
+        if not tokens:
+            return None
+        terms = [f'"{token}"' for token in tokens]
+        if prefix:
+            terms[-1] += "*"
+        return " AND ".join(terms)
+
+    async def answer(self, query: str, page: int = 1) -> Optional[dict]:
+        """
+        Ответ на поиск без API, только если индекс в нем уверен: в индексе есть фильм
+        с точно таким названием, совпадений по целым словам не меньше min_local_hits
+        и их число не упирается в max_results. Короткие и общие запросы (одно слово,
+        префикс из пары букв) уходят в API: список и порядок результатов знает только он
+        """
+        if not self.config.min_local_hits:
+            return None
+        result = await self.search(query, page, self.config.min_local_hits, exact=True)
+        if result is not None:
+            self.stats['local_answers'] += 1
+        return result
+
+    async def fallback(self, query: str, page: int = 1) -> Optional[dict]:
+        """Ответ на поиск, когда API недоступен: подходит любое число совпадений"""
+        result = await self.search(query, page)
+        self.stats['fallback_answers' if result is not None else 'fallback_misses'] += 1
+        return result
+
+    async def search(self, query: str, page: int = 1, min_hits: int = 1, exact: bool = False) -> Optional[dict]:
+        """
+        Ищет фильмы по названию в локальном индексе
+
+        Args:
+            query: Поисковый запрос пользователя
+            page: Номер страницы (размер страницы как у API)
+            min_hits: Сколько совпадений нужно, чтобы ответ считался достаточным
+            exact: Только уверенный ответ: совпадения по целым словам, среди них есть фильм
+                с названием, равным запросу, и их меньше max_results
+        Returns:
+            Страница в формате кэша API ({'total', 'totalPages', 'items'}) или None
+        """
+        if self._db is None:
+            return None
+        # Названия в индексе хранятся в канонической форме (FTS5 не сворачивает ё/е)
+        title = normalize_query(query)
+        expression = self._match_expression(title, prefix=not exact)
+        if expression is None:
+            return None
+        try:
+            total, rows, has_title = await asyncio.to_thread(self._search, expression, page, title if exact else None)
+        except sqlite3.Error as e:
+            self.stats['errors'] += 1
+            logging.error(f"[FILM INDEX] Search error for {query!r}: {e}")
+            return None
+        if total < max(min_hits, 1):
+            return None
+        if exact and (not has_title or total >= self.config.max_results):
+            return None
+        return {
+            'total': total,
+            'totalPages': (total + API_PAGE_SIZE - 1) // API_PAGE_SIZE,
+            'items': [codec.loads(data) for data in rows]
+        }
+
+    def _search(self, expression: str, page: int, title: Optional[str] = None):
+        with self._lock:
+            # Считаем не дальше max_results: для очень общих запросов точное число не нужно
+            total = self._db.execute(
+                "SELECT COUNT(*) FROM (SELECT 1 FROM films_fts WHERE films_fts MATCH ? LIMIT ?)",
+                (expression, self.config.max_results)
+            ).fetchone()[0]
+            rows = self._db.execute(
+                """
+                SELECT films.data FROM films_fts
+                JOIN films ON films.kinopoisk_id = films_fts.rowid
+                WHERE films_fts MATCH ?
+                ORDER BY bm25(films_fts), films.rating DESC
+                LIMIT ? OFFSET ?
+                """,
+                (expression, API_PAGE_SIZE, (page - 1) * API_PAGE_SIZE)
+            ).fetchall()
+            # Есть ли среди совпадений фильм, одно из названий которого равно запросу
+            has_title = title is not None and any(
+                self._has_name(codec.loads(data), title) for (data,) in self._db.execute(
+                    """
+                    SELECT films.data FROM films_fts
+                    JOIN films ON films.kinopoisk_id = films_fts.rowid
+                    WHERE films_fts MATCH ? LIMIT ?
+                    """,
+                    (expression, self.config.max_results)
+                )
+            )
+        return total, [row[0] for row in rows], has_title
+
+    @staticmethod
+    def _has_name(film: dict, title: str) -> bool:
+        # Сравниваем слова: пунктуацию в названиях ("Матрица: Перезагрузка") пользователи обычно не набирают
+        words = _TOKEN_RE.findall(title)
+        return any(
+            _TOKEN_RE.findall(normalize_query(str(film[field]))) == words
+            for field in ('name_ru', 'name_en', 'name_original') if film.get(field)
+        )
+
+    async def get(self, film_id) -> Optional[dict]:
+        """Компактные данные фильма из индекса (карточка, когда API недоступен)"""
+        if self._db is None:
+            return None
+        try:
+            film_id = int(film_id)
+        except (TypeError, ValueError):
+            return None
+        if film_id in self._pending:
+            self.stats['fallback_details'] += 1
+            return self._pending[film_id]
+        try:
+            row = await asyncio.to_thread(self._get, film_id)
+        except sqlite3.Error as e:
+            self.stats['errors'] += 1
+            logging.error(f"[FILM INDEX] Lookup error for film {film_id}: {e}")
+            return None
+        if row is None:
+            return None
+        self.stats['fallback_details'] += 1
+        return codec.loads(row)
+
+    def _get(self, film_id: int) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT data FROM films WHERE kinopoisk_id = ?", (film_id,)).fetchone()
+        return row[0] if row else None
+
+    def collect_metrics(self):
+        """Переносит статистику индекса в реестр метрик"""
+        gauge = registry.gauge("film_index", "Local film index counters", ("stat",))
+        for stat, value in self.stats.items():
+            gauge.set(value, stat=stat)
+        gauge.set(self._size, stat="films")
+        gauge.set(len(self._pending), stat="pending")
+
+config = load_config()
+
+film_index = FilmIndex(config.film_index)
+registry.add_collector(film_index.collect_metrics)
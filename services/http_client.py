@@ -0,0 +1,86 @@
+import aiohttp
+import asyncio
+import logging
+import ssl
+from typing import Optional
+from core.config import HttpConfig
+
+class HttpClient:
+    """Общая долгоживущая aiohttp-сессия с пулом keep-alive соединений"""
+    _session: Optional[aiohttp.ClientSession] = None
+    _config: HttpConfig = HttpConfig()
+    # Один SSL контекст на процесс, чтобы не пересоздавать его на каждое соединение
+    _ssl_context: Optional[ssl.SSLContext] = None
+
+    @classmethod
+    def _create_session(cls) -> aiohttp.ClientSession:
+        """Создает сессию с настроенным TCPConnector"""
+        if cls._ssl_context is None:
+            cls._ssl_context = ssl.create_default_context()
+
+        connector = aiohttp.TCPConnector(
+            limit=cls._config.limit,
+            limit_per_host=cls._config.limit_per_host,
+            keepalive_timeout=cls._config.keepalive_timeout,
+            use_dns_cache=True,
+            ttl_dns_cache=cls._config.dns_cache_ttl,
+            ssl=cls._ssl_context,
+            enable_cleanup_closed=True
+        )
+        return aiohttp.ClientSession(connector=connector)
+
+    @classmethod
+    async def start(cls, config: HttpConfig):
+        """Открывает сессию при старте бота"""
+        cls._config = config
+        if cls._session is None or cls._session.closed:
+            cls._session = cls._create_session()
+            logging.info(
+                f"[HTTP CLIENT] Session opened (limit={config.limit}, "
+                f"per_host={config.limit_per_host}, keepalive={config.keepalive_timeout}s)"
+            )
+
+    @classmethod
+    def get_session(cls) -> aiohttp.ClientSession:
+        """Возвращает общую сессию, создавая ее при необходимости"""
+        if cls._session is None or cls._session.closed:
+            # Сессия не была открыта через start() (например, при запуске вне бота)
+            cls._session = cls._create_session()
+            logging.warning("[HTTP CLIENT] Session was not started explicitly, created lazily")
+        return cls._session
+
+    @classmethod
+    async def warmup(cls, url: str, connections: Optional[int] = None):
+        """
+        Заранее открывает несколько соединений к хосту, чтобы первые запросы
+        пользователей не тратили время на DNS, TCP и TLS рукопожатия
+
+        Args:
+            url: Адрес хоста (HEAD запрос не расходует квоту API)
+            connections: Количество соединений, по умолчанию из конфига
+        """
+        count = connections if connections is not None else cls._config.warmup_connections
+        if count <= 0:
+            return
+
+        session = cls.get_session()
+
+        async def _open_connection():
+            try:
+                async with session.head(url, allow_redirects=False) as response:
+                    await response.read()
+                    return True
+            except Exception as e:
+                logging.warning(f"[HTTP CLIENT] Warmup request to {url} failed: {e}")
+                return False
+
+        results = await asyncio.gather(*(_open_connection() for _ in range(count)))
+        logging.info(f"[HTTP CLIENT] Warmed up {sum(results)}/{count} connections to {url}")
+
+    @classmethod
+    async def close(cls):
+        """Закрывает сессию при остановке бота"""
+        if cls._session is not None and not cls._session.closed:
+            await cls._session.close()
+            logging.info("[HTTP CLIENT] Session closed")
+        cls._session = None
@@ -1,26 +1,107 @@
 import aiohttp
+import asyncio
 import logging
 import json
+import hashlib
+import os
 import time
-from typing import Optional, Tuple, Dict
+from typing import Optional, Tuple, Dict, List, NamedTuple, Set
+from urllib.parse import urlsplit
 from core import load_config
 from services.kinopoisk_key_manager import KinopoiskApiKeyManager
+from services.http_client import HttpClient
+from services.cache import response_cache, negative_key, MISSING
+from services.redis_service import RedisService
+from services.film_index import film_index
+from services.fair_scheduler import (
+    FairScheduler, current_priority, request_priority, INTERACTIVE, PREFETCH, MAINTENANCE
+)
+from services.resilience import (
+    UpstreamUnavailableError,
+    DeadlineExceededError,
+    get_circuit_breaker,
+    backoff_delay,
+    is_retryable_status,
+    build_timeout
+)
+from utils.deadline import Deadline
+from utils import codec
+from models.film import FilmDetails, compact_film_page, build_film_page
+from utils.query_normalizer import normalize_query
+from services.metrics import (
+    registry, UPSTREAM_LATENCY, KINOPOISK_QUOTA_EXHAUSTED, KINOPOISK_KEY_SWITCHES, SEARCH_QUERIES
+)
 
 
 config = load_config()
-key_manager = KinopoiskApiKeyManager(config.KINOPOISK_API_KEYS)
+
+# Ответ 404: ресурса нет, повторять запрос бессмысленно (кэшируется как негативная запись)
+NOT_FOUND = object()
+
+class FilmDetailsResult(NamedTuple):
+    """Результат пакетной загрузки карточки фильма"""
+    film_id: str
+    data: Optional[FilmDetails]
+    error: Optional[str] = None
+
+key_manager = KinopoiskApiKeyManager(config.KINOPOISK_API_KEYS, config.key_scheduler)
 
 class KinopoiskAPI:
     def __init__(self):
-        self.base_url = "https://kinopoiskapiunofficial.tech/api/v2.2"
+        self.base_url = config.upstreams.kinopoisk_base_url
         self.key_manager = key_manager
         self.headers = {
             "X-API-KEY": self.key_manager.current_key,
             "Content-Type": "application/json"
         }
-        self._filters_cache = None
-        self._cache_timestamp = None
-        self._cache_duration = 3600  # 1 час
+        # Двухуровневый кэш ответов API (память процесса + Redis) и счетчики попаданий по классам эндпоинтов
+        self.cache = response_cache
+        self.cache_config = config.cache
+        self.cache_stats = {
+            endpoint_class: {'hits': 0, 'negative_hits': 0, 'misses': 0, 'bypass': 0}
+            for endpoint_class in ('details', 'collections', 'search', 'filters')
+        }
+
+        # Повторы с откатом и предохранитель для хоста API
+        self.resilience_config = config.resilience
+        self.breaker = get_circuit_breaker(urlsplit(self.base_url).netloc, config.resilience)
+        self.timeouts = config.timeouts
+
+        # Очереди запросов по классам приоритета и пользователям; фоновые запросы
+        # придерживаются и отбрасываются по мере расхода бюджета ключей
+        self.scheduler = FairScheduler("kinopoisk", config.fair_share, key_manager.budget)
+
+        # Запросы "в полете": одинаковые параллельные вызовы ждут один и тот же future
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.singleflight_stats = {'leaders': 0, 'coalesced': 0}
+
+        # Фоновая предзагрузка следующих страниц поиска
+        self.prefetch_config = config.prefetch
+        self._prefetch_slots = asyncio.Semaphore(config.prefetch.concurrency)
+        self._prefetched: Dict[str, float] = {}  # ключ кэша -> когда отметка устареет
+        # Выполняющиеся предзагрузки: ключ кэша -> присоединился ли к ней запрос пользователя
+        self._prefetching: Dict[str, bool] = {}
+        self._background_tasks: set = set()
+        # hits - пользователь получил страницу, сохраненную предзагрузкой; joined - пользователь
+        # дождался еще выполнявшейся предзагрузки; coalesced - предзагрузка сама присоединилась
+        # к уже идущему запросу той же страницы и ничего не загрузила
+        self.prefetch_stats = {
+            'scheduled': 0, 'skipped': 0, 'completed': 0, 'failed': 0, 'hits': 0, 'joined': 0,
+            'coalesced': 0, 'wasted': 0
+        }
+
+        # Канонизация поисковых запросов: одна форма запроса - один ключ кэша
+        self.search_query_config = config.search_query
+
+        # Хеджирование медленных запросов карточек: дубль на другом ключе после p95
+        self.hedge_config = config.hedge
+        self.hedge_stats = {'requests': 0, 'hedged': 0, 'hedge_wins': 0, 'skipped_budget': 0}
+
+        # Справочник фильтров (жанры, страны): память -> Redis -> локальный файл,
+        # обновляется в фоне, чтобы inline меню фильтров не ждали API
+        self._filters: Optional[dict] = None
+        self._filters_fetched_at = 0.0
+        self._filters_refresh: Optional[asyncio.Task] = None
 
         # Словарь соответствия жанров и их ID
         self.genre_ids = {
@@ -100,41 +181,404 @@ class KinopoiskAPI:
             "NUM_VOTE": "По популярности 🔥",
             "YEAR": "По году выхода 📅"
         }
+
+    @property
+    def host_url(self) -> str:
+        """Корневой адрес хоста API (для прогрева соединений)"""
+        parts = urlsplit(self.base_url)
+        return f"{parts.scheme}://{parts.netloc}/"
+        
+    @staticmethod
+    def _get_endpoint_class(endpoint: str) -> Optional[str]:
+        """Определяет класс эндпоинта для политики кэширования"""
+        if endpoint == "films":
+            return "search"
+        if endpoint == "films/collections":
+            return "collections"
+        if endpoint == "films/filters":
+            return "filters"
+        if endpoint.startswith("films/") and endpoint.split('/', 1)[1].isdigit():
+            return "details"
+        return None
+
+    def _get_cache_key(self, endpoint: str, params: dict = None) -> str:
+        """Формирует ключ кэша из эндпоинта и канонизированных параметров"""
+        # Приводим значения к строкам и сортируем ключи, чтобы page=1 и page="1" совпадали
+        canonical = {str(k): str(v) for k, v in (params or {}).items() if v is not None}
+        if 'keyword' in canonical:
+            # Запросы, которые API не различает, делят одну запись кэша
+            canonical['keyword'] = self._normalize_query(canonical['keyword'])
+        params_str = json.dumps(canonical, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+        # v2: в кэше лежат компактные проекции ответов (models.film), а не полные ответы API
+        return f"kp:v2:{endpoint}:{hashlib.md5(params_str.encode('utf-8')).hexdigest()}"
+
+    def _get_cache_ttl(self, endpoint_class: Optional[str], params: dict = None) -> int:
+        """Возвращает время жизни кэша для класса эндпоинта (0 - не кэшировать)"""
+        if not self.cache_config.enabled or endpoint_class is None:
+            return 0
+        if endpoint_class == "details":
+            return self.cache_config.ttl_details
+        if endpoint_class == "collections":
+            if params and params.get("type") == "TOP_250_MOVIES":
+                return self.cache_config.ttl_top250
+            return self.cache_config.ttl_collections
+        if endpoint_class == "search":
+            return self.cache_config.ttl_search
+        return 0
+
+    def get_cache_stats(self) -> Dict[str, Dict]:
+        """Возвращает счетчики попаданий в кэш по классам эндпоинтов и по уровням кэша"""
+        endpoints = {}
+        for endpoint_class, counters in self.cache_stats.items():
+            lookups = counters['hits'] + counters['misses']
+            endpoints[endpoint_class] = {
+                **counters,
+                'hit_ratio': counters['hits'] / lookups if lookups else 0.0
+            }
+        return {'endpoints': endpoints, 'tiers': self.cache.get_stats()}
+
+    async def _make_request(self, endpoint: str, params: dict = None, use_cache: bool = True,
+                            deadline: Optional[Deadline] = None) -> dict:
+        """
+        Выполняет запрос к API с кэшированием ответов в Redis.
+        Параллельные вызовы с одинаковыми эндпоинтом и параметрами объединяются
+        в один запрос к API (single-flight)
+        
+        Args:
+            endpoint: Эндпоинт API относительно base_url
+            params: Параметры запроса
+            use_cache: False - не читать ответ из кэша (свежий ответ все равно будет сохранен)
+            deadline: Крайний срок обработки апдейта, после которого ответ уже не нужен
+        """
+        flight_key = self._get_cache_key(endpoint, params)
+        inflight = self._inflight.get(flight_key)
+        if inflight is not None:
+            self.singleflight_stats['coalesced'] += 1
+            if self._prefetching.get(flight_key) is False and current_priority.get() == INTERACTIVE:
+                # Страница еще не сохранена: это не попадание в предзагрузку, а общий запрос
+                self._prefetching[flight_key] = True
+                self.prefetch_stats['joined'] += 1
+            logging.info(f"[KINOPOISK API] Joining in-flight request: {endpoint}")
+            # Пользователь ждет ответ фонового запроса - он больше не фоновый
+            self.scheduler.promote(flight_key, current_priority.get())
+            return await self._await_shared(inflight, endpoint, deadline)
+
+        self.singleflight_stats['leaders'] += 1
+        task = asyncio.ensure_future(self._cached_request(endpoint, params, use_cache, deadline))
+        self._inflight[flight_key] = task
+
+        def _release(finished: asyncio.Future):
+            if self._inflight.get(flight_key) is finished:
+                del self._inflight[flight_key]
+
+        task.add_done_callback(_release)
+        return await self._await_shared(task, endpoint, deadline)
+
+    @staticmethod
+    async def _await_shared(task: asyncio.Future, endpoint: str, deadline: Optional[Deadline]) -> dict:
+        """Ждет общий запрос не дольше своего крайнего срока"""
+        # shield: отмена одного из ожидающих не должна отменять запрос для остальных
+        if deadline is None:
+            return await asyncio.shield(task)
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), deadline.remaining())
+        except asyncio.TimeoutError:
+            logging.warning(f"[KINOPOISK API] Deadline exceeded while waiting for {endpoint}")
+            return None
+
+    async def _cached_request(self, endpoint: str, params: dict = None, use_cache: bool = True,
+                              deadline: Optional[Deadline] = None) -> dict:
+        """Отдает ответ из кэша или запрашивает его у API и сохраняет в кэш"""
+        endpoint_class = self._get_endpoint_class(endpoint)
+        ttl = self._get_cache_ttl(endpoint_class, params)
+        cache_key = self._get_cache_key(endpoint, params)
+
+        if ttl:
+            stats = self.cache_stats[endpoint_class]
+            if not use_cache:
+                stats['bypass'] += 1
+            else:
+                # Обычная и негативная записи читаются вместе (одним MGET при промахе L1)
+                cached, negative = await self.cache.get_many([cache_key, negative_key(cache_key)])
+                if cached is not MISSING:
+                    stats['hits'] += 1
+                    self._track_prefetch_hit(cache_key)
+                    logging.info(f"[KINOPOISK API] Cache hit: {endpoint}")
+                    return cached
+                if negative is not MISSING:
+                    stats['negative_hits'] += 1
+                    logging.info(f"[KINOPOISK API] Negative cache hit: {endpoint}")
+                    return negative
+                stats['misses'] += 1
+
+        try:
+            # В API идут только промахи кэша: ждем своей очереди среди запросов других пользователей
+            async with self.scheduler.slot(endpoint, deadline, tag=cache_key):
+                if endpoint_class == "details" and self.hedge_config.enabled:
+                    result = await self._fetch_hedged(endpoint, params, deadline)
+                else:
+                    result = await self._fetch(endpoint, params, deadline)
+        except UpstreamUnavailableError as e:
+            logging.warning(f"[KINOPOISK API] Upstream unavailable: {e}")
+            # API недоступен - отдаем устаревший ответ, если он еще есть в кэше
+            stale = await self.cache.get_stale(cache_key) if ttl else MISSING
+            if stale is not MISSING:
+                logging.info(f"[KINOPOISK API] Serving stale cache: {endpoint}")
+                return stale
+            return None
+
+        not_found = result is NOT_FOUND
+        if not_found:
+            result = None
+
+        # Храним и раздаем ожидающим только поля, которые использует бот
+        result = self._project(endpoint_class, result)
+        if result:
+            self._index(endpoint_class, result)
+        if ttl:
+            if self.cache_config.ttl_negative and (not_found or self._is_empty_page(endpoint_class, result)):
+                # 404 и пустой поиск кэшируем ненадолго и отдельно, без хранения устаревших записей
+                await self.cache.set(negative_key(cache_key), result, self.cache_config.ttl_negative, keep_stale=False)
+            elif result:
+                await self.cache.set(cache_key, result, ttl)
+        return result
+
+    @staticmethod
+    def _is_empty_page(endpoint_class: Optional[str], data: Optional[dict]) -> bool:
+        """Поиск ничего не нашел"""
+        return endpoint_class == "search" and data is not None and not data['total'] and not data['items']
+
+    @staticmethod
+    def _index(endpoint_class: Optional[str], data: dict):
+        """Отправляет фильмы из свежего ответа API в локальный поисковый индекс"""
+        if endpoint_class == "details":
+            film_index.ingest([data])
+        elif endpoint_class in ("search", "collections"):
+            film_index.ingest(data['items'])
+
+    @staticmethod
+    def _project(endpoint_class: Optional[str], data: Optional[dict]) -> Optional[dict]:
+        """Компактная проекция ответа API для кэша (см. models.film)"""
+        if not data:
+            return data
+        if endpoint_class == "details":
+            return FilmDetails.from_api(data).to_dict()
+        if endpoint_class in ("search", "collections"):
+            return compact_film_page(data)
+        return data
+
+    async def _fetch(self, endpoint: str, params: dict = None, deadline: Optional[Deadline] = None,
+                     exclude_keys: Optional[Set[int]] = None, used_keys: Optional[Set[int]] = None) -> dict:
+        """
+        Выполняет запрос к API с перебором ключей и повторами временных ошибок
         
-    async def _make_request(self, endpoint: str, params: dict = None) -> dict:
-        """Выполняет запрос к API с перебором ключей"""
+        Args:
+            exclude_keys: Индексы ключей, которые нельзя использовать (ключи основного запроса при хеджировании)
+            used_keys: Сюда добавляются индексы ключей, которыми воспользовался запрос
+        Returns:
+            Разобранный ответ, NOT_FOUND при ответе 404 или None при остальных ошибках
+        Raises:
+            UpstreamUnavailableError: предохранитель разомкнут или повторы исчерпаны
+            DeadlineExceededError: ответ уже не успеет прийти до крайнего срока
+        """
+        endpoint_class = self._get_endpoint_class(endpoint) or "other"
+        endpoint_timeout = getattr(self.timeouts, endpoint_class, self.timeouts.details)
+        if deadline is not None and deadline.expired:
+            raise DeadlineExceededError(f"no time left for {endpoint}")
+        if not self.breaker.allow_request():
+            raise UpstreamUnavailableError(f"circuit {self.breaker.name} is {self.breaker.state}")
+
         url = f"{self.base_url}/{endpoint}"
         logging.info(f"[KINOPOISK API] Sending request to API")
         logging.info(f"[KINOPOISK API] Request params: {json.dumps(params, ensure_ascii=False)}")
-        for _ in range(len(self.key_manager.api_keys)):
-            headers = {
-                "X-API-KEY": self.key_manager.current_key,
-                "Content-Type": "application/json"
-            }
-            try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(url, params=params, headers=headers) as response:
+        try:
+            retries = 0
+            # Каждый ключ может получить 402 или 429, поэтому попыток вдвое больше числа ключей
+            for _ in range(len(self.key_manager.api_keys) * 2 + self.resilience_config.retries):
+                lease = await self.key_manager.acquire(
+                    exclude=exclude_keys, max_wait=deadline.remaining() if deadline else None
+                )
+                if lease is None:
+                    logging.error(f"[KINOPOISK API] No available API keys.")
+                    self.breaker.release()
+                    return None
+                key_index, api_key = lease
+                if used_keys is not None:
+                    used_keys.add(key_index)
+                headers = {
+                    "X-API-KEY": api_key,
+                    "Content-Type": "application/json"
+                }
+                try:
+                    # Таймаут урезается до остатка времени: запрос, который не успеет, не отправляем
+                    timeout = build_timeout(endpoint_timeout, deadline)
+                except DeadlineExceededError:
+                    logging.warning(f"[KINOPOISK API] Deadline exceeded, request to {endpoint} cancelled")
+                    self.breaker.release()
+                    raise
+                started = time.monotonic()
+                try:
+                    session = HttpClient.get_session()
+                    async with session.get(url, params=params, headers=headers, timeout=timeout) as response:
                         status = response.status
-                        response_text = await response.text()
-                        logging.info(f"[KINOPOISK API] Response status: {status}")
+                        # Тело читаем один раз и декодируем сразу из байтов
+                        body = await response.read()
+                        self._observe(endpoint_class, status, key_index, started)
+                        logging.info(f"[KINOPOISK API] Response status: {status} (key #{key_index + 1})")
                         if status == 200:
-                            return await response.json()
+                            self.breaker.record_success()
+                            return codec.loads(body)
                         elif status == 402:
-                            logging.warning(f"[KINOPOISK API] API key limit reached: {self.key_manager.current_key}. Switching key...")
-                            try:
-                                self.key_manager.next_key()
-                            except RuntimeError:
-                                logging.error(f"[KINOPOISK API] All API keys exhausted.")
-                                return None
+                            logging.warning(f"[KINOPOISK API] API key #{key_index + 1} quota exhausted. Switching key...")
+                            KINOPOISK_QUOTA_EXHAUSTED.inc(key=key_index + 1)
+                            KINOPOISK_KEY_SWITCHES.inc(reason="402")
+                            self.key_manager.mark_exhausted(key_index)
                             continue
-                        else:
-                            logging.error(f"[KINOPOISK API] Error response: {response_text}")
-                            return None
-            except Exception as e:
-                logging.error(f"[KINOPOISK API] Request error: {str(e)}")
-                return None
-        logging.error(f"[KINOPOISK API] No valid API keys left.")
-        return None
+                        elif status == 429:
+                            logging.warning(f"[KINOPOISK API] API key #{key_index + 1} rate limited. Switching key...")
+                            KINOPOISK_KEY_SWITCHES.inc(reason="429")
+                            self.key_manager.mark_rate_limited(key_index, self._parse_retry_after(response))
+                            continue
+                        elif not is_retryable_status(status):
+                            # Хост ответил осмысленной ошибкой (404 и т.п.) - он жив, повторять нечего
+                            self.breaker.record_success()
+                            logging.error(f"[KINOPOISK API] Error response: {body.decode('utf-8', 'replace')[:500]}")
+                            return NOT_FOUND if status == 404 else None
+                        logging.warning(f"[KINOPOISK API] Server error {status}: {body[:200].decode('utf-8', 'replace')}")
+                except asyncio.TimeoutError as e:
+                    self._observe(endpoint_class, "timeout", key_index, started)
+                    logging.warning(f"[KINOPOISK API] Transient request error: {e!r}")
+                except aiohttp.ClientError as e:
+                    self._observe(endpoint_class, "error", key_index, started)
+                    logging.warning(f"[KINOPOISK API] Transient request error: {e!r}")
+                except Exception as e:
+                    logging.error(f"[KINOPOISK API] Request error: {str(e)}")
+                    self.breaker.release()
+                    return None
+
+                # Временная ошибка (5xx, таймаут, обрыв соединения): повторяем с откатом
+                self.breaker.record_failure()
+                if retries >= self.resilience_config.retries or not self.breaker.allow_request():
+                    raise UpstreamUnavailableError(f"{endpoint} failed after {retries + 1} attempts")
+                delay = backoff_delay(retries, self.resilience_config)
+                if deadline is not None and delay + Deadline.MIN_REQUEST_TIME > deadline.remaining():
+                    raise DeadlineExceededError(f"no time left to retry {endpoint}")
+                retries += 1
+                logging.info(f"[KINOPOISK API] Retry {retries}/{self.resilience_config.retries} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+            logging.error(f"[KINOPOISK API] No valid API keys left.")
+            self.breaker.release()
+            return None
+        except asyncio.CancelledError:
+            # Запрос отменен (проигравший дубль при хеджировании): не держим пробный слот предохранителя
+            self.breaker.release()
+            raise
+
+    def _get_hedge_delay(self) -> float:
+        """Через сколько секунд без ответа отправлять дубль: наблюдаемый квантиль задержки карточек"""
+        labels = {'upstream': "kinopoisk", 'endpoint': "details", 'status': 200}
+        if UPSTREAM_LATENCY.count(**labels) < self.hedge_config.min_samples:
+            return self.hedge_config.fallback_delay
+        delay = UPSTREAM_LATENCY.quantile(self.hedge_config.quantile, **labels)
+        return max(self.hedge_config.min_delay, delay or self.hedge_config.fallback_delay)
+
+    def _can_hedge(self) -> bool:
+        """Дубль разрешен, если есть второй ключ и с ним доля дублей не превысит max_ratio"""
+        if self.key_manager.available_keys() < 2:
+            return False
+        # Считаем с учетом нового дубля: иначе сразу после старта дублируется каждый медленный запрос
+        if self.hedge_stats['hedged'] + 1 > self.hedge_config.max_ratio * self.hedge_stats['requests']:
+            self.hedge_stats['skipped_budget'] += 1
+            return False
+        return True
+
+    async def _fetch_hedged(self, endpoint: str, params: dict = None, deadline: Optional[Deadline] = None) -> dict:
+        """
+        Запрос с хеджированием: если основной запрос не ответил за наблюдаемый p95,
+        отправляет дубль на другом ключе и возвращает первый успешный ответ,
+        а проигравший запрос отменяет
+        """
+        self.hedge_stats['requests'] += 1
+        primary_keys: Set[int] = set()
+        primary = asyncio.ensure_future(self._fetch(endpoint, params, deadline, used_keys=primary_keys))
+
+        delay = self._get_hedge_delay()
+        if deadline is not None and delay + Deadline.MIN_REQUEST_TIME > deadline.remaining():
+            return await primary
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done or not self._can_hedge():
+            return await primary
+
+        self.hedge_stats['hedged'] += 1
+        logging.info(f"[KINOPOISK API] No response for {endpoint} in {delay:.2f}s, sending hedged request")
+        hedge = asyncio.ensure_future(self._fetch(endpoint, params, deadline, exclude_keys=primary_keys))
+        # Ошибка проигравшего запроса никому не нужна, но должна быть прочитана
+        hedge.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if not task.cancelled() and task.exception() is None and task.result() is not None:
+                        if task is hedge:
+                            self.hedge_stats['hedge_wins'] += 1
+                        return task.result()
+            # Ни один запрос не вернул данные - результат основного (None или его исключение)
+            return primary.result()
+        finally:
+            for task in (primary, hedge):
+                if not task.done():
+                    task.cancel()
+
+    @staticmethod
+    def _observe(endpoint_class: str, status, key_index: int, started: float):
+        """Записывает длительность попытки запроса в гистограмму задержек"""
+        UPSTREAM_LATENCY.observe(
+            time.monotonic() - started,
+            upstream="kinopoisk", endpoint=endpoint_class, status=status, key=key_index + 1
+        )
+
+    def collect_metrics(self):
+        """Переносит внутреннюю статистику сервиса в реестр метрик"""
+        cache_gauge = registry.gauge("api_cache_lookups", "Response cache lookups by endpoint class", ("endpoint", "result"))
+        for endpoint_class, counters in self.cache_stats.items():
+            for result, value in counters.items():
+                cache_gauge.set(value, endpoint=endpoint_class, result=result)
+
+        tier_gauge = registry.gauge("api_cache_tier", "Tiered cache counters", ("tier", "stat"))
+        for tier, stats in self.cache.get_stats().items():
+            if isinstance(stats, dict):
+                for stat, value in stats.items():
+                    tier_gauge.set(value, tier=tier, stat=stat)
+            else:
+                tier_gauge.set(stats, tier="all", stat=tier)
+
+        prefetch_gauge = registry.gauge("kinopoisk_prefetch", "Search prefetch counters", ("stat",))
+        for stat, value in self.get_prefetch_stats().items():
+            prefetch_gauge.set(value, stat=stat)
+
+        singleflight_gauge = registry.gauge("kinopoisk_singleflight", "Single-flight request counters", ("role",))
+        for role, value in self.singleflight_stats.items():
+            singleflight_gauge.set(value, role=role)
+
+        hedge_gauge = registry.gauge("kinopoisk_hedge", "Hedged film details requests", ("stat",))
+        for stat, value in self.hedge_stats.items():
+            hedge_gauge.set(value, stat=stat)
+
+        registry.gauge("kinopoisk_available_keys", "API keys with remaining quota").set(self.key_manager.available_keys())
+        usage_gauge = registry.gauge("kinopoisk_key_requests", "Requests sent with each API key in the current day", ("key",))
+        for key_index, used in enumerate(self.key_manager.usage()):
+            usage_gauge.set(used, key=key_index + 1)
+
+    @staticmethod
+    def _parse_retry_after(response: aiohttp.ClientResponse) -> Optional[float]:
+        """Достает значение заголовка Retry-After в секундах"""
+        try:
+            return float(response.headers.get("Retry-After", ""))
+        except ValueError:
+            return None
 
     @staticmethod
     async def parse_search_query(query: str) -> Tuple[str, Optional[int], Optional[str]]:
@@ -156,8 +600,53 @@ class KinopoiskAPI:
         
         return title, year, genre
 
-    async def search_films(self, query: str, page: int = 1, filters: dict = None) -> dict:
-        """Поиск фильмов"""
+    def canonical_query(self, query: str) -> str:
+        """
+        Каноническая форма запроса пользователя: по ней строятся ключ кэша
+        и ID поиска (в API и пользователю уходит исходный текст)
+        """
+        canonical = self._normalize_query(query)
+        SEARCH_QUERIES.inc(normalized="changed" if canonical != query else "unchanged")
+        return canonical
+
+    def _normalize_query(self, query: str) -> str:
+        """Канонизирует запрос, если это включено в конфиге (повторная канонизация ничего не меняет)"""
+        if not self.search_query_config.normalize:
+            return query
+        return normalize_query(query)
+
+    async def search_films(self, query: str, page: int = 1, filters: dict = None, use_cache: bool = True,
+                           deadline: Optional[Deadline] = None) -> Optional[dict]:
+        """
+        Поиск фильмов: {'total', 'totalPages', 'items': [FilmSummary, ...]}.
+        Поиск по названию без фильтров сначала идет в локальный индекс: если он
+        уверен в ответе (см. FilmIndex.answer), API не вызывается (в ответе 'local': True).
+        Если API недоступен, отдаются любые совпадения из индекса
+        """
+        # В API уходит запрос пользователя, свернутая форма - только в ключе кэша
+        query = query.strip()
+
+        if not filters and use_cache:
+            local = await film_index.answer(query, page)
+            if local is not None:
+                logging.info(f"[KINOPOISK API] Search answered from local index: {query!r}, page {page}")
+                return {**build_film_page(local), 'local': True}
+
+        params = self._build_search_params(query, page, filters)
+        result = await self._make_request("films", params, use_cache=use_cache, deadline=deadline)
+        if result:
+            return build_film_page(result)
+
+        if not filters:
+            local = await film_index.fallback(query, page)
+            if local is not None:
+                logging.warning(f"[KINOPOISK API] API unavailable, search served from local index: {query!r}")
+                return {**build_film_page(local), 'local': True}
+        return None
+
+    @staticmethod
+    def _build_search_params(query: str, page: int = 1, filters: dict = None) -> dict:
+        """Формирует параметры поискового запроса из ключевого слова и фильтров"""
         params = {
             'keyword': query,
             'page': page
@@ -197,62 +686,292 @@ class KinopoiskAPI:
         
             logging.info(f"[KINOPOISK API] Prepared search params: {json.dumps(params, ensure_ascii=False)}")
 
-        return await self._make_request("films", params)
+        return params
 
-    async def get_film_details(self, film_id: str) -> dict:
+    def prefetch_search(self, query: str, page: int, filters: dict = None):
+        """
+        Запускает фоновую загрузку страницы поиска в кэш ответов, чтобы
+        переход пользователя на следующую страницу API отдавался из кэша.
+        Не блокирует вызывающего; при занятых слотах предзагрузка пропускается
+        """
+        if not self.prefetch_config.enabled:
+            return
+        params = self._build_search_params(query.strip(), page, filters)
+        cache_key = self._get_cache_key("films", params)
+        self._expire_prefetched()
+
+        if cache_key in self._prefetched or cache_key in self._inflight:
+            self.prefetch_stats['skipped'] += 1
+            return
+        if self._prefetch_slots.locked() or self.scheduler.should_drop(PREFETCH):
+            # Предзагрузка низкоприоритетна: не копим очередь и не тратим последние запросы ключей
+            self.prefetch_stats['skipped'] += 1
+            return
+
+        self.prefetch_stats['scheduled'] += 1
+        task = asyncio.create_task(self._run_prefetch(params, cache_key))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _run_prefetch(self, params: dict, cache_key: str):
+        """Выполняет предзагрузку в пределах ограниченного числа слотов"""
+        async with self._prefetch_slots:
+            try:
+                if await self.cache.get(cache_key) is not MISSING:
+                    self.prefetch_stats['skipped'] += 1
+                    return
+                if cache_key in self._inflight:
+                    # Страницу уже запрашивает пользователь: сохранит ее его запрос, а не предзагрузка
+                    self.prefetch_stats['coalesced'] += 1
+                    return
+                self._prefetching[cache_key] = False
+                with request_priority(PREFETCH):
+                    result = await self._make_request("films", params)
+                if result:
+                    self.prefetch_stats['completed'] += 1
+                    # Страницу, которую уже дождался пользователь, не ждем повторно
+                    if not self._prefetching.get(cache_key):
+                        self._prefetched[cache_key] = time.monotonic() + self.cache_config.ttl_search
+                    logging.info(f"[KINOPOISK API] Prefetched search page {params.get('page')}")
+                else:
+                    self.prefetch_stats['failed'] += 1
+            except Exception as e:
+                self.prefetch_stats['failed'] += 1
+                logging.error(f"[KINOPOISK API] Prefetch error: {e}")
+            finally:
+                self._prefetching.pop(cache_key, None)
+
+    def _expire_prefetched(self):
+        """Удаляет отметки о предзагрузках, которыми так и не воспользовались"""
+        now = time.monotonic()
+        expired = [key for key, expires_at in self._prefetched.items() if expires_at <= now]
+        for key in expired:
+            del self._prefetched[key]
+        self.prefetch_stats['wasted'] += len(expired)
+
+    def _track_prefetch_hit(self, cache_key: str):
+        """Учитывает запрос пользователя, отданный из страницы, которую сохранила предзагрузка"""
+        if current_priority.get() != INTERACTIVE:
+            return
+        if self._prefetched.pop(cache_key, None) is not None:
+            self.prefetch_stats['hits'] += 1
+
+    def get_prefetch_stats(self) -> Dict[str, float]:
+        """Статистика предзагрузки: доля предзагруженных страниц, которые открыли пользователи"""
+        completed = self.prefetch_stats['completed']
+        return {
+            **self.prefetch_stats,
+            'hit_ratio': self.prefetch_stats['hits'] / completed if completed else 0.0
+        }
+
+    async def get_film_details(self, film_id: str, use_cache: bool = True,
+                               deadline: Optional[Deadline] = None) -> Optional[FilmDetails]:
         """Получение детальной информации о фильме"""
-        return await self._make_request(f"films/{film_id}")
+        data = await self._make_request(f"films/{film_id}", use_cache=use_cache, deadline=deadline)
+        if not data:
+            # API недоступен - карточка из локального индекса (без полей, которых в нем нет)
+            data = await film_index.get(film_id)
+        return FilmDetails.from_dict(data) if data else None
 
-    async def get_collection(self, collection_type: str = "TOP_250_MOVIES", page: int = 1) -> dict:
+    async def get_films_details_many(self, film_ids: List[str], use_cache: bool = True,
+                                     deadline: Optional[Deadline] = None) -> List[FilmDetailsResult]:
+        """
+        Пакетная загрузка карточек фильмов. Попадания в кэш читаются одним MGET,
+        промахи запрашиваются параллельно, но не больше batch_concurrency запросов
+        одновременно (лимиты каждого ключа дополнительно соблюдает планировщик ключей)
+        
+        :param film_ids: ID фильмов (повторы допустимы)
+        :param use_cache: False - загрузить все карточки заново
+        :param deadline: Крайний срок обработки апдейта
+        :return: Результаты в порядке film_ids, ошибки - по каждому фильму отдельно
+        """
+        film_ids = [str(film_id) for film_id in film_ids]
+        unique_ids = list(dict.fromkeys(film_ids))
+        found: Dict[str, dict] = {}
+
+        errors: Dict[str, str] = {}
+        ttl = self._get_cache_ttl("details")
+        if use_cache and ttl:
+            cache_keys = [self._get_cache_key(f"films/{film_id}") for film_id in unique_ids]
+            # Обычные и негативные записи - одним MGET
+            cached = await self.cache.get_many(cache_keys + [negative_key(key) for key in cache_keys])
+            negative = cached[len(cache_keys):]
+            stats = self.cache_stats['details']
+            for film_id, cache_key, value, negative_value in zip(unique_ids, cache_keys, cached, negative):
+                if value is not MISSING:
+                    stats['hits'] += 1
+                    self._track_prefetch_hit(cache_key)
+                    found[film_id] = FilmDetails.from_dict(value)
+                elif negative_value is not MISSING:
+                    stats['negative_hits'] += 1
+                    errors[film_id] = "not found"
+                else:
+                    stats['misses'] += 1
+
+        missing_ids = [film_id for film_id in unique_ids if film_id not in found and film_id not in errors]
+        if missing_ids:
+            slots = asyncio.Semaphore(config.key_scheduler.batch_concurrency)
+
+            async def _load(film_id: str):
+                async with slots:
+                    try:
+                        # Кэш уже проверен через MGET, повторно его не читаем
+                        data = await self._make_request(f"films/{film_id}", use_cache=False, deadline=deadline)
+                    except Exception as e:
+                        logging.error(f"[KINOPOISK API] Batch details error for film {film_id}: {e}")
+                        errors[film_id] = str(e)
+                        return
+                if data:
+                    found[film_id] = FilmDetails.from_dict(data)
+                else:
+                    errors[film_id] = "not found or upstream unavailable"
+
+            await asyncio.gather(*(_load(film_id) for film_id in missing_ids))
+            logging.info(
+                f"[KINOPOISK API] Batch details: {len(unique_ids) - len(missing_ids)} from cache, "
+                f"{len(missing_ids)} fetched, {len(errors)} failed"
+            )
+
+        return [
+            FilmDetailsResult(film_id, found.get(film_id), errors.get(film_id))
+            for film_id in film_ids
+        ]
+
+    async def get_collection(self, collection_type: str = "TOP_250_MOVIES", page: int = 1, use_cache: bool = True,
+                             deadline: Optional[Deadline] = None) -> Optional[dict]:
         """
         Получение коллекции фильмов
         
         :param collection_type: Тип коллекции (TOP_250_MOVIES, TOP_POPULAR_ALL и т.д.)
         :param page: Номер страницы
-        :return: Словарь с результатами
+        :param use_cache: False - получить свежий ответ в обход кэша
+        :param deadline: Крайний срок обработки апдейта
+        :return: {'total', 'totalPages', 'items': [FilmSummary, ...]}
         """
         params = {
             "type": collection_type,
             "page": page
         }
-        return await self._make_request("films/collections", params)
+        result = await self._make_request("films/collections", params, use_cache=use_cache, deadline=deadline)
+        return build_film_page(result) if result else None
 
-    async def get_film_name(self, film_id: str) -> Optional[str]:
+    async def get_film_name(self, film_id: str, deadline: Optional[Deadline] = None) -> Optional[str]:
         """Получает название фильма (русское или английское) по ID"""
-        film_details = await self.get_film_details(film_id)
+        film_details = await self.get_film_details(film_id, deadline=deadline)
         if not film_details:
             return None
             
         # Пробуем получить русское название, если нет - английское
-        return film_details.get('nameRu') or film_details.get('nameEn')
+        return film_details.name
+
+    async def load_filters(self):
+        """
+        Загружает справочник фильтров при старте: из Redis, затем из локального
+        снимка. Если снимков нет или они устарели, запускает обновление в фоне
+        """
+        catalog = None
+        try:
+            raw = await RedisService.get_instance().get_filters_catalog()
+            catalog = codec.loads(raw) if raw else None
+        except (RuntimeError, ValueError) as e:
+            logging.warning(f"[KINOPOISK API] Filters catalog is unavailable in Redis: {e}")
+
+        if catalog is None:
+            catalog = await asyncio.to_thread(self._read_filters_snapshot)
+
+        if catalog:
+            self._filters = catalog['data']
+            self._filters_fetched_at = catalog['fetched_at']
+            logging.info(
+                f"[KINOPOISK API] Filters catalog loaded "
+                f"({len(self._filters.get('genres', []))} genres, {len(self._filters.get('countries', []))} countries)"
+            )
+        self._schedule_filters_refresh()
+
+    def _read_filters_snapshot(self) -> Optional[dict]:
+        """Читает локальный снимок справочника фильтров"""
+        path = self.cache_config.filters_snapshot_path
+        try:
+            with open(path, 'rb') as f:
+                catalog = codec.loads(f.read())
+            return catalog if 'data' in catalog and 'fetched_at' in catalog else None
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.error(f"[KINOPOISK API] Broken filters snapshot {path}: {e}")
+            return None
+
+    def _write_filters_snapshot(self, raw: str):
+        """Атомарно перезаписывает локальный снимок справочника фильтров"""
+        path = self.cache_config.filters_snapshot_path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(raw)
+        os.replace(tmp_path, path)
+
+    def _schedule_filters_refresh(self):
+        """Запускает фоновое обновление справочника, если он устарел"""
+        if self._filters is not None and time.time() - self._filters_fetched_at < self.cache_config.ttl_filters:
+            return
+        if self._filters_refresh is not None and not self._filters_refresh.done():
+            return
+        self._filters_refresh = asyncio.create_task(self._refresh_filters())
+
+    async def _refresh_filters(self, priority: str = MAINTENANCE) -> Optional[dict]:
+        """Загружает справочник из API и сохраняет его в Redis и в локальный снимок"""
+        with request_priority(priority):
+            filters = await self._make_request("films/filters", use_cache=False)
+        if not filters or not (filters.get('genres') or filters.get('countries')):
+            logging.warning("[KINOPOISK API] Failed to refresh filters catalog, serving the old one")
+            return self._filters
+
+        self._filters = filters
+        self._filters_fetched_at = time.time()
+        raw = codec.dumps({'fetched_at': self._filters_fetched_at, 'data': filters})
+        try:
+            await RedisService.get_instance().save_filters_catalog(raw)
+        except RuntimeError:
+            pass  # Redis не инициализирован - остается локальный снимок
+        try:
+            await asyncio.to_thread(self._write_filters_snapshot, raw)
+        except OSError as e:
+            logging.error(f"[KINOPOISK API] Failed to write filters snapshot: {e}")
+        logging.info("[KINOPOISK API] Filters catalog refreshed")
+        return filters
 
     async def get_filters(self) -> dict:
-        """Получает и кэширует фильтры (страны, жанры) из API"""
-        current_time = time.time()
-        
-        # Возвращаем кэшированные данные, если они актуальны
-        if (self._filters_cache and self._cache_timestamp and 
-            current_time - self._cache_timestamp < self._cache_duration):
-            return self._filters_cache
-
-        response = await self._make_request("films/filters")
-        if response:
-            self._filters_cache = response
-            self._cache_timestamp = current_time
-            
-        return self._filters_cache
+        """
+        Возвращает справочник фильтров (страны, жанры) без ожидания сети:
+        устаревший справочник отдается сразу, а обновляется в фоне.
+        Ждет API только если справочника еще нет ни в одном хранилище
+        """
+        if self._filters is None:
+            if self._filters_refresh is None or self._filters_refresh.done():
+                self._filters_refresh = asyncio.create_task(self._refresh_filters(INTERACTIVE))
+            else:
+                # Пользователь ждет фоновое обновление - поднимаем его в очереди
+                self.scheduler.promote(self._get_cache_key("films/filters"), INTERACTIVE)
+            return await asyncio.shield(self._filters_refresh) or {}
+        self._schedule_filters_refresh()
+        return self._filters
 
     @property
     async def countries(self) -> list:
         """Возвращает список стран из API"""
         filters = await self.get_filters()
-        return filters.get('countries', []) if filters else []
+        # Копия: ответ общий для всех ожидающих вызовов, его нельзя менять на месте
+        return list(filters.get('countries', [])) if filters else []
 
     @property
     async def genres(self) -> list:
         """Возвращает список жанров из API"""
         filters = await self.get_filters()
-        return filters.get('genres', []) if filters else []
+        return list(filters.get('genres', [])) if filters else []
 
 # Создаем единственный экземпляр класса для использования во всем приложении
 kinopoisk_api = KinopoiskAPI()
+registry.add_collector(kinopoisk_api.collect_metrics)
+registry.add_collector(kinopoisk_api.scheduler.collect_metrics)
@@ -1,25 +1,188 @@
-from typing import List
+from typing import List, Optional, Set, Tuple
+import asyncio
 import logging
-from core.config import Config
+import time
+from core.config import KeySchedulerConfig
+
+class _KeyState:
+    """Состояние одного API-ключа: веса, токены и окна блокировки"""
+
+    def __init__(self, index: int, key: str, weight: int, burst: float):
+        self.index = index
+        self.key = key
+        self.weight = max(1, weight)
+        self.current_weight = 0           # Для плавного weighted round-robin
+        self.tokens = burst               # Токен-бакет под лимит запросов в секунду
+        self.last_refill = time.monotonic()
+        self.exhausted_until = 0.0        # 402: дневная квота исчерпана
+        self.cooldown_until = 0.0         # 429: превышен лимит запросов в секунду
+        self.used = 0                     # Запросов за текущие сутки (для расчета бюджета)
+        self.usage_started = time.monotonic()
 
 class KinopoiskApiKeyManager:
-    def __init__(self, api_keys: List[str]):
+    """
+    Планировщик API-ключей: распределяет запросы по всем ключам (weighted round-robin),
+    ограничивает частоту запросов на каждый ключ токен-бакетом, отдельно обрабатывает
+    429 (временный откат) и 402 (квота исчерпана) и автоматически возвращает
+    исчерпанные ключи в работу по истечении окна квоты
+    """
+
+    # Окно учета расхода квоты ключа
+    USAGE_WINDOW = 24 * 3600
+
+    def __init__(self, api_keys: List[str], config: Optional[KeySchedulerConfig] = None):
         self.api_keys = api_keys
-        self.current_index = 0
+        self.config = config or KeySchedulerConfig()
+        weights = self.config.weights or []
+        self._states = [
+            _KeyState(idx, key, weights[idx] if idx < len(weights) else 1, self.config.burst)
+            for idx, key in enumerate(api_keys)
+        ]
+        self._lock = asyncio.Lock()
 
     @property
     def current_key(self) -> str:
-        return self.api_keys[self.current_index]
+        """Первый ключ, который сейчас не исчерпан (для обратной совместимости)"""
+        now = time.monotonic()
+        for state in self._states:
+            if state.exhausted_until <= now:
+                return state.key
+        return self.api_keys[0]
+
+    def _refill(self, state: _KeyState, now: float):
+        """Пополняет токены ключа согласно прошедшему времени"""
+        elapsed = now - state.last_refill
+        state.tokens = min(self.config.burst, state.tokens + elapsed * self.config.rps)
+        state.last_refill = now
+
+    def _reinstate(self, now: float):
+        """Возвращает в работу ключи, у которых истекло окно квоты"""
+        for state in self._states:
+            if state.exhausted_until and state.exhausted_until <= now:
+                state.exhausted_until = 0.0
+                logging.info(f"[KINOPOISK KEY MANAGER] API-ключ #{state.index + 1} возвращен в работу")
+
+    async def acquire(self, exclude: Optional[Set[int]] = None,
+                      max_wait: Optional[float] = None) -> Optional[Tuple[int, str]]:
+        """
+        Выбирает ключ для следующего запроса и списывает с него один токен
+
+        Args:
+            exclude: Индексы ключей, которые нельзя использовать (например, для хеджирования)
+            max_wait: Максимальное ожидание свободного ключа (по умолчанию из конфига)
+        Returns:
+            (индекс ключа, ключ) или None, если свободных ключей нет дольше max_wait
+        """
+        wait_limit = self.config.max_wait if max_wait is None else min(max_wait, self.config.max_wait)
+        deadline = time.monotonic() + wait_limit
+        while True:
+            async with self._lock:
+                now = time.monotonic()
+                self._reinstate(now)
+                usable = [
+                    state for state in self._states
+                    if state.exhausted_until <= now
+                    and state.cooldown_until <= now
+                    and not (exclude and state.index in exclude)
+                ]
+                alive = [
+                    state for state in self._states
+                    if state.exhausted_until <= now and not (exclude and state.index in exclude)
+                ]
+                if not alive:
+                    if not exclude:
+                        logging.warning("[KINOPOISK KEY MANAGER] Все API-ключи исчерпаны!")
+                    return None
+
+                for state in usable:
+                    self._refill(state, now)
+                ready = [state for state in usable if state.tokens >= 1]
+                if ready:
+                    chosen = self._pick_weighted(ready)
+                    chosen.tokens -= 1
+                    self._roll_usage(chosen, now)
+                    chosen.used += 1
+                    return chosen.index, chosen.key
+
+                # Ждем ближайший токен или окончание отката после 429
+                waits = [(1 - state.tokens) / self.config.rps for state in usable]
+                waits += [state.cooldown_until - now for state in alive if state.cooldown_until > now]
+                wait = max(0.0, min(waits))
+
+            if time.monotonic() + wait > deadline:
+                logging.warning("[KINOPOISK KEY MANAGER] Нет свободных API-ключей в пределах ожидания")
+                return None
+            await asyncio.sleep(wait)
+
+    @staticmethod
+    def _pick_weighted(ready: List[_KeyState]) -> _KeyState:
+        """Плавный weighted round-robin (как в nginx)"""
+        total = sum(state.weight for state in ready)
+        for state in ready:
+            state.current_weight += state.weight
+        chosen = max(ready, key=lambda state: state.current_weight)
+        chosen.current_weight -= total
+        return chosen
+
+    def mark_exhausted(self, index: int):
+        """Ключ получил 402: квота исчерпана до конца окна квоты"""
+        state = self._states[index]
+        if state.exhausted_until > time.monotonic():
+            return  # Уже помечен параллельным запросом
+        state.exhausted_until = time.monotonic() + self.config.quota_window
+        logging.warning(
+            f"[KINOPOISK KEY MANAGER] API-ключ #{index + 1} исчерпал квоту, "
+            f"повторная проверка через {self.config.quota_window} сек."
+        )
+
+    def mark_rate_limited(self, index: int, retry_after: Optional[float] = None):
+        """Ключ получил 429: временно не используем его и обнуляем токены"""
+        state = self._states[index]
+        delay = retry_after if retry_after and retry_after > 0 else self.config.rate_limit_cooldown
+        state.cooldown_until = max(state.cooldown_until, time.monotonic() + delay)
+        state.tokens = 0
+        logging.info(f"[KINOPOISK KEY MANAGER] API-ключ #{index + 1} получил 429, пауза {delay:.1f} сек.")
+
+    def _roll_usage(self, state: _KeyState, now: float):
+        """Начинает новые сутки учета расхода квоты ключа"""
+        if now - state.usage_started >= self.USAGE_WINDOW:
+            state.used = 0
+            state.usage_started = now
+
+    def budget(self) -> float:
+        """
+        Доля оставшегося бюджета запросов по всем ключам (от 0 до 1).
+        Ключ после 402 не дает ничего; если суточная квота известна, учитывается
+        расход за сутки, иначе живой ключ считается полным
+        """
+        if not self._states:
+            return 0.0
+        now = time.monotonic()
+        remaining = 0.0
+        for state in self._states:
+            if state.exhausted_until > now:
+                continue
+            if self.config.daily_quota:
+                self._roll_usage(state, now)
+                remaining += max(0.0, 1 - state.used / self.config.daily_quota)
+            else:
+                remaining += 1
+        return remaining / len(self._states)
+
+    def usage(self) -> List[int]:
+        """Расход квоты за текущие сутки по ключам"""
+        return [state.used for state in self._states]
 
-    def next_key(self) -> str:
-        self.current_index += 1
-        if self.current_index >= len(self.api_keys):
-            logging.warning(f"[KINOPOISK KEY MANAGER] Все API-ключи исчерпаны!")
-            raise RuntimeError("All Kinopoisk API keys have reached their limit.")
-        logging.info(f"[KINOPOISK KEY MANAGER] Переключение на следующий API-ключ: #{self.current_index+1} {self.api_keys[self.current_index]}")
-        return self.api_keys[self.current_index]
+    def available_keys(self) -> int:
+        """Количество ключей, у которых не исчерпана квота"""
+        now = time.monotonic()
+        return sum(1 for state in self._states if state.exhausted_until <= now)
 
     def reset(self):
-        self.current_index = 0
+        """Сбрасывает все блокировки ключей"""
+        for state in self._states:
+            state.exhausted_until = 0.0
+            state.cooldown_until = 0.0
+            state.current_weight = 0
 
-    # Менеджер только перебирает ключи, запросы выполняются в KinopoiskAPI через aiohttp
+    # Менеджер только выбирает ключи, запросы выполняются в KinopoiskAPI через aiohttp
@@ -0,0 +1,238 @@
+import bisect
+import logging
+import math
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from aiohttp import web
+
+# Границы бакетов задержки внешних API в секундах
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.5, 5.0, 10.0)
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    """Монотонно растущий счетчик"""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+    def dump(self) -> Dict[str, float]:
+        return {",".join(key): value for key, value in self._values.items()}
+
+class Gauge(Counter):
+    """Значение, которое может расти и уменьшаться (заполняется сборщиками перед выгрузкой)"""
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+class Histogram(_Metric):
+    """Гистограмма с фиксированными бакетами (кумулятивная, как в Prometheus)"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # ключ меток -> (счетчики по бакетам, сумма, количество)
+        self._series: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def _merge(self, labels: Dict[str, object]) -> Tuple[List[int], int]:
+        """Суммирует серии, подходящие под метки (не переданные метки - любые)"""
+        bucket_counts = [0] * len(self.buckets)
+        total = 0
+        for key, (counts, _, count) in self._series.items():
+            if any(labels.get(name) is not None and str(labels[name]) != value
+                   for name, value in zip(self.labelnames, key)):
+                continue
+            for idx, bucket_count in enumerate(counts):
+                bucket_counts[idx] += bucket_count
+            total += count
+        return bucket_counts, total
+
+    def count(self, **labels) -> int:
+        """Количество наблюдений по сериям, подходящим под метки"""
+        return self._merge(labels)[1]
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """
+        Оценка квантиля по бакетам (линейная интерполяция внутри бакета).
+        Метки, не переданные явно, суммируются по всем сериям
+        """
+        bucket_counts, total = self._merge(labels)
+        if total == 0:
+            return None
+
+        rank = q * total
+        cumulative = 0
+        for idx, bucket_count in enumerate(bucket_counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                upper = self.buckets[idx]
+                lower = self.buckets[idx - 1] if idx else 0.0
+                if upper == math.inf:
+                    return lower
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.buckets[-2]
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for key, (counts, total_sum, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total_sum)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+    def dump(self) -> Dict[str, Dict[str, float]]:
+        return {
+            ",".join(key): {'count': count, 'sum': total_sum}
+            for key, (_, total_sum, count) in self._series.items()
+        }
+
+class MetricsRegistry:
+    """
+    Реестр метрик процесса. Метрики создаются при первом обращении,
+    сборщики (collectors) обновляют gauge-метрики из статистики сервисов перед выгрузкой
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def add_collector(self, collector: Callable[[], None]):
+        """Функция, обновляющая gauge-метрики непосредственно перед выгрузкой"""
+        self._collectors.append(collector)
+
+    def _collect(self):
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                logging.error(f"[METRICS] Collector {getattr(collector, '__name__', collector)} failed: {e}")
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus"""
+        self._collect()
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def dump(self) -> Dict[str, Dict]:
+        """Все метрики словарем (для логов и отладки)"""
+        self._collect()
+        return {name: metric.dump() for name, metric in self._metrics.items()}
+
+# Общий реестр метрик процесса
+registry = MetricsRegistry()
+
+# Метрики внешних API, общие для Kinopoisk и jacred
+UPSTREAM_LATENCY = registry.histogram(
+    "upstream_request_duration_seconds",
+    "Latency of upstream HTTP requests (one observation per attempt)",
+    ("upstream", "endpoint", "status", "key")
+)
+KINOPOISK_QUOTA_EXHAUSTED = registry.counter(
+    "kinopoisk_quota_exhausted_total", "402 responses by API key index", ("key",)
+)
+KINOPOISK_KEY_SWITCHES = registry.counter(
+    "kinopoisk_key_switches_total", "Requests retried on another API key", ("reason",)
+)
+SEARCH_QUERIES = registry.counter(
+    "search_queries_total", "User search queries by whether canonicalization changed them", ("normalized",)
+)
+
+class MetricsServer:
+    """HTTP эндпоинт /metrics в формате Prometheus (включается через METRICS_PORT)"""
+    _runner: Optional[web.AppRunner] = None
+
+    @staticmethod
+    async def _handle_metrics(request: web.Request) -> web.Response:
+        return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8")
+
+    @classmethod
+    async def start(cls, host: str, port: int):
+        if not port or cls._runner is not None:
+            return
+        app = web.Application()
+        app.router.add_get("/metrics", cls._handle_metrics)
+        cls._runner = web.AppRunner(app, access_log=None)
+        await cls._runner.setup()
+        await web.TCPSite(cls._runner, host, port).start()
+        logging.info(f"[METRICS] Serving metrics on http://{host}:{port}/metrics")
+
+    @classmethod
+    async def stop(cls):
+        if cls._runner is not None:
+            await cls._runner.cleanup()
+            cls._runner = None
@@ -1,8 +1,8 @@
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 from redis.asyncio import Redis
 import logging
 from core.config import RedisConfig
-import json
+from utils import codec
 
 class RedisService:
     _instance = None
@@ -26,6 +26,10 @@ class RedisService:
         self._search_filters_prefix = "searchFilters:"  # Префикс для фильтров поиска фильмов
         self._torrent_filters_prefix = "torrentFilters:"  # Префикс для фильтров торрентов
         self._spam_prefix = "spam:"  # Новый префикс для антиспама
+        self._cache_prefix = "cache:"  # Префикс для кэша ответов внешних API
+        self._snapshot_prefix = "topsSnapshot:"  # Префикс для снимков подборок (топов)
+        self._cursor_prefix = "searchCursor:"  # Префикс для курсоров результатов поиска
+        self._filters_catalog_key = "kpFiltersCatalog"  # Справочник жанров и стран (без TTL)
         self._ttl = 3600  # 1 час
 
     @classmethod
@@ -53,7 +57,7 @@ class RedisService:
             key = f"{self._search_filters_prefix}{user_id}"
             await self.redis.set(
                 key,
-                json.dumps(data),
+                codec.dumps(data),
                 ex=self._ttl
             )
             return True
@@ -74,7 +78,7 @@ class RedisService:
             key = f"{self._search_filters_prefix}{user_id}"
             data = await self.redis.get(key)
             if data:
-                parsed = json.loads(data)
+                parsed = codec.loads(data)
                 return parsed.get('filters', {}), parsed.get('keyboard_message_id')
             return {}, None
         except Exception as e:
@@ -108,7 +112,7 @@ class RedisService:
             key = f"{self._torrent_filters_prefix}{user_id}"
             await self.redis.set(
                 key,
-                json.dumps(filters),
+                codec.dumps(filters),
                 ex=self._ttl
             )
             return True
@@ -128,7 +132,7 @@ class RedisService:
         try:
             key = f"{self._torrent_filters_prefix}{user_id}"
             data = await self.redis.get(key)
-            return json.loads(data) if data else {}
+            return codec.loads(data) if data else {}
         except Exception as e:
             logging.error(f"Redis get torrent filters error: {e}")
             return {}
@@ -167,6 +171,133 @@ class RedisService:
             logging.error(f"Redis get query error: {e}")
             return None
 
+    async def save_search_cursor(self, cursor_id: str, data: str, ttl: int) -> bool:
+        """
+        Сохраняет курсор результатов поиска
+
+        Args:
+            cursor_id: ID поиска (из callback_data)
+            data: JSON строка с курсором
+            ttl: Время жизни в секундах
+        """
+        try:
+            key = f"{self._cursor_prefix}{cursor_id}"
+            await self.redis.set(key, data, ex=ttl)
+            return True
+        except Exception as e:
+            logging.error(f"Redis save search cursor error: {e}")
+            return False
+
+    async def get_search_cursor(self, cursor_id: str) -> Optional[str]:
+        """Получает курсор результатов поиска (JSON строка)"""
+        try:
+            key = f"{self._cursor_prefix}{cursor_id}"
+            return await self.redis.get(key)
+        except Exception as e:
+            logging.error(f"Redis get search cursor error: {e}")
+            return None
+
+    async def get_cache(self, cache_key: str) -> Optional[str]:
+        """Получает закэшированный ответ API (JSON строка)"""
+        try:
+            key = f"{self._cache_prefix}{cache_key}"
+            return await self.redis.get(key)
+        except Exception as e:
+            logging.error(f"Redis get cache error: {e}")
+            return None
+
+    async def get_cache_many(self, cache_keys: List[str]) -> List[Optional[str]]:
+        """Получает несколько закэшированных ответов одним MGET (порядок как у ключей)"""
+        if not cache_keys:
+            return []
+        try:
+            keys = [f"{self._cache_prefix}{cache_key}" for cache_key in cache_keys]
+            return await self.redis.mget(keys)
+        except Exception as e:
+            logging.error(f"Redis get cache many error: {e}")
+            return [None] * len(cache_keys)
+
+    async def set_cache(self, cache_key: str, value: str, ttl: int) -> bool:
+        """
+        Сохраняет ответ API в кэш
+        
+        Args:
+            cache_key: Ключ кэша
+            value: JSON строка с ответом
+            ttl: Время жизни в секундах
+        """
+        try:
+            key = f"{self._cache_prefix}{cache_key}"
+            await self.redis.set(key, value, ex=ttl)
+            return True
+        except Exception as e:
+            logging.error(f"Redis set cache error: {e}")
+            return False
+
+    async def delete_cache(self, cache_key: str) -> bool:
+        """Удаляет ответ API из кэша"""
+        try:
+            key = f"{self._cache_prefix}{cache_key}"
+            await self.redis.delete(key)
+            return True
+        except Exception as e:
+            logging.error(f"Redis delete cache error: {e}")
+            return False
+
+    async def save_collection_snapshot(self, collection_type: str, version: str, data: str, ttl: int) -> bool:
+        """
+        Сохраняет неизменяемый снимок подборки и атомарно переключает на него указатель
+        
+        Args:
+            collection_type: Тип коллекции (TOP_250_MOVIES и т.д.)
+            version: Версия снимка
+            data: JSON строка со снимком
+            ttl: Время жизни снимка в секундах
+        """
+        try:
+            snapshot_key = f"{self._snapshot_prefix}{collection_type}:{version}"
+            pointer_key = f"{self._snapshot_prefix}{collection_type}:current"
+            # Снимок и указатель пишутся одной транзакцией: читатели видят либо старый, либо новый снимок
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.set(snapshot_key, data, ex=ttl)
+                pipe.set(pointer_key, version, ex=ttl)
+                await pipe.execute()
+            return True
+        except Exception as e:
+            logging.error(f"Redis save collection snapshot error: {e}")
+            return False
+
+    async def get_collection_snapshot(self, collection_type: str) -> Optional[str]:
+        """Получает актуальный снимок подборки (JSON строка)"""
+        try:
+            pointer_key = f"{self._snapshot_prefix}{collection_type}:current"
+            version = await self.redis.get(pointer_key)
+            if not version:
+                return None
+            # Старый снимок живет до своего TTL, поэтому переключение указателя между
+            # двумя чтениями не приводит к промаху
+            return await self.redis.get(f"{self._snapshot_prefix}{collection_type}:{version}")
+        except Exception as e:
+            logging.error(f"Redis get collection snapshot error: {e}")
+            return None
+
+    async def save_filters_catalog(self, data: str) -> bool:
+        """Сохраняет справочник фильтров (жанры, страны) без срока жизни"""
+        try:
+            await self.redis.set(self._filters_catalog_key, data)
+            return True
+        except Exception as e:
+            logging.error(f"Redis save filters catalog error: {e}")
+            return False
+
+    async def get_filters_catalog(self) -> Optional[str]:
+        """Получает сохраненный справочник фильтров (JSON строка)"""
+        try:
+            return await self.redis.get(self._filters_catalog_key)
+        except Exception as e:
+            logging.error(f"Redis get filters catalog error: {e}")
+            return None
+
     async def delete(self, key: str) -> bool:
         """Удаляет ключ из Redis"""
         try:
@@ -190,7 +321,7 @@ class RedisService:
         try:
             key = f"{self._spam_prefix}{user_id}"
             data = await self.redis.get(key)
-            return json.loads(data) if data else []
+            return codec.loads(data) if data else []
         except Exception as e:
             logging.error(f"Redis get spam timestamps error: {e}")
             return []
@@ -201,7 +332,7 @@ class RedisService:
             key = f"{self._spam_prefix}{user_id}"
             await self.redis.set(
                 key,
-                json.dumps(timestamps),
+                codec.dumps(timestamps),
                 ex=timeout
             )
             return True
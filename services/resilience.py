@@ -0,0 +1,130 @@
+import aiohttp
+import logging
+import random
+import time
+from typing import Dict, Optional
+from core.config import ResilienceConfig, EndpointTimeout
+from utils.deadline import Deadline
+from services.metrics import registry
+
+class UpstreamUnavailableError(Exception):
+    """Внешний API недоступен: открыт предохранитель или исчерпаны повторы"""
+
+class DeadlineExceededError(UpstreamUnavailableError):
+    """Ответ API уже не успеет прийти до крайнего срока обработки апдейта"""
+
+class RequestDroppedError(UpstreamUnavailableError):
+    """Фоновый запрос отброшен планировщиком: бюджет API-ключей почти исчерпан"""
+
+class CircuitBreaker:
+    """
+    Предохранитель для внешнего хоста: closed -> open после серии ошибок,
+    open -> half-open по истечении recovery_timeout, half-open -> closed
+    после успешного пробного запроса (или снова open при ошибке)
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_progress = False
+        self.stats = {'opened': 0, 'half_opened': 0, 'closed': 0, 'rejected': 0}
+
+    def _set_state(self, state: str):
+        if state == self.state:
+            return
+        logging.warning(f"[CIRCUIT BREAKER] {self.name}: {self.state} -> {state}")
+        self.state = state
+        self.stats[{self.OPEN: 'opened', self.HALF_OPEN: 'half_opened', self.CLOSED: 'closed'}[state]] += 1
+
+    def allow_request(self) -> bool:
+        """Можно ли сейчас отправить запрос к хосту"""
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.recovery_timeout:
+                self.stats['rejected'] += 1
+                return False
+            self._set_state(self.HALF_OPEN)
+
+        if self.state == self.HALF_OPEN:
+            # В полуоткрытом состоянии пропускаем только один пробный запрос
+            if self._trial_in_progress:
+                self.stats['rejected'] += 1
+                return False
+            self._trial_in_progress = True
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self._trial_in_progress = False
+        self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        self._trial_in_progress = False
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            self._set_state(self.OPEN)
+
+    def release(self):
+        """Запрос завершился без вердикта о здоровье хоста (например, 4xx)"""
+        self._trial_in_progress = False
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+def get_circuit_breaker(name: str, config: Optional[ResilienceConfig] = None) -> CircuitBreaker:
+    """Возвращает предохранитель для хоста, создавая его при первом обращении"""
+    if name not in _breakers:
+        config = config or ResilienceConfig()
+        _breakers[name] = CircuitBreaker(
+            name,
+            failure_threshold=config.breaker_failure_threshold,
+            recovery_timeout=config.breaker_recovery_timeout
+        )
+    return _breakers[name]
+
+def get_circuit_breakers() -> Dict[str, CircuitBreaker]:
+    """Все созданные предохранители (для метрик)"""
+    return dict(_breakers)
+
+_BREAKER_STATE_VALUES = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+
+def collect_breaker_metrics():
+    """Состояние и переходы предохранителей для реестра метрик"""
+    state_gauge = registry.gauge("circuit_breaker_state", "Circuit state: 0 closed, 1 half-open, 2 open", ("host",))
+    transitions_gauge = registry.gauge("circuit_breaker_events", "Circuit breaker transitions and rejections", ("host", "event"))
+    for name, breaker in _breakers.items():
+        state_gauge.set(_BREAKER_STATE_VALUES[breaker.state], host=name)
+        for event, value in breaker.stats.items():
+            transitions_gauge.set(value, host=name, event=event)
+
+registry.add_collector(collect_breaker_metrics)
+
+def backoff_delay(attempt: int, config: ResilienceConfig) -> float:
+    """Экспоненциальная задержка перед повтором с полным джиттером"""
+    return random.uniform(0, min(config.backoff_max, config.backoff_base * (2 ** attempt)))
+
+def is_retryable_status(status: int) -> bool:
+    """Временные ошибки сервера, которые имеет смысл повторить"""
+    return status >= 500
+
+def build_timeout(timeout: EndpointTimeout, deadline: Optional[Deadline] = None) -> aiohttp.ClientTimeout:
+    """
+    Собирает ClientTimeout для класса эндпоинта с учетом крайнего срока
+
+    Raises:
+        DeadlineExceededError: до срока осталось слишком мало времени для нового запроса
+    """
+    if deadline is not None and deadline.expired:
+        raise DeadlineExceededError("not enough time left before the update deadline")
+    total = Deadline.clamp(timeout.total, deadline)
+    return aiohttp.ClientTimeout(
+        total=total,
+        connect=min(timeout.connect, total),
+        sock_read=min(timeout.read, total)
+    )
@@ -0,0 +1,163 @@
+import logging
+import time
+from typing import List, Optional, Tuple
+from core import load_config
+from core.config import SearchQueryConfig
+from services.kinopoisk_api import kinopoisk_api
+from services.redis_service import RedisService
+from services.metrics import registry
+from models.film import FilmSummary, build_film_list
+from utils import codec
+from utils.deadline import Deadline
+from utils.pagination import get_api_page, slice_ui_page, is_last_ui_page_of_api_page
+
+class SearchCursorStore:
+    """
+    Курсоры результатов поиска (обычного и расширенного). Курсор создается при
+    запуске поиска и хранит в Redis запрос, фильтры, счетчики и уже полученные
+    фильмы компактными словарями по страницам API. Листание и возврат из карточки
+    фильма обслуживаются из курсора без повторного поиска; когда пользователь
+    листает дальше загруженного, курсор дополняется следующими страницами API
+    """
+
+    def __init__(self, config: SearchQueryConfig):
+        self.config = config
+        self.stats = {'created': 0, 'hits': 0, 'extended': 0, 'misses': 0, 'restored': 0, 'errors': 0}
+
+    async def create(self, cursor_id: str, query: str, text: str, filters: Optional[dict],
+                     result: dict) -> Optional[dict]:
+        """
+        Создает курсор по первой странице результатов
+
+        Args:
+            cursor_id: ID поиска (используется в callback_data)
+            query: Запрос для API
+            text: Запрос в том виде, как его ввел пользователь (для отображения)
+            filters: Фильтры API расширенного поиска
+            result: Первая страница результатов KinopoiskAPI.search_films
+        Returns:
+            Курсор или None, если его не удалось сохранить
+        """
+        cursor = {
+            # Версия набора результатов: меняется, только если поиск запущен заново
+            'version': time.time_ns(),
+            'query': query,
+            'text': text,
+            'filters': filters or {},
+            'total': result.get('total', 0),
+            'totalPages': result.get('totalPages', 0),
+            # Ответ локального индекса: предзагружать страницы API незачем
+            'local': bool(result.get('local')),
+            'pages': [[film.to_dict() for film in result.get('items', [])]]
+        }
+        if not await self._save(cursor_id, cursor):
+            return None
+        self.stats['created'] += 1
+        return cursor
+
+    async def get_page(self, cursor_id: str, page: int,
+                       deadline: Optional[Deadline] = None) -> Optional[Tuple[dict, List[FilmSummary]]]:
+        """
+        Страница интерфейса из курсора, при необходимости курсор дополняется из API
+
+        Returns:
+            (курсор, фильмы страницы) или None, если курсор истек или страницу не удалось загрузить
+        """
+        cursor = await self._load(cursor_id, deadline)
+        if cursor is None:
+            self.stats['misses'] += 1
+            return None
+
+        api_page = get_api_page(page)
+        if api_page > len(cursor['pages']):
+            if not await self._extend(cursor_id, cursor, api_page, deadline):
+                return None
+            self.stats['extended'] += 1
+        else:
+            self.stats['hits'] += 1
+
+        # Пользователь на второй половине последней загруженной страницы - заранее
+        # прогреваем кэш API следующей, чтобы дополнение курсора не ждало API
+        loaded = len(cursor['pages'])
+        if (is_last_ui_page_of_api_page(page) and api_page == loaded
+                and loaded < cursor['totalPages'] and not cursor['local']):
+            kinopoisk_api.prefetch_search(cursor['query'], loaded + 1, cursor['filters'])
+
+        return cursor, build_film_list(slice_ui_page(cursor['pages'][api_page - 1], page))
+
+    async def _extend(self, cursor_id: str, cursor: dict, api_page: int, deadline: Optional[Deadline]) -> bool:
+        """Догружает страницы API до api_page включительно и сохраняет курсор"""
+        loaded, total_pages = len(cursor['pages']), cursor['totalPages']
+        try:
+            for next_page in range(loaded + 1, min(api_page, cursor['totalPages']) + 1):
+                result = await kinopoisk_api.search_films(
+                    cursor['query'], next_page, cursor['filters'], deadline=deadline
+                )
+                if not result:
+                    break
+                if not result.get('items'):
+                    # API отдал меньше страниц, чем обещал: дальше листать некуда
+                    cursor['totalPages'] = len(cursor['pages'])
+                    break
+                cursor['pages'].append([film.to_dict() for film in result['items']])
+        finally:
+            # Сохраняем и частично дополненный курсор: загруженные страницы пригодятся в следующий раз
+            if len(cursor['pages']) != loaded or cursor['totalPages'] != total_pages:
+                await self._save(cursor_id, cursor)
+        if api_page > len(cursor['pages']):
+            logging.warning(f"[SEARCH CURSOR] Failed to extend {cursor_id} to API page {api_page}")
+            self.stats['errors'] += 1
+            return False
+        return True
+
+    async def _save(self, cursor_id: str, cursor: dict) -> bool:
+        redis_service = RedisService.get_instance()
+        if not await redis_service.save_search_cursor(cursor_id, codec.dumps(cursor), self.config.cursor_ttl):
+            self.stats['errors'] += 1
+            return False
+        return True
+
+    async def _load(self, cursor_id: str, deadline: Optional[Deadline]) -> Optional[dict]:
+        redis_service = RedisService.get_instance()
+        raw = await redis_service.get_search_cursor(cursor_id)
+        if raw:
+            try:
+                return codec.loads(raw)
+            except ValueError as e:
+                logging.error(f"[SEARCH CURSOR] Broken cursor {cursor_id}: {e}")
+                return None
+        return await self._restore(cursor_id, deadline)
+
+    async def _restore(self, cursor_id: str, deadline: Optional[Deadline]) -> Optional[dict]:
+        """
+        Курсор по записи запроса старого формата (search:{id}), сохраненной до появления
+        курсоров: сообщения с результатами, отправленные раньше, продолжают листаться
+        """
+        raw = await RedisService.get_instance().get_query(cursor_id)
+        if not raw:
+            return None
+        try:
+            search_data = codec.loads(raw)
+        except ValueError:
+            search_data = None
+        if not isinstance(search_data, dict):
+            # В Redis лежит сам запрос
+            search_data = {'query': raw}
+        query = search_data['query']
+        filters = search_data.get('filters')
+        result = await kinopoisk_api.search_films(query, 1, filters, deadline=deadline)
+        if not result:
+            return None
+        self.stats['restored'] += 1
+        return await self.create(cursor_id, query, search_data.get('text', query), filters, result)
+
+    def collect_metrics(self):
+        """Счетчики курсоров поиска для реестра метрик"""
+        gauge = registry.gauge("search_cursor", "Search result cursor counters", ("stat",))
+        for stat, value in self.stats.items():
+            gauge.set(value, stat=stat)
+
+config = load_config()
+
+search_cursors = SearchCursorStore(config.search_query)
+registry.add_collector(search_cursors.collect_metrics)
@@ -1,18 +1,49 @@
 import aiohttp
+import asyncio
 import logging
+import time
 from typing import Optional, Union
-from urllib.parse import quote, urljoin
+from urllib.parse import quote, urljoin, urlsplit
 from services.redis_service import RedisService
-from services.kinopoisk_api import kinopoisk_api
-import json
+from services.kinopoisk_api import kinopoisk_api, NOT_FOUND
+from services.http_client import HttpClient
+from services.cache import response_cache, negative_key, MISSING
+from services.metrics import UPSTREAM_LATENCY, registry
+from services.fair_scheduler import FairScheduler
+from services.resilience import (
+    UpstreamUnavailableError,
+    DeadlineExceededError,
+    get_circuit_breaker,
+    backoff_delay,
+    is_retryable_status,
+    build_timeout
+)
+from utils.deadline import Deadline
+from utils import codec
+from core import load_config
 import re
 import hashlib
 import base64
 
+config = load_config()
+
+# Планировщик запросов к jacred один на процесс: парсеры создаются на каждый апдейт,
+# а лимиты, очереди по пользователям и классы приоритета должны быть общими
+jacred_scheduler = FairScheduler("jacred", config.fair_share)
+registry.add_collector(jacred_scheduler.collect_metrics)
+
 class TorrentParser:
     def __init__(self):
-        self.base_url = "https://jacred.xyz"
+        self.base_url = config.upstreams.jacred_base_url
         self.api_version = "v1.0"
+        self.cache = response_cache
+        self.cache_ttl = config.cache.ttl_torrents
+        self.negative_ttl = config.cache.ttl_negative
+        self.resilience_config = config.resilience
+        self.breaker = get_circuit_breaker(urlsplit(self.base_url).netloc, config.resilience)
+        self.timeout = config.timeouts.jacred
+        # У jacred нет ключей, но пул соединений общий: те же очереди по приоритетам и пользователям
+        self.scheduler = jacred_scheduler
         
         # Настройки фильтрации
         self.filter_settings = {
@@ -47,8 +78,16 @@ class TorrentParser:
             if key in self.filter_settings:
                 self.filter_settings[key] = value
 
-    async def _make_request(self, search_query: str) -> Optional[str]:
-        """Выполняет запрос к API поиска"""
+    async def _make_request(self, search_query: str, deadline: Optional[Deadline] = None) -> Optional[Union[list, dict]]:
+        """
+        Выполняет запрос к API поиска с повторами временных ошибок
+        
+        Returns:
+            Разобранный JSON ответа, NOT_FOUND при ответе 404 или None при остальных ошибках
+        Raises:
+            UpstreamUnavailableError: предохранитель разомкнут или повторы исчерпаны
+            DeadlineExceededError: ответ уже не успеет прийти до крайнего срока
+        """
         url = f"{self.base_url}/api/{self.api_version}/torrents?search={search_query}&apikey=null&exact=true"
         
         headers = {
@@ -58,29 +97,71 @@ class TorrentParser:
             'Referer': f'{self.base_url}/'
         }
 
-        try:
-            logging.info(f"[JACRED PARSER] Making API request for: {search_query}")
-            logging.debug(f"[JACRED PARSER] Full URL: {url}")
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers) as response:
+        if deadline is not None and deadline.expired:
+            raise DeadlineExceededError(f"no time left for jacred search {search_query}")
+        if not self.breaker.allow_request():
+            raise UpstreamUnavailableError(f"circuit {self.breaker.name} is {self.breaker.state}")
+
+        logging.info(f"[JACRED PARSER] Making API request for: {search_query}")
+        logging.debug(f"[JACRED PARSER] Full URL: {url}")
+
+        for attempt in range(self.resilience_config.retries + 1):
+            try:
+                timeout = build_timeout(self.timeout, deadline)
+            except DeadlineExceededError:
+                logging.warning(f"[JACRED PARSER] Deadline exceeded, request cancelled")
+                self.breaker.release()
+                raise
+            started = time.monotonic()
+            try:
+                session = HttpClient.get_session()
+                async with session.get(url, headers=headers, timeout=timeout) as response:
                     logging.info(f"[JACRED PARSER] Response status: {response.status}")
-                    response_text = await response.text()
-                    
-                    # Парсим JSON
-                    response_data = json.loads(response_text)
-                    if isinstance(response_data, list):
-                        logging.info(f"[JACRED PARSER] Found {len(response_data)} torrents")
-                    else:
-                        logging.info("[JACRED PARSER] Response content: No results found")
-                    
-                    if response.status != 200:
+                    body = await response.read()
+                    self._observe(response.status, started)
+
+                    if response.status == 200:
+                        self.breaker.record_success()
+                        # Декодируем JSON один раз, дальше передаем уже разобранные данные
+                        response_data = codec.loads(body)
+                        if isinstance(response_data, list):
+                            logging.info(f"[JACRED PARSER] Found {len(response_data)} torrents")
+                        else:
+                            logging.info("[JACRED PARSER] Response content: No results found")
+                        return response_data
+
+                    if not is_retryable_status(response.status):
+                        self.breaker.record_success()
                         logging.error(f"[JACRED PARSER] Request failed with status {response.status}")
-                        return None
-                    return response_text
-        except Exception as e:
-            logging.error(f"[JACRED PARSER] Request error: {str(e)}")
-            return None
+                        return NOT_FOUND if response.status == 404 else None
+                    logging.warning(f"[JACRED PARSER] Server error {response.status}")
+            except asyncio.TimeoutError as e:
+                self._observe("timeout", started)
+                logging.warning(f"[JACRED PARSER] Transient request error: {e!r}")
+            except aiohttp.ClientError as e:
+                self._observe("error", started)
+                logging.warning(f"[JACRED PARSER] Transient request error: {e!r}")
+            except Exception as e:
+                logging.error(f"[JACRED PARSER] Request error: {str(e)}")
+                self.breaker.release()
+                return None
+
+            # Временная ошибка: повторяем с откатом, пока позволяет предохранитель
+            self.breaker.record_failure()
+            if attempt >= self.resilience_config.retries or not self.breaker.allow_request():
+                break
+            delay = backoff_delay(attempt, self.resilience_config)
+            if deadline is not None and delay + Deadline.MIN_REQUEST_TIME > deadline.remaining():
+                raise DeadlineExceededError(f"no time left to retry jacred search {search_query}")
+            logging.info(f"[JACRED PARSER] Retry {attempt + 1}/{self.resilience_config.retries} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+        raise UpstreamUnavailableError(f"jacred request failed for {search_query}")
+
+    @staticmethod
+    def _observe(status, started: float):
+        """Записывает длительность попытки запроса в гистограмму задержек"""
+        UPSTREAM_LATENCY.observe(time.monotonic() - started, upstream="jacred", endpoint="torrents", status=status)
 
     async def _filter_results(self, results: list, is_series: bool = False) -> list:
         """Фильтрует и сортирует результаты поиска с учетом настроек фильтрации"""
@@ -178,15 +259,16 @@ class TorrentParser:
                 
                 quality_full = ' '.join(quality_info) if quality_info else f"{quality}p"
             
-            # Добавляем дополнительную информацию
-            item.update({
+            # Добавляем дополнительную информацию (в копию: исходные элементы лежат в общем кэше)
+            item = {
+                **item,
                 'score': score,
                 'voice': current_voice or 'Неизвестная',
                 'quality': f"{quality}p" if quality else 'Неизвестное',
                 'quality_full': quality_full,  # Добавляем полное описание качества
                 'size_gb': item.get('size', 0) / (1024 * 1024 * 1024),
                 'seeders': item.get('sid', 0)
-            })
+            }
             
             filtered.append(item)
         
@@ -210,28 +292,56 @@ class TorrentParser:
             logging.error(f"[JACRED PARSER] Error decoding hash: {str(e)}")
             return None
 
-    async def get_torrents(self, kinopoisk_id: str, is_series: bool = False) -> Optional[Union[str, list]]:
+    async def get_torrents(self, kinopoisk_id: str, is_series: bool = False,
+                           deadline: Optional[Deadline] = None) -> Optional[Union[str, list]]:
         """
         Поиск торрентов с применением фильтров
         Args:
             kinopoisk_id: str - идентификатор фильма/сериала в КиноПоиске
             is_series: bool - является ли контент сериалом
+            deadline: Deadline - крайний срок обработки апдейта
         """
         try:
             # Получаем название фильма из КиноПоиска
-            film_name = await kinopoisk_api.get_film_name(kinopoisk_id)
+            film_name = await kinopoisk_api.get_film_name(kinopoisk_id, deadline=deadline)
             if not film_name:
                 logging.error(f"[JACRED PARSER] Failed to get film name for KinoPoisk ID: {kinopoisk_id}")
                 return None
                 
             logging.info(f"[JACRED PARSER] Searching torrent for film '{film_name}' (KinoPoisk ID: {kinopoisk_id})")
             
-            # Делаем запрос к API jacred
-            response_text = await self._make_request(film_name)
-            if not response_text:
+            # Результаты jacred берем из кэша, запрос к API только при промахе
+            cache_key = f"jacred:{hashlib.md5(film_name.encode('utf-8')).hexdigest()}"
+            results, negative = await self.cache.get_many([cache_key, negative_key(cache_key)])
+            if results is MISSING and negative is not MISSING:
+                logging.info(f"[JACRED PARSER] Negative cache hit for '{film_name}'")
                 return None
-            
-            results = json.loads(response_text)
+            if results is MISSING:
+                # Делаем запрос к API jacred
+                try:
+                    async with self.scheduler.slot(f"jacred search {film_name}", deadline):
+                        response_data = await self._make_request(film_name, deadline)
+                except UpstreamUnavailableError as e:
+                    # jacred недоступен - отдаем устаревшие результаты, если они есть
+                    logging.warning(f"[JACRED PARSER] Upstream unavailable: {e}")
+                    response_data = None
+                    results = await self.cache.get_stale(cache_key)
+                    if results is not MISSING:
+                        logging.info("[JACRED PARSER] Serving stale cache")
+                if response_data is None and results is MISSING:
+                    return None
+                if response_data is NOT_FOUND:
+                    # 404 - раздач нет, как и при пустом ответе (кэшируется негативной записью)
+                    response_data = []
+                
+                if response_data is not None:
+                    results = response_data
+                    if results and isinstance(results, list):
+                        await self.cache.set(cache_key, results, self.cache_ttl)
+                    elif self.negative_ttl:
+                        # jacred ответил, но раздач нет - не спрашиваем его снова до истечения короткого TTL
+                        await self.cache.set(negative_key(cache_key), True, self.negative_ttl, keep_stale=False)
+
             if not results or not isinstance(results, list):
                 logging.warning("[JACRED PARSER] No results in API response")
                 return None
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Модули бота читают конфиг при импорте: тестам хватает фиктивных токена и ключа
+os.environ.setdefault("BOT_TOKEN", "123456:test")
+os.environ.setdefault("KINOPOISK_API_KEYS", "test-key")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
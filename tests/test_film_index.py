@@ -0,0 +1,85 @@
+import asyncio
+import sys
+from core.config import FilmIndexConfig
+import services.kinopoisk_api
+from services.film_index import FilmIndex
+
+# services/__init__ отдает под этим именем экземпляр API, нам нужен модуль
+kinopoisk_module = sys.modules['services.kinopoisk_api']
+
+FILMS = [
+    {'kinopoisk_id': 301, 'name_ru': "Матрица", 'name_en': "The Matrix", 'rating_kinopoisk': 8.5},
+    {'kinopoisk_id': 298, 'name_ru': "Матрица: Перезагрузка", 'rating_kinopoisk': 7.7},
+    {'kinopoisk_id': 299, 'name_ru': "Матрица: Революция", 'rating_kinopoisk': 7.5},
+    {'kinopoisk_id': 100, 'name_ru': "Мастер и Маргарита", 'rating_kinopoisk': 7.9},
+    {'kinopoisk_id': 101, 'name_ru': "Мама", 'rating_kinopoisk': 6.1},
+    {'kinopoisk_id': 102, 'name_ru': "Мандалорец", 'rating_kinopoisk': 8.3},
+]
+
+async def open_index(tmp_path, **config) -> FilmIndex:
+    index = FilmIndex(FilmIndexConfig(path=str(tmp_path / "films.db"), **config))
+    await index.open()
+    index.ingest(FILMS)
+    await index.flush()
+    return index
+
+def test_index_is_fallback_only_by_default(tmp_path):
+    """По умолчанию индекс не отвечает вместо API даже на точное название"""
+    async def scenario():
+        index = await open_index(tmp_path)
+        assert await index.answer("матрица") is None
+        assert (await index.fallback("матрица"))['total'] == 3
+        await index.close()
+
+    asyncio.run(scenario())
+
+def test_answer_requires_exact_title(tmp_path):
+    """Без API отвечаем только при фильме с точно таким названием, префиксы и части названий - в API"""
+    async def scenario():
+        index = await open_index(tmp_path, min_local_hits=1)
+        # Совпадений по префиксу много, но уверенности нет
+        assert (await index.fallback("ма"))['total'] == 6
+        assert await index.answer("ма") is None
+        assert await index.answer("матр") is None
+        assert await index.answer("перезагрузка") is None
+
+        assert (await index.answer("матрица"))['total'] == 3
+        assert (await index.answer("the matrix"))['total'] == 1
+        await index.close()
+
+    asyncio.run(scenario())
+
+def test_answer_skips_capped_results(tmp_path):
+    """Если совпадений не меньше max_results, полный список знает только API"""
+    async def scenario():
+        index = await open_index(tmp_path, min_local_hits=1, max_results=3)
+        assert (await index.fallback("матрица"))['total'] == 3
+        assert await index.answer("матрица") is None
+        await index.close()
+
+    asyncio.run(scenario())
+
+def test_prefix_query_goes_to_api(tmp_path, monkeypatch):
+    """Общий префиксный запрос уходит в API, даже когда индекс разрешено использовать вместо него"""
+    async def scenario():
+        index = await open_index(tmp_path, min_local_hits=1)
+        monkeypatch.setattr(kinopoisk_module, "film_index", index)
+        api = kinopoisk_module.kinopoisk_api
+        calls = []
+
+        async def make_request(endpoint, params=None, **kwargs):
+            calls.append(params['keyword'])
+            return {'total': 1, 'totalPages': 1, 'items': [FILMS[4]]}
+
+        monkeypatch.setattr(api, "_make_request", make_request)
+
+        result = await api.search_films("Ма")
+        assert calls == ["Ма"]
+        assert not result.get('local')
+
+        result = await api.search_films("Матрица")
+        assert calls == ["Ма"]
+        assert result['local']
+        await index.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,75 @@
+import asyncio
+import time
+from services.kinopoisk_api import kinopoisk_api
+
+def test_hedge_budget_has_no_startup_burst(monkeypatch):
+    """Доля дублей не превышает max_ratio и сразу после старта"""
+    monkeypatch.setattr(kinopoisk_api.key_manager, "available_keys", lambda: 2)
+    monkeypatch.setattr(kinopoisk_api, "hedge_stats", {'requests': 0, 'hedged': 0, 'hedge_wins': 0, 'skipped_budget': 0})
+    monkeypatch.setattr(kinopoisk_api.hedge_config, "max_ratio", 0.05)
+
+    # Каждый запрос медленный и просит дубль
+    for _ in range(100):
+        kinopoisk_api.hedge_stats['requests'] += 1
+        if kinopoisk_api._can_hedge():
+            kinopoisk_api.hedge_stats['hedged'] += 1
+        assert kinopoisk_api.hedge_stats['hedged'] <= 0.05 * kinopoisk_api.hedge_stats['requests']
+
+    assert kinopoisk_api.hedge_stats['hedged'] == 5
+
+def test_fetch_hedged_races_second_key(monkeypatch):
+    """Медленный запрос дублируется на другом ключе после задержки, побеждает первый ответ"""
+    delay = 0.05
+    calls = []
+    cancelled = []
+
+    async def fetch(endpoint, params=None, deadline=None, used_keys=None, exclude_keys=None):
+        started = time.monotonic()
+        if exclude_keys is None:
+            # Основной запрос на ключе #1 зависает
+            used_keys.add(0)
+            calls.append(('primary', 0, started))
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append('primary')
+                raise
+            return {'from': 'primary'}
+        key = min({0, 1} - exclude_keys)
+        calls.append(('hedge', key, started))
+        return {'from': 'hedge'}
+
+    monkeypatch.setattr(kinopoisk_api.key_manager, "available_keys", lambda: 2)
+    monkeypatch.setattr(kinopoisk_api, "_fetch", fetch)
+    monkeypatch.setattr(kinopoisk_api, "_get_hedge_delay", lambda: delay)
+    monkeypatch.setattr(kinopoisk_api.hedge_config, "max_ratio", 0.05)
+    # 20-й запрос - первый, которому бюджет 5% разрешает дубль
+    monkeypatch.setattr(kinopoisk_api, "hedge_stats", {'requests': 19, 'hedged': 0, 'hedge_wins': 0, 'skipped_budget': 0})
+
+    async def scenario():
+        result = await kinopoisk_api._fetch_hedged("films/301")
+        await asyncio.sleep(0)  # отмена проигравшего доходит до задачи
+        return result
+
+    assert asyncio.run(scenario()) == {'from': 'hedge'}
+    (primary, primary_key, primary_start), (hedge, hedge_key, hedge_start) = calls
+    assert (primary, hedge) == ('primary', 'hedge')
+    assert hedge_start - primary_start >= delay
+    assert hedge_key != primary_key
+    assert cancelled == ['primary']
+    assert kinopoisk_api.hedge_stats['hedged'] == 1
+    assert kinopoisk_api.hedge_stats['hedge_wins'] == 1
+
+    # Следующий медленный запрос уже не укладывается в бюджет дублей
+    calls.clear()
+
+    async def slow_primary(endpoint, params=None, deadline=None, used_keys=None, exclude_keys=None):
+        calls.append(exclude_keys)
+        await asyncio.sleep(delay * 2)
+        return {'from': 'primary'}
+
+    monkeypatch.setattr(kinopoisk_api, "_fetch", slow_primary)
+    assert asyncio.run(kinopoisk_api._fetch_hedged("films/302")) == {'from': 'primary'}
+    assert calls == [None]
+    assert kinopoisk_api.hedge_stats['hedged'] == 1
+    assert kinopoisk_api.hedge_stats['skipped_budget'] == 1
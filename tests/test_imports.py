@@ -0,0 +1,7 @@
+import importlib
+
+def test_main_imports(tmp_path, monkeypatch):
+    """Бот собирается: все модули хендлеров и сервисов импортируются без ошибок"""
+    # main при импорте настраивает логгер, который пишет в ./logs
+    monkeypatch.chdir(tmp_path)
+    importlib.import_module("main")
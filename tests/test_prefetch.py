@@ -0,0 +1,77 @@
+import asyncio
+from services.kinopoisk_api import kinopoisk_api
+
+PAGE = {'total': 40, 'totalPages': 2, 'items': [{'kinopoiskId': 301, 'nameRu': "Матрица", 'type': "FILM"}]}
+
+def fresh_stats(monkeypatch):
+    monkeypatch.setattr(kinopoisk_api, "prefetch_stats", {key: 0 for key in kinopoisk_api.prefetch_stats})
+    monkeypatch.setattr(kinopoisk_api, "_prefetched", {})
+
+def stub_fetch(monkeypatch, delay: float = 0.0):
+    calls = []
+
+    async def fetch(endpoint, params=None, deadline=None, **kwargs):
+        calls.append(params)
+        await asyncio.sleep(delay)
+        return PAGE
+
+    monkeypatch.setattr(kinopoisk_api, "_fetch", fetch)
+    return calls
+
+def search_key(query: str, page: int):
+    params = kinopoisk_api._build_search_params(query, page)
+    return params, kinopoisk_api._get_cache_key("films", params)
+
+def test_hit_when_user_opens_prefetched_page(monkeypatch):
+    """Попадание - запрос пользователя, отданный из страницы, которую сохранила предзагрузка"""
+    fresh_stats(monkeypatch)
+    calls = stub_fetch(monkeypatch)
+    params, key = search_key("prefetch hit", 2)
+
+    async def scenario():
+        await kinopoisk_api._run_prefetch(params, key)
+        assert kinopoisk_api.prefetch_stats['completed'] == 1
+        assert kinopoisk_api.prefetch_stats['hits'] == 0
+        await kinopoisk_api.search_films("prefetch hit", 2)
+        # Повторное открытие страницы - уже не заслуга предзагрузки
+        await kinopoisk_api.search_films("prefetch hit", 2)
+
+    asyncio.run(scenario())
+    assert len(calls) == 1
+    assert kinopoisk_api.prefetch_stats['hits'] == 1
+
+def test_prefetch_joining_user_request_is_not_a_hit(monkeypatch):
+    """Предзагрузка, присоединившаяся к запросу пользователя, ничего не загрузила и попаданий не дает"""
+    fresh_stats(monkeypatch)
+    calls = stub_fetch(monkeypatch, delay=0.05)
+    params, key = search_key("prefetch coalesced", 2)
+
+    async def scenario():
+        user_request = asyncio.ensure_future(kinopoisk_api.search_films("prefetch coalesced", 2))
+        await asyncio.sleep(0)
+        await kinopoisk_api._run_prefetch(params, key)
+        await user_request
+        await kinopoisk_api.search_films("prefetch coalesced", 2)
+
+    asyncio.run(scenario())
+    assert len(calls) == 1
+    stats = kinopoisk_api.prefetch_stats
+    assert (stats['coalesced'], stats['completed'], stats['hits']) == (1, 0, 0)
+
+def test_user_joining_running_prefetch_is_not_a_hit(monkeypatch):
+    """Пользователь, дождавшийся еще идущей предзагрузки, учитывается отдельно от попаданий"""
+    fresh_stats(monkeypatch)
+    calls = stub_fetch(monkeypatch, delay=0.05)
+    params, key = search_key("prefetch joined", 2)
+
+    async def scenario():
+        prefetch = asyncio.ensure_future(kinopoisk_api._run_prefetch(params, key))
+        await asyncio.sleep(0.01)
+        await kinopoisk_api.search_films("prefetch joined", 2)
+        await prefetch
+        await kinopoisk_api.search_films("prefetch joined", 2)
+
+    asyncio.run(scenario())
+    assert len(calls) == 1
+    stats = kinopoisk_api.prefetch_stats
+    assert (stats['joined'], stats['completed'], stats['hits']) == (1, 1, 0)
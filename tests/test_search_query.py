@@ -0,0 +1,30 @@
+import asyncio
+from services.kinopoisk_api import kinopoisk_api
+from utils.query_normalizer import normalize_query
+
+def test_normalize_folds_only_case_yo_and_spaces():
+    assert normalize_query("  Ёлки   ПАЛКИ ") == "елки палки"
+    assert normalize_query("Ocean's Eleven") == "ocean's eleven"
+    assert normalize_query("WALL·E") == "wall·e"
+    assert normalize_query("matrix") == "matrix"
+
+def test_cache_key_folds_equivalent_queries():
+    def key(query):
+        return kinopoisk_api._get_cache_key("films", kinopoisk_api._build_search_params(query, 1))
+    assert key("Матрица") == key(" МАТРИЦА ") == key("матрица")
+    assert key("Ёлки") == key("елки")
+    assert key("WALL·E") != key("wall e")
+    assert key("Ocean's") != key("oceans")
+
+def test_api_receives_user_query(monkeypatch):
+    """В API уходит запрос пользователя, а не свернутая форма"""
+    sent = []
+
+    async def make_request(endpoint, params=None, **kwargs):
+        sent.append(params['keyword'])
+        return {'total': 0, 'totalPages': 0, 'items': []}
+
+    monkeypatch.setattr(kinopoisk_api, "_make_request", make_request)
+    asyncio.run(kinopoisk_api.search_films(" Ocean's Eleven ", 1, {'order': 'RATING'}))
+    asyncio.run(kinopoisk_api.search_films("WALL·E", 1, {'order': 'RATING'}))
+    assert sent == ["Ocean's Eleven", "WALL·E"]
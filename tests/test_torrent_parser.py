@@ -0,0 +1,94 @@
+import asyncio
+from aiohttp import web
+from services.fair_scheduler import INTERACTIVE, PREFETCH
+from services.http_client import HttpClient
+from services.kinopoisk_api import kinopoisk_api
+from services.torrent_parser import TorrentParser, jacred_scheduler
+
+def test_parsers_share_scheduler():
+    """Парсеры, созданные в разных апдейтах, ставят запросы к jacred в одну очередь"""
+    first, second = TorrentParser(), TorrentParser()
+    assert first.scheduler is second.scheduler is jacred_scheduler
+
+def test_parsers_share_concurrency_limit():
+    """Слоты, занятые через один парсер, учитываются при запросах через другой"""
+    async def scenario():
+        first, second = TorrentParser(), TorrentParser()
+        limit = first.scheduler.config.max_concurrency
+        # Все слоты jacred заняты запросами разных пользователей через первый парсер
+        for user in range(limit):
+            await first.scheduler.acquire(user)
+        assert first.scheduler.in_flight == limit
+
+        # Запрос нового пользователя через второй парсер ждет освобождения слота
+        waiting = asyncio.ensure_future(second.scheduler.acquire(limit))
+        await asyncio.sleep(0)
+        assert not waiting.done()
+        first.scheduler.release(0)
+        await asyncio.wait_for(waiting, 1)
+        assert second.scheduler.in_flight == limit
+        for user in range(1, limit + 1):
+            second.scheduler.release(user)
+        assert jacred_scheduler.in_flight == 0
+
+    asyncio.run(scenario())
+
+def test_parsers_share_priority_queues():
+    """Интерактивный запрос через один парсер обслуживается раньше предзагрузки через другой"""
+    async def scenario():
+        first, second = TorrentParser(), TorrentParser()
+        limit = first.scheduler.config.max_concurrency
+        for user in range(limit):
+            await first.scheduler.acquire(user)
+
+        # Предзагрузка встала в очередь раньше, но слот первым получает запрос, который ждет пользователь
+        prefetch = asyncio.ensure_future(first.scheduler.acquire("prefetch", PREFETCH))
+        await asyncio.sleep(0)
+        interactive = asyncio.ensure_future(second.scheduler.acquire("interactive", INTERACTIVE))
+        await asyncio.sleep(0)
+        first.scheduler.release(0)
+        await asyncio.wait_for(interactive, 1)
+        assert not prefetch.done()
+
+        second.scheduler.release(1)
+        await asyncio.wait_for(prefetch, 1)
+        second.scheduler.release("interactive")
+        second.scheduler.release("prefetch", PREFETCH)
+        for user in range(2, limit):
+            second.scheduler.release(user)
+        assert jacred_scheduler.in_flight == 0
+
+    asyncio.run(scenario())
+
+def test_not_found_is_negative_cached(monkeypatch):
+    """Ответ 404 кэшируется как промах: повторный поиск не идет в jacred"""
+    async def scenario():
+        hits = []
+
+        async def torrents(request):
+            hits.append(request.query['search'])
+            return web.Response(status=404)
+
+        app = web.Application()
+        app.router.add_get("/api/v1.0/torrents", torrents)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        async def get_film_name(kinopoisk_id, deadline=None):
+            return "Фильм, которого нет в jacred"
+
+        monkeypatch.setattr(kinopoisk_api, "get_film_name", get_film_name)
+        parser = TorrentParser()
+        parser.base_url = f"http://127.0.0.1:{port}"
+        try:
+            assert await parser.get_torrents("404") is None
+            assert await parser.get_torrents("404") is None
+        finally:
+            await HttpClient.close()
+            await runner.cleanup()
+        assert len(hits) == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,37 @@
+"""
+Единый JSON кодек для ответов внешних API и данных в Redis.
+Использует orjson, если он установлен, иначе стандартный json
+"""
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # orjson - необязательная зависимость
+    orjson = None
+
+# Имя активной реализации (для логов и бенчмарков)
+BACKEND = "orjson" if orjson is not None else "json"
+
+def loads(data: Union[bytes, bytearray, str]) -> Any:
+    """
+    Декодирует JSON из байтов или строки
+
+    Raises:
+        ValueError: некорректный JSON (orjson.JSONDecodeError - его подкласс)
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def dumps(obj: Any) -> str:
+    """Кодирует объект в JSON строку (Redis работает со строками)"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+
+def dumpb(obj: Any) -> bytes:
+    """Кодирует объект в JSON байты (для файлов и сети)"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
@@ -0,0 +1,47 @@
+import time
+from typing import Optional
+
+class Deadline:
+    """
+    Крайний срок обработки апдейта. Хендлер создает его в начале обработки и
+    передает в сервисы: запросы, которые уже не успеют завершиться до срока,
+    не отправляются вовсе, а таймауты текущих запросов урезаются до остатка
+    """
+
+    # Telegram ждет ответ на callback query ограниченное время, оставляем запас
+    CALLBACK_WINDOW = 10.0
+
+    # Инлайн-запрос устаревает быстрее: пользователь уже набирает следующий вариант текста
+    INLINE_QUERY_WINDOW = 8.0
+
+    # Меньше этого остатка новый запрос к API уже не имеет смысла начинать
+    MIN_REQUEST_TIME = 0.3
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    @classmethod
+    def for_callback(cls) -> 'Deadline':
+        """Срок для обработки нажатия inline кнопки"""
+        return cls(cls.CALLBACK_WINDOW)
+
+    @classmethod
+    def for_inline_query(cls) -> 'Deadline':
+        """Срок для ответа на инлайн-запрос"""
+        return cls(cls.INLINE_QUERY_WINDOW)
+
+    def remaining(self) -> float:
+        """Сколько секунд осталось до срока (не меньше 0)"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        """Осталось слишком мало времени, чтобы начинать новый запрос"""
+        return self.remaining() < self.MIN_REQUEST_TIME
+
+    @staticmethod
+    def clamp(timeout: float, deadline: Optional['Deadline']) -> float:
+        """Урезает таймаут до остатка времени по сроку"""
+        if deadline is None:
+            return timeout
+        return min(timeout, deadline.remaining())
@@ -0,0 +1,37 @@
+from typing import Optional
+
+# Количество фильмов на одной странице в интерфейсе бота
+FILMS_PER_PAGE = 10
+
+# Количество фильмов на одной странице ответа API (поиск и подборки)
+API_PAGE_SIZE = 20
+
+# Сколько страниц интерфейса помещается в одну страницу API
+UI_PAGES_PER_API_PAGE = API_PAGE_SIZE // FILMS_PER_PAGE
+
+def get_api_page(ui_page: int) -> int:
+    """Номер страницы API, на которой лежит страница интерфейса"""
+    return (ui_page - 1) // UI_PAGES_PER_API_PAGE + 1
+
+def slice_ui_page(items: list, ui_page: int) -> list:
+    """Вырезает из страницы API фильмы для страницы интерфейса"""
+    start_idx = ((ui_page - 1) % UI_PAGES_PER_API_PAGE) * FILMS_PER_PAGE
+    return items[start_idx:start_idx + FILMS_PER_PAGE]
+
+def get_total_ui_pages(total_items: int, api_total_pages: Optional[int] = None) -> int:
+    """
+    Количество страниц интерфейса
+
+    Args:
+        total_items: Общее количество фильмов по данным API
+        api_total_pages: Количество страниц API. API может отдавать меньше страниц,
+            чем следует из total, поэтому страницы за его пределами не показываем
+    """
+    total_pages = (total_items + FILMS_PER_PAGE - 1) // FILMS_PER_PAGE
+    if api_total_pages:
+        total_pages = min(total_pages, api_total_pages * UI_PAGES_PER_API_PAGE)
+    return total_pages
+
+def is_last_ui_page_of_api_page(ui_page: int) -> bool:
+    """Страница интерфейса - последняя из текущей страницы API (пора подгружать следующую)"""
+    return ui_page % UI_PAGES_PER_API_PAGE == 0
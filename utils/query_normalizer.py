@@ -0,0 +1,8 @@
+def normalize_query(text: str) -> str:
+    """
+    Каноническая форма поискового запроса для ключей кэша и ID поиска:
+    "Матрица", " матрица " и "МАТРИЦА" дают одну и ту же строку.
+    Свертываются только различия, которые поиск API не различает (регистр,
+    ё/е, пробелы): в API всегда уходит запрос пользователя
+    """
+    return ' '.join(text.lower().replace('ё', 'е').split())